@@ -9,45 +9,124 @@ from   scipy.signal import find_peaks
 import traceback
 from   flask_cors import CORS
 from   datetime import datetime, timedelta
-from   flask import Flask, jsonify, request 
+from   flask import Flask, Response, jsonify, request 
+import json
+import logging
+import os
 import pandas as pd
-import PIconnect as PI
-from PIconnect.PIConsts import SummaryType
+from   pi_client import PIDataClient, loop_tags, split_loops
+from   ts_cache import TimeSeriesCache
+from   history_store import HistoryStore
+from   data_source import FetchSource, PISource, open_source, role_frame
+from   result_cache import ResultCache
+from   scheduler import HealthScheduler
+from   live_stream import LiveHub
+from   simulation import simulate_pid_array
+from   cascade import process_model, simulate_cascade
+from   identification import ModelCache, identify_loop
+from   tuning_rules import RULE_NAMES, RULES, tune_loops
+from   data_quality import NoGoodData, first_valid, json_values, last_valid, quality_mask, valid_positions
+from   detection import detect_issues, issue_frame
+from   spectral import oscillation_scan, summarise_scan
+from   valve import summarise_valves, valve_diagnostics, valve_rows
+from   plot_format import compact_plot_data
+from   downsample import downsample_rows
+from   autotune import autotune_pid
+from   fleet import analyse_loops, scan_fleet
 
 
 
 app = Flask(__name__)
 CORS(app)  # Enable CORS for all routes
+logger = logging.getLogger(__name__)
+
+
+# ONE PI SESSION SHARED BY ALL REQUESTS
+# Set PI_FAKE=1 to run against the synthetic server in fake_pi.py when PI is not reachable.
+PI_HOST   = os.environ.get("PI_HOST", '00.00.00.000')
+PI_SOURCE = 'OPMS_APRL_U2'
+if os.environ.get("PI_FAKE"):
+    from fake_pi import FakePIServer
+    PI_CLIENT = PIDataClient(PI_HOST, source=PI_SOURCE, server_factory=FakePIServer)
+else:
+    PI_CLIENT = PIDataClient(PI_HOST, source=PI_SOURCE)
+
+# PI_HISTORY=<dir> replays the on-disk history store instead of PI (offline backtests);
+# PI_HISTORY_RECORD=<dir> writes everything fetched from PI into the store.
+# DATA_SOURCE=synthetic | readdata[=<url>] | <export.csv/.parquet> swaps PI for one of
+# the other sources in data_source.py.
+if os.environ.get("PI_HISTORY"):
+    DATA_SOURCE = FetchSource(HistoryStore(os.environ["PI_HISTORY"]).summaries)
+elif os.environ.get("PI_HISTORY_RECORD"):
+    DATA_SOURCE = FetchSource(HistoryStore(os.environ["PI_HISTORY_RECORD"]).recording(PI_CLIENT.summaries))
+else:
+    DATA_SOURCE = open_source(os.environ.get("DATA_SOURCE", "pi"), pi_client=PI_CLIENT)
+PI_FETCH = DATA_SOURCE.fetch
+
+# Buckets already fetched are served from memory; each refresh only asks PI for the new tail.
+PI_CACHE_RETENTION = timedelta(hours=float(os.environ.get("PI_CACHE_RETENTION_HOURS", 24)))
+PI_CACHE = TimeSeriesCache(PI_FETCH, retention=PI_CACHE_RETENTION)
+
+# Finished responses, for the UI re-requesting the same loop and gains within seconds
+# (tab switches). Requests in the same REQUEST_INTERVAL bucket see the same data, so
+# they share an entry. RESULT_CACHE_TTL=0 turns it off.
+RESULT_CACHE = ResultCache(
+    ttl=float(os.environ.get("RESULT_CACHE_TTL", 30)),
+    max_entries=int(os.environ.get("RESULT_CACHE_ENTRIES", 256)),
+    max_bytes=int(float(os.environ.get("RESULT_CACHE_MB", 64)) * (1 << 20)),
+)
+
+# SCHEDULER_PERIOD=<seconds> analyses every loop in pid-architecture.json in the
+# background (scheduler.py). /loopHealth serves its results, and a live request for a
+# loop refreshed less than SCHEDULER_MAX_AGE seconds ago is analysed on the scheduled
+# frame instead of waiting for PI. SCHEDULER_CONCURRENCY bounds the loops fetched at once.
+SCHEDULER_PERIOD  = float(os.environ.get("SCHEDULER_PERIOD", 0))
+SCHEDULER_MAX_AGE = float(os.environ.get("SCHEDULER_MAX_AGE", 60))
+
+# Process models identified from IDENTIFICATION_DAYS of history (identification.py),
+# reused for MODEL_VALIDITY_HOURS; MODEL_CACHE_PATH=<file.json> keeps them across restarts.
+IDENTIFICATION_DAYS = float(os.environ.get("IDENTIFICATION_DAYS", 3))
+MODEL_CACHE = ModelCache(
+    validity=timedelta(hours=float(os.environ.get("MODEL_VALIDITY_HOURS", 24))),
+    path=os.environ.get("MODEL_CACHE_PATH"),
+)
+MODEL_MIN_FIT = 30.0  # % of the data an identified model must explain to be simulated or tuned on
+
+# Seconds per time unit of ki and kd as the DCS (and pid-architecture.json) holds them;
+# 60 for repeats per minute. Rule-based gains are scaled to it so they compare with the
+# current settings.
+PID_TIME_UNIT = float(os.environ.get("PID_TIME_UNIT_SECONDS", 60))
+
+def usable_models(entry):
+    """The {"inner", "outer"} models of a MODEL_CACHE entry, or None if either fits too poorly."""
+    if entry is None or any(entry.get(key) is None or entry[key]["fit"] < MODEL_MIN_FIT for key in ("inner", "outer")):
+        return None
+    return {key: entry[key] for key in ("inner", "outer")}
 
 
 # ALl THE FUNCTIONS REQUIRED FOR PID TUNING ISSUE DETECTION MENTIONED BELOW
 
 def OPMS_Average(tag_list, start, end, time_int):
-    PI.PIConfig.DEFAULT_TIMEZONE = 'Asia/Kolkata'
+    df = PI_CACHE.get(tag_list, start, end, time_int)
 
-    with PI.PIServer('00.00.00.000') as server:
-        points = server.search(tag_list, source='OPMS_APRL_U2')
-
-        df = pd.concat([tag.summaries(start, end, time_int, SummaryType.AVERAGE) for tag in points], axis=1)
-    tag_no = len(points)
-
-    for i in range(tag_no):
-        tag_name = points[i].name
-        df.columns.values[i] = tag_name
-
-    df = df.applymap(lambda x: -1000 if "No Good" in str(x) else x)
+    df, mask = quality_mask(df)
     #df.to_csv('fetched_data.csv', index=False)
     #print("Dataframe has been saved to fetched_data.csv")
     #data_df = pd.read_csv('fetched_data.csv')
     df.reset_index(inplace=True)
-    df.rename(columns={'index': 'time'}, inplace=True)
     print(df.head())
     return df
 
+def fetch_loop_frames(loops, start, end, time_int):
+    """Fetches several loops' tags in one batched PI call; returns loop name -> role-named frame."""
+    frames = split_loops(PI_CACHE.get(loop_tags(loops), start, end, time_int), loops)
+    return {name: quality_mask(df)[0] for name, df in frames.items()}
+
 
 def detect_overshoot(df, pid_setpoint, pid_meas, control_valve,cv_high,cv_low):
-    peaks, _ = find_peaks(df[pid_meas])
-    overshoot_df = df.iloc[peaks].copy()
+    valid = valid_positions(df, [pid_meas])  # peaks are searched across bad-quality gaps
+    peaks, _ = find_peaks(df[pid_meas].to_numpy()[valid])
+    overshoot_df = df.iloc[valid[peaks]].copy()
     overshoot_df["overshoot_amount"] = overshoot_df[pid_meas] - overshoot_df[pid_setpoint]
     overshoot_df = overshoot_df[overshoot_df["overshoot_amount"] > 0]  # True overshoot only
     overshoot_df["control_valve_high"] = overshoot_df[control_valve] > cv_high
@@ -55,8 +134,9 @@ def detect_overshoot(df, pid_setpoint, pid_meas, control_valve,cv_high,cv_low):
     return overshoot_df
 
 def detect_undershoot(df, pid_setpoint, pid_meas, control_valve,cv_high,cv_low):
-    valleys, _ = find_peaks(-df[pid_meas])  # Find local minima (valleys)
-    undershoot_df = df.iloc[valleys].copy()
+    valid = valid_positions(df, [pid_meas])
+    valleys, _ = find_peaks(-df[pid_meas].to_numpy()[valid])  # Find local minima (valleys)
+    undershoot_df = df.iloc[valid[valleys]].copy()
     undershoot_df["undershoot_amount"] = undershoot_df[pid_setpoint] - undershoot_df[pid_meas]
     undershoot_df = undershoot_df[undershoot_df["undershoot_amount"] > 0]  # True undershoot only
     undershoot_df["control_valve_high"] = undershoot_df[control_valve] > cv_high
@@ -65,6 +145,7 @@ def detect_undershoot(df, pid_setpoint, pid_meas, control_valve,cv_high,cv_low):
 
 
 def detect_sluggish_response(df, pid_setpoint, pid_meas, control_valve,cv_low):
+    # NaN (bad quality) compares False, so bad samples are never flagged here or below
     return df[(df[pid_meas] < df[pid_setpoint]) & (df[control_valve] < cv_low)]
 
 # Function to detect long settling time (Adaptive Threshold)
@@ -74,10 +155,11 @@ def detect_settling_time(df, pid_setpoint, pid_meas, tolerance=0.03):  # 5% of s
 
 # Function to detect oscillations using Zero-Crossing Rate
 def detect_oscillations(df, pid_meas, window=10):
-    diff = np.sign(df[pid_meas].diff())
+    good_df = df.iloc[valid_positions(df, [pid_meas])]  # NaN would count as a sign change
+    diff = np.sign(good_df[pid_meas].diff())
     zero_crossings = (diff != diff.shift(1)).astype(int).rolling(window=window).sum()
     threshold = zero_crossings.quantile(0.90)  # High-frequency changes
-    return df[zero_crossings > threshold]
+    return good_df[zero_crossings > threshold]
 
 class PID:
     def __init__(self, Kp, Ki, Kd, integral_limit=5000):
@@ -97,6 +179,27 @@ class PID:
         self.previous_error = error
         return output
 
+def initial_value(df, col):
+    """First good value of a column, where a simulation starts; NoGoodData if it has none."""
+    value = first_valid(df[col])
+    if value is None:
+        raise NoGoodData(col)
+    return value
+
+def no_good_data_error(e, data):
+    """The 400 body for a NoGoodData raised on a loop request's frame, naming the tag."""
+    tag = (data.get("tags") or {}).get(e.column, e.column)
+    return {"error": f"No good data for tag {tag} ({e.column}) in the requested window"}
+
+def simulator_gains(gains):
+    """
+    Kp, Ki, Kd of a suggestion in the simulators' time base, seconds. Rule-based gains
+    carry the time_unit their ki and kd are in (PID_TIME_UNIT); the heuristic nudges of
+    the current settings are simulated as they are.
+    """
+    unit = float(gains.get("time_unit", 1.0))
+    return gains["kp"], gains["ki"] / unit, gains["kd"] * unit
+
 def simulate_pid_response(
     df,
     setpoint_col,
@@ -108,7 +211,7 @@ def simulate_pid_response(
     process_gain=0.01,
 ):
     """
-    Simulates PID response using a class-based approach and returns the simulated response.
+    Simulates PID response on the array engine in simulation.py and returns the simulated response.
 
     Parameters:
         df (DataFrame): DataFrame containing the time series.
@@ -122,20 +225,15 @@ def simulate_pid_response(
     Returns:
         np.ndarray: Simulated PID-controlled response values.
     """
-    time = np.arange(len(df))
-    setpoint = df[setpoint_col]
-    measured_value = df[measured_col].iloc[0]
-
-    pid = PID(Kp, Ki, Kd)
-    simulated_values = []
-
-    for i in range(len(df)):
-        output = pid.update(setpoint.iloc[i], measured_value, dt)
-        measured_value += process_gain * output
-        simulated_values.append(measured_value)
-
+    return simulate_pid_array(
+        # Bad-quality setpoints hold the last good value; the start is the first good measurement.
+        df[setpoint_col].astype(float).ffill().bfill().to_numpy(),
+        initial_value(df, measured_col),
+        Kp, Ki, Kd,
+        dt=dt,
+        process_gain=process_gain,
+    )
 
-    return np.array(simulated_values)
 def suggest_pid_tuning(issue,pid,closedloop,openLoop,):
     """Suggest adjustments to Kp, Ki, and Kd based on detected issues."""
     tuning_recommendations = {}
@@ -169,13 +267,22 @@ def suggest_pid_tuning(issue,pid,closedloop,openLoop,):
         ki += 0.15 * ki  # Increase Ki for better accuracy
     elif issue == "Undershoot and control_valve_low":
         kp -= 0.2 * kp  # Reduce Kp to prevent excessive response 
+    elif issue == "Valve stiction":
+        ki -= 0.3 * ki  # Less integral action slows the stick-slip cycle until the valve is serviced
 
     tuning_recommendations[pid] = {"kp":round(kp, 3), "ki":round(ki, 3), "kd":round(kd, 3)}
     print("tuning_recommendations")
     print(tuning_recommendations)
     return tuning_recommendations
 
-def suggest_tuning(issue_type, issue_df, closedloop, openLoop):
+def suggest_tuning(issue_type, issue_df, closedloop, openLoop, strategy="heuristic", models=None, valve=None):
+    """
+    Suggests new gains for the detected issue. strategy "heuristic" nudges the current
+    gains; one of tuning_rules.RULES computes the suggested PID's gains from the loop's
+    process models ({"inner", "outer"}, see identification.py) instead, falling back
+    to the nudges where the rule does not apply. For a "valve" issue, valve is the
+    loop's summarise_valves entry.
+    """
     suggestions = []
 
     if issue_type == "overshoot" and not issue_df.empty:
@@ -226,6 +333,42 @@ def suggest_tuning(issue_type, issue_df, closedloop, openLoop):
             "tuning": suggest_pid_tuning("Oscillations", "PID1", closedloop, openLoop)
         })
 
+    elif issue_type == "valve" and not issue_df.empty and valve:
+        stiction = valve["stiction"]
+        if stiction:
+            suggestions.append({
+                "message": f"Valve stiction suspected ({stiction['amplitude']:.1f}% valve cycle every "
+                           f"{stiction['period'] / 60:.1f} min, OP-PV phase {stiction['phase']:.0f}°): schedule valve "
+                           f"maintenance; reduce Ki of PID2 to slow the cycle meanwhile. Retuning will not remove it.",
+                "tuning": suggest_pid_tuning("Valve stiction", "PID2", closedloop, openLoop)
+            })
+        # saturatedTime counts the closed limit only while PID1 is off setpoint; a spray
+        # valve parked shut at low load is not an issue
+        closed = valve["saturatedTime"] - valve["saturatedHigh"]
+        if valve["saturatedHigh"] and valve["saturatedHigh"] >= closed:
+            suggestions.append({
+                "message": f"Control valve fully open {valve['saturatedHigh'] * 100:.1f}% of the time (longest "
+                           f"{valve['longestSaturation'] / 60:.0f} min): PID2 has no authority left there; check valve "
+                           f"sizing and the spray water supply rather than the gains.",
+                "tuning": suggest_pid_tuning("Valve saturation", "PID2", closedloop, openLoop)
+            })
+        elif closed > 0:
+            suggestions.append({
+                "message": f"Control valve fully closed while PID1 is off setpoint {closed * 100:.1f}% of the time "
+                           f"(longest {valve['longestSaturation'] / 60:.0f} min): spraying cannot correct that "
+                           f"deviation; look at the load and firing upstream rather than the gains.",
+                "tuning": suggest_pid_tuning("Valve saturation", "PID2", closedloop, openLoop)
+            })
+
+    if strategy in RULES and models:
+        tuned = tune_loops({"loop": models}, rules=(strategy,), time_unit=PID_TIME_UNIT).get("loop", {}).get(strategy, {})
+        for suggestion in suggestions:
+            pid = next(iter(suggestion["tuning"]))
+            if tuned.get(pid):
+                suggestion["tuning"] = {pid: tuned[pid]}
+                suggestion["message"] += (f" Gains from the {RULE_NAMES[strategy]} rule on the identified process model,"
+                                          f" ki and kd in {PID_TIME_UNIT:g} s units.")
+
     return suggestions
 
 #def prepare_issue_plot_data(df, issue_df, pid_meas, pid_setpoint, closedloop, openLoop, tuning_suggestions, title, color, label, tolerance=0.03):
@@ -239,13 +382,14 @@ def suggest_tuning(issue_type, issue_df, closedloop, openLoop):
     print("conservatives", conservatives)
 
     # Ensure 'time' is datetime and set as index
+    kp, ki, kd = simulator_gains(conservatives)
     df["finetunedValues"] = simulate_pid_response(
         df,
         setpoint_col=pid_setpoint,
         measured_col=pid_meas,
-        Kp=conservatives["kp"],
-        Ki=conservatives["ki"],
-        Kd=conservatives["kd"]
+        Kp=kp,
+        Ki=ki,
+        Kd=kd
     )
 
     #df.reset_index(inplace=True)
@@ -267,14 +411,14 @@ def suggest_tuning(issue_type, issue_df, closedloop, openLoop):
         "parameters": {"closed_loop": closedloop, "open_loop": openLoop},
         "suggestedParameters": {"closed_loop": tuning_suggestions[0]["tuning"].get("PID2", empty), "open_loop": tuning_suggestions[0]["tuning"].get("PID1", empty)},
         "recommendation": tuning_suggestions[0]["message"],
-        "setpoint": df[pid_setpoint].tolist()[-1],
+        "setpoint": last_valid(df[pid_setpoint]),
         "status": status,
         "series": {
-            "Setpoint": df[pid_setpoint].tolist(),
-            "Upper Acceptable Limit": (df[pid_setpoint] * (1 + tolerance)).tolist(),
-            "Lower Acceptable Limit": (df[pid_setpoint] * (1 - tolerance)).tolist(),
-            "Measured Output": df[pid_meas].tolist(),
-            "finetunedValues": df["finetunedValues"].tolist()
+            "Setpoint": json_values(df[pid_setpoint]),
+            "Upper Acceptable Limit": json_values(df[pid_setpoint] * (1 + tolerance)),
+            "Lower Acceptable Limit": json_values(df[pid_setpoint] * (1 - tolerance)),
+            "Measured Output": json_values(df[pid_meas]),
+            "finetunedValues": json_values(df["finetunedValues"])
         }
     }
 
@@ -300,7 +444,7 @@ def suggest_tuning(issue_type, issue_df, closedloop, openLoop):
 
     return response
 
-def prepare_issue_plot_data(df, issue_df, pid_meas, pid_setpoint, closedloop, openLoop, tuning_suggestions, title, color, label, tolerance=0.03):
+def prepare_issue_plot_data(df, issue_df, pid_meas, pid_setpoint, closedloop, openLoop, tuning_suggestions, title, color, label, tolerance=0.03, compact=False, max_points=None, downsample="minmax", issue_positions=None):
     try:
         conservatives = tuning_suggestions[0]["tuning"].get("PID1") or tuning_suggestions[0]["tuning"].get("PID2") or {}
     except:
@@ -314,17 +458,16 @@ def prepare_issue_plot_data(df, issue_df, pid_meas, pid_setpoint, closedloop, op
     df['time'] = pd.to_datetime(df['time'])
     df.set_index('time', inplace=True)
     
+    kp, ki, kd = simulator_gains(conservatives)
     df["finetunedValues"] = simulate_pid_response(
         df,
         setpoint_col=pid_setpoint,
         measured_col=pid_meas,
-        Kp=conservatives["kp"],
-        Ki=conservatives["ki"],
-        Kd=conservatives["kd"]
+        Kp=kp,
+        Ki=ki,
+        Kd=kd
     )
 
-    # Common x-axis timestamps
-    timestamps = df.index.to_series().dt.strftime('%Y-%m-%d %H:%M:%S').tolist()
     empty = {"kp": "-", "ki": "-", "kd": "-"}
     status = title if not issue_df.empty else "normal"
     
@@ -333,167 +476,662 @@ def prepare_issue_plot_data(df, issue_df, pid_meas, pid_setpoint, closedloop, op
         "title": title,
         "xlabel": "Time",
         "ylabel": "Value",
-        "timestamps": timestamps,
         "parameters": {"closed_loop": closedloop, "open_loop": openLoop},
         "suggestedParameters": {"closed_loop": tuning_suggestions[0]["tuning"].get("PID2", empty), "open_loop": tuning_suggestions[0]["tuning"].get("PID1", empty)},
         "recommendation": tuning_suggestions[0]["message"],
-        "setpoint": df[pid_setpoint].tolist()[-1],
+        "setpoint": last_valid(df[pid_setpoint]),
         "status": status,
-        "series": {
-            "Setpoint": df[pid_setpoint].tolist(),
-            "Upper Acceptable Limit": (df[pid_setpoint] * (1 + tolerance)).tolist(),
-            "Lower Acceptable Limit": (df[pid_setpoint] * (1 - tolerance)).tolist(),
-            "Measured Output": df[pid_meas].tolist(),
-            "finetunedValues": df["finetunedValues"].tolist()
+    }
+
+    # Issue rows as integer positions into df; analyse_loop passes the detector output
+    if issue_positions is None:
+        issue_positions = df.index.get_indexer(pd.to_datetime(issue_df['time'])) if not issue_df.empty else []
+    issue_positions = np.asarray(issue_positions, dtype=np.intp)
+
+    # Decimate to the client's point budget, the issue markers included
+    if max_points:
+        rows = downsample_rows(df[pid_meas].to_numpy(), max_points, keep=issue_positions, method=downsample)
+        df = df.iloc[rows]
+        issue_positions = np.flatnonzero(np.isin(rows, issue_positions))
+
+    # Compact format: start + step instead of timestamps, packed series, no limit series
+    if compact:
+        columns = {
+            "Setpoint": df[pid_setpoint],
+            "Measured Output": df[pid_meas],
+            "finetunedValues": df["finetunedValues"]
         }
+        return compact_plot_data(response, df.index, columns, issue_positions, tolerance)
+
+    # Common x-axis timestamps
+    timestamps = df.index.to_series().dt.strftime('%Y-%m-%d %H:%M:%S').tolist()
+    response["timestamps"] = timestamps
+    response["series"] = {
+        "Setpoint": json_values(df[pid_setpoint]),
+        "Upper Acceptable Limit": json_values(df[pid_setpoint] * (1 + tolerance)),
+        "Lower Acceptable Limit": json_values(df[pid_setpoint] * (1 - tolerance)),
+        "Measured Output": json_values(df[pid_meas]),
+        "finetunedValues": json_values(df["finetunedValues"])
     }
 
     # Add Issue Points (highlighted markers) - scattered on top
     if not issue_df.empty:
-        issue_df['time'] = pd.to_datetime(issue_df['time'])
-        issue_df.set_index('time', inplace=True)
-        print(":::::ISSUE NOT EMPTY")
-        
-        # Create a list aligned with `timestamps`, fill with None
-        issue_points = [None] * len(timestamps)
-
-        # Map issue_df times to values
-        issue_index_str = issue_df.index.to_series().dt.strftime('%Y-%m-%d %H:%M:%S')
-        issue_map = dict(zip(issue_index_str, issue_df[pid_meas]))
-
-        # Fill values only where issue occurred
-        for i, ts in enumerate(timestamps):
-            if ts in issue_map:
-                issue_points[i] = issue_map[ts]
+        # Scatter the measured value of every issue row into an all-gap series
+        issue_points = np.full(len(df), np.nan)
+        issue_points[issue_positions] = df[pid_meas].to_numpy()[issue_positions]
         
         # Add issue points to series
-        response["series"]["Issue Points"] = issue_points
+        response["series"]["Issue Points"] = json_values(pd.Series(issue_points))
 
     return response
 
 #END OF THE REQUIRED FUNCTIONS:::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::
 
+def fetch_loop_frame(tags, starttime, endtime, time_interval):
+    """Fetches the summaries for one loop from DATA_SOURCE and renames the tag columns to their roles."""
+    sensorTags    = [v for k,v in tags.items()]
+    #df           = getpiddata(sensorTags,starttime,endtime)
+    df            = OPMS_Average(sensorTags,starttime,endtime,time_interval)
+    df            = role_frame(df, tags)
+    return df
+
+def sample_seconds(df, default=10.0):
+    """Seconds between the rows of a loop frame, from its time column."""
+    if "time" not in df or len(df) < 2:
+        return default
+    step = pd.to_datetime(df["time"]).diff().median()
+    return step.total_seconds() if pd.notna(step) and step.total_seconds() > 0 else default
+
+def off_setpoint(setpoint, measurement, tolerance=0.03):
+    """Samples where measurement is outside detect_issues' settling band around setpoint."""
+    with np.errstate(invalid="ignore"):
+        return np.abs(measurement - setpoint) > np.abs(setpoint) * tolerance
+
+def analyse_loop(df, closedloop, openLoop, compact=False, max_points=None, downsample="minmax", strategy="heuristic", models=None,
+                 oscillation="zero_crossing"):
+    """
+    Runs detection, suggestion and simulation on one loop frame from fetch_loop_frame.
+
+    Returns:
+        tuple: (percentages, data) where data is the plot response for the dominant
+        issue, or None when no issue is above the 3% threshold. compact=True returns
+        it in the compact format of plot_format.py; max_points decimates the plotted
+        series with downsample.py. strategy and models are passed to suggest_tuning,
+        oscillation (a detection.OSCILLATION_METHODS entry) to detect_issues.
+    """
+    pid1_setpoint = "setpointPrimary"
+    pid1_meas = "measureValuePrimary"
+    pid2_setpoint = "measureValueSecondary"
+    pid2_meas = "measureValueSecondary"
+    control_valve = "controlvalveSecondary"
+    
+    
+    cv_low = df[control_valve].mean() - df[control_valve].std()
+    cv_high = df[control_valve].mean() + df[control_valve].std()
+    # All five detectors in one pass; only the dominant issue is turned into a frame below
+    issues = detect_issues(df, pid1_setpoint, pid1_meas, pid2_setpoint, pid2_meas, control_valve, cv_low,
+                           oscillation=oscillation, dt=sample_seconds(df))
+    # Valve stiction and saturation of PID2's valve, see valve.py
+    valve = valve_diagnostics(df[control_valve].to_numpy(dtype=float), df[pid2_meas].to_numpy(dtype=float), sample_seconds(df),
+                              off_setpoint(df[pid1_setpoint].to_numpy(dtype=float), df[pid1_meas].to_numpy(dtype=float)))
+    valve_positions = np.union1d(*valve_rows(valve).values())
+    # tuning_suggestions = suggest_tuning(overshoot_pid1,undershoot_pid1, sluggish_pid2, settling_time_pid1, oscillations_pid1, df)
+    valvePercentage=0
+    oscillationPercentage=0
+    overshootPercentage=0
+    undershootPercentage=0
+    SettlingTimePercentage=0
+    if len(valve_positions):
+        valvePercentage=(len(valve_positions)/len(df))*100
+    if len(issues["oscillations"]):
+        oscillationPercentage= (len(issues["oscillations"])/len(df))*100
+    if len(issues["overshoot"]):
+        overshootPercentage=(len(issues["overshoot"])/len(df))*100
+    if len(issues["undershoot"]):
+        undershootPercentage=(len(issues["undershoot"])/len(df))*100
+    if len(issues["settling"]):
+        SettlingTimePercentage=(len(issues["settling"])/len(df))*100
+
+    # The valve comes first: a sticking valve also shows as oscillation, and wins a tie
+    percentages = {
+        "valvePercentage": valvePercentage,
+        "oscillationPercentage": oscillationPercentage,
+        "overshootPercentage": overshootPercentage,
+        "undershootPercentage": undershootPercentage,
+        "SettlingTimePercentage": SettlingTimePercentage
+    }
+
+    # Find the variable with the highest percentage that is above 40%
+    selected_variable = max(percentages, key=percentages.get)
+    max_value = percentages[selected_variable]
+    data = None
+    # If no variable is above 40%, select df
+    if max_value <= 3:
+        selected_variable = None
+        #data=prepare_issue_plot_data(df,issue_df, pid_meas, pid_setpoint,closedloop,openLoop,tuning_suggestions, title, color, label, tolerance=0.03)
+        
+    else :
+        if selected_variable == "valvePercentage":
+             valve_pid2 = issue_frame(df, "valve", valve_positions, pid1_setpoint, pid1_meas, control_valve, cv_high, cv_low)
+             tuning_suggestions=suggest_tuning("valve", valve_pid2, closedloop, openLoop, strategy, models, valve=summarise_valves(valve)[0])
+             data=prepare_issue_plot_data(df, valve_pid2, pid1_meas, pid1_setpoint,closedloop,openLoop,tuning_suggestions, "PID2 control valve", "brown", "Valve", compact=compact, max_points=max_points, downsample=downsample, issue_positions=valve_positions)
+        elif selected_variable == "oscillationPercentage":
+             oscillations_pid1 = issue_frame(df, "oscillations", issues["oscillations"], pid1_setpoint, pid1_meas, control_valve, cv_high, cv_low)
+             tuning_suggestions=suggest_tuning("oscillations", oscillations_pid1, closedloop, openLoop, strategy, models)
+             data=prepare_issue_plot_data(df, oscillations_pid1, pid1_meas, pid1_setpoint,closedloop,openLoop,tuning_suggestions, "PID1 Oscillations", "cyan", "Oscillation", compact=compact, max_points=max_points, downsample=downsample, issue_positions=issues["oscillations"])
+        elif selected_variable == "overshootPercentage":
+             overshoot_pid1 = issue_frame(df, "overshoot", issues["overshoot"], pid1_setpoint, pid1_meas, control_valve, cv_high, cv_low)
+             tuning_suggestions=suggest_tuning("overshoot", overshoot_pid1, closedloop, openLoop, strategy, models)
+             data=prepare_issue_plot_data(df, overshoot_pid1, pid1_meas, pid1_setpoint,closedloop,openLoop,tuning_suggestions,"PID1 overshoot", "red", "overshoot", compact=compact, max_points=max_points, downsample=downsample, issue_positions=issues["overshoot"])
+    
+        elif selected_variable == "undershootPercentage":
+             undershoot_pid1 = issue_frame(df, "undershoot", issues["undershoot"], pid1_setpoint, pid1_meas, control_valve, cv_high, cv_low)
+             tuning_suggestions=suggest_tuning("undershoot", undershoot_pid1, closedloop, openLoop, strategy, models)
+             data=prepare_issue_plot_data(df, undershoot_pid1, pid1_meas, pid1_setpoint,closedloop,openLoop,tuning_suggestions, "PID1 undershoot", "orange", "undershoot", compact=compact, max_points=max_points, downsample=downsample, issue_positions=issues["undershoot"])
+        elif selected_variable == "SettlingTimePercentage":
+             settling_time_pid1 = issue_frame(df, "settling", issues["settling"], pid1_setpoint, pid1_meas, control_valve, cv_high, cv_low)
+             tuning_suggestions=suggest_tuning("settling", settling_time_pid1, closedloop, openLoop, strategy, models)
+             data=prepare_issue_plot_data(df, settling_time_pid1, pid1_meas, pid1_setpoint,closedloop,openLoop,tuning_suggestions, "PID1 settling time", "purple", "settlingtime", compact=compact, max_points=max_points, downsample=downsample, issue_positions=issues["settling"])
+
+    return percentages, data
+
+# The background scheduler, see SCHEDULER_PERIOD above. It is handed this module's
+# fetch and analysis so it shares PI_CACHE and the PI session with live requests.
+SCHEDULER = HealthScheduler(
+    fetch_loop_frame,
+    analyse_loop,
+    period=SCHEDULER_PERIOD or 300,
+    batch_size=int(os.environ.get("SCHEDULER_BATCH", 0)) or None,
+    max_concurrency=int(os.environ.get("SCHEDULER_CONCURRENCY", 2)),
+)
+
+def request_endtime(data):
+    # "asof" lets a replay against the history store analyse a past window; live
+    # requests always end now.
+    return pd.Timestamp(data["asof"]).to_pydatetime() if data.get("asof") else datetime.now()
+
+def request_asof(data):
+    """The end of a replayed window, None for a live request."""
+    return request_endtime(data) if data.get("asof") else None
+
+REQUEST_INTERVAL = '10s'
+# Oscillation detector of loop requests that do not pick one with "oscillation"
+OSCILLATION_METHOD = os.environ.get("OSCILLATION_METHOD", "zero_crossing")
+
+def result_key(path, data):
+    """
+    RESULT_CACHE key for a loop request: the route, the interval, the time bucket the
+    window ends in, and the whole request body (tags, gains, format, maxPoints...).
+    """
+    bucket = pd.Timestamp(request_endtime(data)).floor(REQUEST_INTERVAL)
+    return path, REQUEST_INTERVAL, bucket, json.dumps(data, sort_keys=True, default=str)
+
+def cached_response(path, data, build):
+    """Returns the stored response for this request, or builds, stores and returns it."""
+    key  = result_key(path, data)
+    body = RESULT_CACHE.get(key)
+    if body is None:
+        body = app.json.response(build()).get_data()
+        RESULT_CACHE.put(key, body)
+    return app.response_class(body, mimetype=app.json.mimetype)
+
+# Each loop request is split into its PI side (fetch_request_frame) and its CPU side
+# (pid_response / autotune_response), so asgi.py can await the first on an I/O pool
+# and hand the second to a process pool.
+def fetch_request_frame(data):
+    """Fetches the 8 h loop frame a /fetchPISummaries or /autotune request asks for."""
+    if not data.get("asof"):
+        df        = SCHEDULER.recent_frame(data["tags"], max_age=SCHEDULER_MAX_AGE)
+        if df is not None:
+            return df
+    endtime       = request_endtime(data)
+    starttime     = endtime - timedelta(hours=8)
+    time_interval = REQUEST_INTERVAL
+    #starttime = data['starttime']
+    #endtime = data['endtime'] 
+    return fetch_loop_frame(data["tags"],starttime,endtime,time_interval)
+
+def pid_analysis(df, data):
+    """
+    Runs analyse_loop with the options of a /fetchPISummaries request body.
+
+    Returns:
+        tuple: (percentages, response) as from analyse_loop.
+    """
+    closedloop    = data["closedloop"]
+    openLoop      = data["open_loop"] 
+    print("***********openloop*************")
+    print(openLoop)
+    print("***********closedloop*************")
+    print(closedloop)
+    compact       = data.get("format") == "compact"  # see plot_format.py
+    max_points    = data.get("maxPoints")  # chart width in pixels, see downsample.py
+    downsample    = data.get("downsample", "minmax")
+    strategy      = data.get("tuning", "heuristic")  # or a rule in tuning_rules.py, see with_models
+    oscillation   = data.get("oscillation", OSCILLATION_METHOD)  # see detection.detect_issues
+    return analyse_loop(df, closedloop, openLoop, compact=compact, max_points=max_points, downsample=downsample,
+                        strategy=strategy, models=data.get("models"), oscillation=oscillation)
+
+def with_models(data):
+    """
+    Adds the cached process models of data["pidPath"] to a request that asks for a
+    tuning rule ("tuning": "simc", ...), so they travel with the body to the worker
+    processes. Loops without a valid model keep the heuristic suggestions; see
+    /identifyModels.
+    """
+    if data.get("tuning") in RULES and "models" not in data and data.get("pidPath"):
+        models = usable_models(MODEL_CACHE.get(data["pidPath"], request_asof(data)))
+        if models is not None:
+            return dict(data, models=models)
+    return data
+
+def pid_response(df, data):
+    """Builds the /fetchPISummaries response for a frame from fetch_request_frame."""
+    percentages, response = pid_analysis(df, data)
+    return response
+
 # API FOR SENDING RESPONSE AS PER THE STRUCTURE TO PLOT IN UI
 #@app.route('/'+BRANCH_NAME+'/api/v1/pidinfo', methods=['POST'])
 @app.route('/fetchPISummaries', methods=['POST'])
 def getpid():
     try:
         # Get the JSON data from the request
-        data          = request.json
-        endtime       = datetime.now()
-        starttime     = endtime - timedelta(hours=8)
-        time_interval = '10s'
-        #starttime = data['starttime']
-        #endtime = data['endtime'] 
-        closedloop    = data["closedloop"]
-        openLoop      = data["open_loop"] 
-        print("***********openloop*************")
-        print(openLoop)
-        print("***********closedloop*************")
-        print(closedloop)
-        sensorTags    = [v for k,v in data["tags"].items()]
-        print("sensorTags")
-        print(sensorTags)
-        #df           = getpiddata(sensorTags,starttime,endtime)
-        df            = OPMS_Average(sensorTags,starttime,endtime,time_interval)
-
-        for col in df.columns:
-            if col != "time":
-                fdf= {v:k for k,v in data["tags"].items() if k!= v}
-                df= df.rename(columns=fdf)
-        
-        print(df.columns)
-        pid1_setpoint = "setpointPrimary"
-        pid1_meas = "measureValuePrimary"
-        pid2_setpoint = "measureValueSecondary"
-        pid2_meas = "measureValueSecondary"
-        control_valve = "controlvalveSecondary"
-        
-        
-        cv_low = df[control_valve].mean() - df[control_valve].std()
-        cv_high = df[control_valve].mean() + df[control_valve].std()
-        overshoot_pid1 = detect_overshoot(df, pid1_setpoint, pid1_meas, control_valve,cv_high,cv_low)
-        undershoot_pid1= detect_undershoot(df, pid1_setpoint, pid1_meas,control_valve,cv_high,cv_low) 
-        sluggish_pid2 = detect_sluggish_response(df, pid2_setpoint, pid2_meas, control_valve,cv_low)
-        settling_time_pid1 = detect_settling_time(df, pid1_setpoint, pid1_meas)
-        oscillations_pid1 = detect_oscillations(df, pid1_meas)
-        # tuning_suggestions = suggest_tuning(overshoot_pid1,undershoot_pid1, sluggish_pid2, settling_time_pid1, oscillations_pid1, df)
-        print("len of df")
-        print(len(df))
-        print(":::::::::::::::::::::::::################################")
-        oscillationPercentage=0
-        overshootPercentage=0
-        undershootPercentage=0
-        SettlingTimePercentage=0
-        if not oscillations_pid1.empty:
-            print("oscillations present")
-            print(len(oscillations_pid1))
-            oscillationPercentage= (len(oscillations_pid1)/len(df))*100
-        if not overshoot_pid1.empty:
-            print("overshoot_pid1 present")
-            print(len(overshoot_pid1))
-            overshootPercentage=(len(overshoot_pid1)/len(df))*100
-        if not undershoot_pid1.empty:
-            print("undershoot_pid1 present")
-            print(len(undershoot_pid1))
-            undershootPercentage=(len(undershoot_pid1)/len(df))*100
-        if not settling_time_pid1.empty:
-            print("settling_time_pid1 present")
-            print(len(settling_time_pid1))
-            SettlingTimePercentage=(len(settling_time_pid1)/len(df))*100
-    
-        percentages = {
-            "oscillationPercentage": oscillationPercentage,
-            "overshootPercentage": overshootPercentage,
-            "undershootPercentage": undershootPercentage,
-            "SettlingTimePercentage": SettlingTimePercentage
+        data          = with_models(request.json)
+        return cached_response("/fetchPISummaries", data, lambda: pid_response(fetch_request_frame(data), data)),200
+                 
+    except NoGoodData as e:
+        return jsonify(no_good_data_error(e, data)), 400
+    except Exception as e:
+        traceback.print_exc()
+        return jsonify({"error": str(e)}), 500
+
+
+# API FOR OPTIMIZER-DRIVEN AUTO-TUNING OF ONE LOOP
+# Each PID is searched with its own wall-clock budget, so the UI gets an answer in
+# roughly len(pids) * time_budget seconds after the PI fetch.
+AUTOTUNE_MAX_TIME_BUDGET = 10.0
+AUTOTUNE_MAX_EVALS = 2000
+
+def autotune_response(df, data):
+    """Builds the /autotune response for a frame from fetch_request_frame."""
+    closedloop    = data["closedloop"]
+    openLoop      = data["open_loop"]
+    pids          = data.get("pids", ["PID1", "PID2"])
+    objective     = data.get("objective", "iae")
+    max_evals     = min(int(data.get("max_evals", 400)), AUTOTUNE_MAX_EVALS)
+    time_budget   = min(float(data.get("time_budget", 3.0)), AUTOTUNE_MAX_TIME_BUDGET)
+
+    loops = {
+        "PID1": ("setpointPrimary", "measureValuePrimary", openLoop, "open_loop"),
+        "PID2": ("setpointSecondary", "measureValueSecondary", closedloop, "closed_loop"),
+    }
+    response = {
+        "parameters": {"closed_loop": closedloop, "open_loop": openLoop},
+        "suggestedParameters": {},
+        "results": {},
+    }
+    for pid in pids:
+        setpoint_col, meas_col, current, key = loops[pid]
+        gains = [float(current[k]) for k in ("kp", "ki", "kd")]
+        result = autotune_pid(
+            df[setpoint_col].ffill().bfill().to_numpy(),
+            initial_value(df, meas_col),
+            gains,
+            objective=objective,
+            max_evals=max_evals,
+            time_budget=time_budget,
+        )
+        logger.info("%s autotune %s", pid, result)
+        response["suggestedParameters"][key] = {
+            "kp": round(result["kp"], 3), "ki": round(result["ki"], 3), "kd": round(result["kd"], 3)
         }
+        response["results"][pid] = result
+    return response
 
-        # Find the variable with the highest percentage that is above 40%
-        selected_variable = max(percentages, key=percentages.get)
-        max_value = percentages[selected_variable]
-        print("selectedvariable",selected_variable)
-        print("max_value",max_value)
-        # If no variable is above 40%, select df
-        if max_value <= 3:
-            selected_variable = None
-            #data=prepare_issue_plot_data(df,issue_df, pid_meas, pid_setpoint,closedloop,openLoop,tuning_suggestions, title, color, label, tolerance=0.03)
-            print("No issue detected, in last 8 hours")
-            
-        else :
-            if selected_variable == "oscillationPercentage":
-                 selected_variable = oscillations_pid1
-                 print("oscillations_pid1")
-                 print(oscillations_pid1.columns)
-                 tuning_suggestions=suggest_tuning("oscillations", oscillations_pid1, closedloop, openLoop)
-                 data=prepare_issue_plot_data(df, selected_variable, pid1_meas, pid1_setpoint,closedloop,openLoop,tuning_suggestions, "PID1 Oscillations", "cyan", "Oscillation")
-            elif selected_variable == "overshootPercentage":
-                 print("overshootPercentage")
-                 selected_variable = overshoot_pid1
-                 tuning_suggestions=suggest_tuning("overshoot", overshoot_pid1, closedloop, openLoop)
-                 data=prepare_issue_plot_data(df, selected_variable, pid1_meas, pid1_setpoint,closedloop,openLoop,tuning_suggestions,"PID1 overshoot", "red", "overshoot")
-        
-            elif selected_variable == "undershootPercentage":
-                 print("undershootPercentage")
-                 selected_variable = undershoot_pid1
-                 tuning_suggestions=suggest_tuning("undershoot", undershoot_pid1, closedloop, openLoop)
-                 data=prepare_issue_plot_data(df, selected_variable, pid1_meas, pid1_setpoint,closedloop,openLoop,tuning_suggestions, "PID1 undershoot", "orange", "undershoot")
-            elif selected_variable == "SettlingTimePercentage":
-                 print("SettlingTimePercentage")
-                 selected_variable = settling_time_pid1
-                 tuning_suggestions=suggest_tuning("settling", settling_time_pid1, closedloop, openLoop)
-                 data=prepare_issue_plot_data(df, selected_variable, pid1_meas, pid1_setpoint,closedloop,openLoop,tuning_suggestions, "PID1 settling time", "purple", "settlingtime")
+@app.route('/autotune', methods=['POST'])
+def autotune():
+    try:
+        data          = request.json
+        return cached_response("/autotune", data, lambda: autotune_response(fetch_request_frame(data), data)),200
+
+    except NoGoodData as e:
+        return jsonify(no_good_data_error(e, data)), 400
+    except Exception as e:
+        traceback.print_exc()
+        return jsonify({"error": str(e)}), 500
 
-            
 
+# API FOR WHAT-IF REPLAYS OF BOTH PIDS OF A LOOP TOGETHER
+# Body: a /fetchPISummaries body plus "models": {"inner": <valve -> secondary>,
+# "outer": <secondary -> primary>}, each {"gain", "tau", "dead_time", "tau2"} in
+# seconds (see cascade.process_model), or a "pidPath" to use its identified models
+# (see /identifyModels), and optionally "scenarios": a list of
+# {"closed_loop": ..., "open_loop": ...} gain sets, "valve": {"limits", "rate"} and
+# "substeps". The recorded setpointPrimary is replayed through the current gains and
+# every scenario in one vectorized run.
+CASCADE_MAX_SCENARIOS = 500
+
+def cascade_response(df, data):
+    """Builds the /simulateCascade response for a frame from fetch_request_frame."""
+    current       = {"closed_loop": data["closedloop"], "open_loop": data["open_loop"]}
+    scenarios     = [current] + list(data.get("scenarios", []))[:CASCADE_MAX_SCENARIOS]
+    if "models" in data:
+        models    = {key: process_model(**data["models"][key]) for key in ("inner", "outer")}
+    else:
+        identified = usable_models(loop_models([data["pidPath"]], request_asof(data))[data["pidPath"]])
+        if identified is None:
+            raise ValueError(f"No process model fits {data['pidPath']} well enough, pass \"models\"")
+        models    = {key: process_model(*(identified[key][k] for k in ("gain", "tau", "dead_time", "tau2")))
+                     for key in ("inner", "outer")}
+    valve         = data.get("valve", {})
+    gains         = lambda key: [[float(s[key][k]) for k in ("kp", "ki", "kd")] for s in scenarios]
+
+    setpoint      = df["setpointPrimary"].ffill().bfill()
+    responses, metrics = simulate_cascade(
+        setpoint.to_numpy(),
+        gains("open_loop"),
+        gains("closed_loop"),
+        models["inner"],
+        models["outer"],
+        dt=pd.to_timedelta(REQUEST_INTERVAL).total_seconds(),
+        substeps=int(data.get("substeps", 1)),
+        initial_primary=initial_value(df, "measureValuePrimary"),
+        initial_secondary=initial_value(df, "measureValueSecondary"),
+        initial_valve=initial_value(df, "controlvalveSecondary"),
+        valve_limits=tuple(valve.get("limits", (0.0, 100.0))),
+        valve_rate=valve.get("rate"),
+    )
 
-        return jsonify(data),200
-                 
+    rows          = downsample_rows(responses["primary"][0], data.get("maxPoints"))
+    series        = lambda values: [round(float(v), 4) for v in values[rows]]
+    finite        = lambda value: float(value) if np.isfinite(value) else None
+    return {
+        "time": pd.to_datetime(df["time"]).iloc[rows].dt.strftime('%Y-%m-%d %H:%M:%S').tolist(),
+        "setpoint": json_values(setpoint.iloc[rows]),
+        "measured": json_values(df["measureValuePrimary"].iloc[rows]),
+        "scenarios": [
+            {
+                "parameters": scenario,
+                "metrics": {name: finite(values[i]) for name, values in metrics.items()},
+                "series": {name: series(values[i]) for name, values in responses.items()},
+            }
+            for i, scenario in enumerate(scenarios)
+        ],
+    }
+
+@app.route('/simulateCascade', methods=['POST'])
+def simulate_cascade_route():
+    try:
+        data          = request.json
+        return cached_response("/simulateCascade", data, lambda: cascade_response(fetch_request_frame(data), data)),200
+
+    except NoGoodData as e:
+        return jsonify(no_good_data_error(e, data)), 400
     except Exception as e:
         traceback.print_exc()
         return jsonify({"error": str(e)}), 500
 
 
+# API FOR THE PROCESS MODELS OF EACH LOOP (SYSTEM IDENTIFICATION)
+# Body: {"pidPaths": [...] (default every loop), "asof": ..., "refresh": bool}. Loops
+# with a still-valid model in MODEL_CACHE are answered from it; the rest have their
+# last IDENTIFICATION_DAYS fetched in one batched call and identified. A replay (asof)
+# has its models cached under its window end, apart from the live ones.
+def loop_models(pid_paths, asof=None, refresh=False):
+    """Returns pid path -> MODEL_CACHE entry, identifying the loops that have none."""
+    configs       = SCHEDULER.loops()
+    endtime       = asof or datetime.now()
+    models        = {} if refresh else {p: MODEL_CACHE.get(p, asof) for p in pid_paths}
+    missing       = {p: configs[p]["tags"] for p in pid_paths if models.get(p) is None}
+    if missing:
+        starttime = endtime - timedelta(days=IDENTIFICATION_DAYS)
+        # Days of history would push the recent buckets out of PI_CACHE, so bypass it
+        frames    = split_loops(PI_FETCH(loop_tags(missing), starttime, endtime, REQUEST_INTERVAL), missing)
+        dt        = pd.to_timedelta(REQUEST_INTERVAL).total_seconds()
+        for pid_path, df in frames.items():
+            models[pid_path] = MODEL_CACHE.put(pid_path, identify_loop(quality_mask(df)[0], dt), asof)
+            logger.info("%s identified %s", pid_path, models[pid_path])
+    return models
+
+@app.route('/identifyModels', methods=['POST'])
+def identify_models():
+    try:
+        data          = request.json or {}
+        pid_paths     = data.get("pidPaths") or list(SCHEDULER.loops())
+        return jsonify(loop_models(pid_paths, request_asof(data), refresh=data.get("refresh", False))),200
+
+    except KeyError as e:
+        return jsonify({"error": f"Unknown pidPath {e}"}), 400
+    except Exception as e:
+        traceback.print_exc()
+        return jsonify({"error": str(e)}), 500
+
+
+# API FOR PLANT-WIDE RETUNE PROPOSALS FROM THE CLOSED-FORM TUNING RULES
+# Body: {"pidPaths": [...] (default every loop), "asof": ..., "rules": [...] (default
+# all of tuning_rules.RULES), "time_unit": seconds per ki / kd time unit (default
+# PID_TIME_UNIT)}. Every loop with a usable identified model is tuned in one vectorized
+# pass; each set of gains carries the time_unit it is in.
+@app.route('/tuningRules', methods=['POST'])
+def tuning_rules_route():
+    try:
+        data          = request.json or {}
+        pid_paths     = data.get("pidPaths") or list(SCHEDULER.loops())
+        rules         = tuple(data.get("rules", RULES))
+        if not set(rules) <= set(RULES):
+            return jsonify({"error": f"Unknown tuning rule, expected some of {RULES}"}), 400
+        models        = {p: usable_models(entry) for p, entry in loop_models(pid_paths, request_asof(data)).items()}
+        tuned         = tune_loops(models, rules=rules, time_unit=float(data.get("time_unit", PID_TIME_UNIT)))
+        # null for loops without a usable model
+        return jsonify({
+            pid_path: {
+                rule: {"open_loop": pids["PID1"], "closed_loop": pids["PID2"]} for rule, pids in tuned[pid_path].items()
+            } if pid_path in tuned else None
+            for pid_path in pid_paths
+        }),200
+
+    except KeyError as e:
+        return jsonify({"error": f"Unknown pidPath {e}"}), 400
+    except Exception as e:
+        traceback.print_exc()
+        return jsonify({"error": str(e)}), 500
+
+
+# Plant-wide routes stack one role of every loop into a (loops, T) array so a single
+# vectorized call analyses the whole plant
+def stack_roles(frames, pid_paths, roles):
+    """Rows of frames[pid_path][role] for every pid path, then role; NaN-padded to one length."""
+    length        = max((len(df) for df in frames.values()), default=0)
+    signals       = np.full((len(pid_paths) * len(roles), length), np.nan)
+    for i, (pid_path, role) in enumerate((p, r) for p in pid_paths for r in roles):
+        if role in frames[pid_path]:
+            values = frames[pid_path][role].to_numpy(dtype=float)
+            signals[i, :len(values)] = values
+    return signals
+
+def window_times(df, window):
+    """Turns a [start, end) window of row positions into [first, last] timestamps of df."""
+    if window is None or "time" not in df or not len(df):
+        return window
+    times         = df["time"].astype(str)
+    return [times.iloc[min(window[0], len(df) - 1)], times.iloc[min(window[1], len(df)) - 1]]
+
+# API FOR THE PLANT-WIDE OSCILLATION SCAN (SPECTRAL)
+# Body: {"pidPaths": [...] (default every loop), "asof": ..., "hours": 8, "roles": [...]
+# (default OSCILLATION_ROLES), "window" / "hop" (seconds), "min_confidence"}. The tags of
+# all loops are fetched in one batched call and scanned by spectral.oscillation_scan in
+# one pass; each loop and role gets its most confident window.
+OSCILLATION_ROLES = ["measureValuePrimary", "measureValueSecondary", "controlvalveSecondary"]
+
+@app.route('/oscillationScan', methods=['POST'])
+def oscillation_scan_route():
+    try:
+        data          = request.json or {}
+        configs       = SCHEDULER.loops()
+        pid_paths     = data.get("pidPaths") or list(configs)
+        roles         = data.get("roles", OSCILLATION_ROLES)
+        endtime       = request_endtime(data)
+        starttime     = endtime - timedelta(hours=float(data.get("hours", 8)))
+        frames        = fetch_loop_frames({p: configs[p]["tags"] for p in pid_paths}, starttime, endtime, REQUEST_INTERVAL)
+        dt            = pd.to_timedelta(REQUEST_INTERVAL).total_seconds()
+        options       = {k: float(data[k]) for k in ("window", "hop", "min_confidence") if k in data}
+        summaries     = iter(summarise_scan(oscillation_scan(stack_roles(frames, pid_paths, roles), dt, **options)))
+
+        report        = {}
+        for pid_path in pid_paths:
+            report[pid_path] = {}
+            for role in roles:
+                summary = next(summaries)
+                summary["window"] = window_times(frames[pid_path], summary["window"])
+                report[pid_path][role] = summary
+        return jsonify(report),200
+
+    except KeyError as e:
+        return jsonify({"error": f"Unknown pidPath {e}"}), 400
+    except Exception as e:
+        traceback.print_exc()
+        return jsonify({"error": str(e)}), 500
+
+
+# API FOR THE PLANT-WIDE VALVE DIAGNOSTICS
+# Body: {"pidPaths": [...] (default every loop), "asof": ..., "hours": 8, "limits":
+# [low, high] (valve travel in %), "margin": %}. Every loop's controlvalveSecondary and
+# measureValueSecondary are fetched in one batched call and diagnosed together by
+# valve.valve_diagnostics: saturation, travel, reversals and stiction. The closed limit
+# counts as saturated only while measureValuePrimary is off setpointPrimary.
+@app.route('/valveDiagnostics', methods=['POST'])
+def valve_diagnostics_route():
+    try:
+        data          = request.json or {}
+        configs       = SCHEDULER.loops()
+        pid_paths     = data.get("pidPaths") or list(configs)
+        endtime       = request_endtime(data)
+        starttime     = endtime - timedelta(hours=float(data.get("hours", 8)))
+        frames        = fetch_loop_frames({p: configs[p]["tags"] for p in pid_paths}, starttime, endtime, REQUEST_INTERVAL)
+        dt            = pd.to_timedelta(REQUEST_INTERVAL).total_seconds()
+        options       = {"limits": tuple(map(float, data["limits"]))} if "limits" in data else {}
+        if "margin" in data:
+            options["margin"] = float(data["margin"])
+        off           = off_setpoint(stack_roles(frames, pid_paths, ["setpointPrimary"]),
+                                     stack_roles(frames, pid_paths, ["measureValuePrimary"]))
+        diagnostics   = valve_diagnostics(stack_roles(frames, pid_paths, ["controlvalveSecondary"]),
+                                          stack_roles(frames, pid_paths, ["measureValueSecondary"]), dt, off, **options)
+
+        report        = {}
+        for pid_path, summary in zip(pid_paths, summarise_valves(diagnostics)):
+            if summary["stiction"]:
+                summary["stiction"]["window"] = window_times(frames[pid_path], summary["stiction"]["window"])
+            report[pid_path] = summary
+        return jsonify(report),200
+
+    except KeyError as e:
+        return jsonify({"error": f"Unknown pidPath {e}"}), 400
+    except Exception as e:
+        traceback.print_exc()
+        return jsonify({"error": str(e)}), 500
+
+
+# API FOR ANALYSING MANY LOOPS IN ONE REQUEST
+# Body: {"loops": [<a /fetchPISummaries body, optionally with "pidPath">, ...], "asof": ...,
+# "stream": "ndjson" | "json"}. The union of all loops' tags is fetched in one batched
+# PI call (primary and secondary PIDs share tags), the loops are analysed in parallel,
+# and each result is streamed as soon as its loop is done: one line per loop for
+# NDJSON, or the elements of a JSON array.
+@app.route('/fetchPISummariesBatch', methods=['POST'])
+def fetch_pi_summaries_batch():
+    try:
+        data          = request.json
+        loops         = [with_models(loop) for loop in data["loops"]]
+        endtime       = request_endtime(data)
+        starttime     = endtime - timedelta(hours=8)
+        frames        = fetch_loop_frames({str(i): loop["tags"] for i, loop in enumerate(loops)},
+                                          starttime, endtime, REQUEST_INTERVAL)
+        jobs          = [(i, loop, frames[str(i)]) for i, loop in enumerate(loops)]
+    except Exception as e:
+        traceback.print_exc()
+        return jsonify({"error": str(e)}), 500
+
+    results = analyse_loops(jobs, max_workers=data.get("max_workers"))
+    if data.get("stream", "ndjson") == "json":
+        def body():
+            yield "["
+            for n, result in enumerate(results):
+                yield ("," if n else "") + app.json.dumps(result)
+            yield "]"
+        return Response(body(), mimetype="application/json")
+    return Response((app.json.dumps(result) + "\n" for result in results), mimetype="application/x-ndjson")
+
+
+# API FOR THE PLANT-WIDE HEALTH OVERVIEW
+# Every loop in pid-architecture.json is analysed in one call, spread over a process pool.
+@app.route('/fleetScan', methods=['POST'])
+def fleet_scan():
+    try:
+        data          = request.json or {}
+        endtime       = request_endtime(data)
+        starttime     = endtime - timedelta(hours=float(data.get("hours", 8)))
+        time_interval = data.get("time_interval", '10s')
+        report        = scan_fleet(
+            starttime=starttime,
+            endtime=endtime,
+            time_interval=time_interval,
+            max_workers=data.get("max_workers"),
+            fetch_frames=fetch_loop_frames,
+        )
+        logger.info("fleet summary %s", report["summary"])
+        return jsonify(report),200
+
+    except Exception as e:
+        traceback.print_exc()
+        return jsonify({"error": str(e)}), 500
+
+
+# LIVE PUSH OF NEW SAMPLES, ISSUE PERCENTAGES AND ISSUE POINTS (SERVER-SENT EVENTS)
+# Every client watching a loop shares one feed; LIVE_POLL_SECONDS sets how often the
+# feeds fetch their new tail.
+LIVE_HUB = LiveHub(fetch_loop_frame, poll_interval=float(os.environ.get("LIVE_POLL_SECONDS", 10)),
+                   time_interval=REQUEST_INTERVAL)
+
+def live_loops(pid_paths):
+    """Maps the pidPath values of a /liveStream request to their tags; KeyError for unknown ones."""
+    configs = SCHEDULER.loops()
+    if not pid_paths:
+        raise KeyError("pidPath")
+    return {pid_path: configs[pid_path]["tags"] for pid_path in pid_paths}
+
+@app.route('/liveStream', methods=['GET'])
+def live_stream():
+    try:
+        loops         = live_loops(request.args.getlist("pidPath"))
+    except KeyError as e:
+        return jsonify({"error": f"Unknown pidPath {e}"}), 400
+    headers = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    return Response(LIVE_HUB.stream(loops), mimetype="text/event-stream", headers=headers)
+
+
+# HIT / MISS COUNTERS OF THE RESULT CACHE, THE PI BUCKET CACHE AND THE PI SESSION
+@app.route('/cacheStats', methods=['GET'])
+def cache_stats():
+    return jsonify({
+        "results": RESULT_CACHE.stats,
+        "timeseries": PI_CACHE.stats,
+        "pi": PI_CLIENT.stats,
+        "scheduler": SCHEDULER.stats,
+        "live": LIVE_HUB.stats,
+        "models": len(MODEL_CACHE.report()),
+    }),200
+
+
+# LATEST BACKGROUND HEALTH OF EVERY LOOP, FOR THE SUMMARY REPORT
+@app.route('/loopHealth', methods=['GET'])
+def loop_health():
+    try:
+        return jsonify(SCHEDULER.report()),200
+
+    except Exception as e:
+        traceback.print_exc()
+        return jsonify({"error": str(e)}), 500
+
 
 #@app.route('/fetchPISummaries', methods=['POST'])
 def fetch_pi_summaries():
@@ -514,5 +1152,9 @@ def fetch_pi_summaries():
     
 
 if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO)
+    # The debug reloader runs the app in a child process; only that one schedules.
+    if SCHEDULER_PERIOD and os.environ.get("WERKZEUG_RUN_MAIN") == "true":
+        SCHEDULER.start()
     app.run(host='0.0.0.0', port=5000, debug=True)  # Run the Flask app on all interfaces
 
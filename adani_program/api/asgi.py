@@ -0,0 +1,196 @@
+# asgi.py
+# Async serving mode. The loop endpoints are served natively: the PI fetch is awaited
+# on a thread pool and detection, simulation and autotune run on a process pool, so
+# requests from the dashboard, the summary report and the simulator are worked on
+# at the same time instead of one after another. /liveStream is served natively too,
+# so an open event stream holds a coroutine rather than a server thread. Every other
+# route, and the CORS preflight, is passed through to the Flask app in Index1.py.
+#
+#   uvicorn asgi:app --host 0.0.0.0 --port 5000
+import asyncio
+import multiprocessing
+import os
+import traceback
+from   concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from   urllib.parse import parse_qs
+
+from   asgiref.wsgi import WsgiToAsgi
+
+import Index1
+from   live_stream import SSE_KEEPALIVE
+
+
+IO_WORKERS  = int(os.environ.get("ASGI_IO_WORKERS", 16))
+CPU_WORKERS = int(os.environ.get("ASGI_CPU_WORKERS", os.cpu_count() or 1))
+
+
+async def _read_body(receive):
+    body = b""
+    while True:
+        message = await receive()
+        body += message.get("body", b"")
+        if not message.get("more_body"):
+            return body
+
+
+class PIDTunerApp:
+    """
+    ASGI app serving /fetchPISummaries and /autotune concurrently.
+
+    Parameters:
+        flask_app (Flask): App every other route is passed through to.
+        io_workers (int): Threads waiting on PI.
+        cpu_workers (int): Processes running the analysis.
+    """
+
+    def __init__(self, flask_app, io_workers=IO_WORKERS, cpu_workers=CPU_WORKERS):
+        self.flask_app = flask_app
+        self.wsgi = WsgiToAsgi(flask_app)
+        self.io_workers = io_workers
+        self.cpu_workers = cpu_workers
+        self.io_pool = None
+        self.cpu_pool = None
+        # path -> CPU side of the request; the PI side is Index1.fetch_request_frame
+        self.routes = {
+            "/fetchPISummaries": Index1.pid_response,
+            "/autotune": Index1.autotune_response,
+        }
+
+    def pools(self):
+        if self.io_pool is None:
+            self.io_pool = ThreadPoolExecutor(self.io_workers, thread_name_prefix="pi-fetch")
+            # spawn rather than fork: the server process already runs threads
+            self.cpu_pool = ProcessPoolExecutor(self.cpu_workers, mp_context=multiprocessing.get_context("spawn"))
+        return self.io_pool, self.cpu_pool
+
+    def close(self):
+        for pool in (self.io_pool, self.cpu_pool):
+            if pool is not None:
+                pool.shutdown(wait=False, cancel_futures=True)
+        self.io_pool = self.cpu_pool = None
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "lifespan":
+            return await self._lifespan(receive, send)
+        handler = None
+        if scope["type"] == "http" and scope["method"] == "GET" and scope["path"] == "/liveStream":
+            return await self.live_stream(scope, receive, send)
+        if scope["type"] == "http" and scope["method"] == "POST":
+            handler = self.routes.get(scope["path"])
+        if handler is None:
+            return await self.wsgi(scope, receive, send)
+
+        status, body = await self.handle(scope["path"], handler, await _read_body(receive))
+        await send({
+            "type": "http.response.start",
+            "status": status,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode()),
+                (b"access-control-allow-origin", b"*"),
+            ],
+        })
+        await send({"type": "http.response.body", "body": body})
+
+    async def handle(self, path, handler, body):
+        """
+        Runs one loop request: PI fetch on the I/O pool, then handler on the CPU pool.
+        Responses are shared with the Flask routes through Index1.RESULT_CACHE.
+
+        Returns:
+            tuple: (status, JSON body bytes)
+        """
+        try:
+            data = Index1.with_models(self.flask_app.json.loads(body))
+            key = Index1.result_key(path, data)
+            cached = Index1.RESULT_CACHE.get(key)
+            if cached is not None:
+                return 200, cached
+            io_pool, cpu_pool = self.pools()
+            loop = asyncio.get_running_loop()
+            df = await loop.run_in_executor(io_pool, Index1.fetch_request_frame, data)
+            body = self.flask_app.json.dumps(await loop.run_in_executor(cpu_pool, handler, df, data)).encode()
+            Index1.RESULT_CACHE.put(key, body)
+            return 200, body
+        except Index1.NoGoodData as e:
+            return 400, self.flask_app.json.dumps(Index1.no_good_data_error(e, data)).encode()
+        except Exception as e:
+            traceback.print_exc()
+            return 500, self.flask_app.json.dumps({"error": str(e)}).encode()
+
+    async def live_stream(self, scope, receive, send, keepalive=15.0):
+        """Streams Index1.LIVE_HUB updates for the requested loops until the client leaves."""
+        try:
+            loops = Index1.live_loops(parse_qs(scope["query_string"].decode()).get("pidPath", []))
+        except KeyError:
+            return await self.wsgi(scope, receive, send)  # Flask answers with the 400
+
+        hub = Index1.LIVE_HUB
+        loop = asyncio.get_running_loop()
+        messages = asyncio.Queue()
+
+        def deliver(message):  # called on the hub's thread
+            if messages.qsize() >= hub.max_queue:
+                loop.call_soon_threadsafe(messages.put_nowait, None)
+                return False
+            loop.call_soon_threadsafe(messages.put_nowait, message)
+            return True
+
+        async def disconnected():
+            while (await receive())["type"] != "http.disconnect":
+                pass
+
+        io_pool, _ = self.pools()
+        tokens = {}
+        watcher = asyncio.ensure_future(disconnected())
+        try:
+            await send({
+                "type": "http.response.start",
+                "status": 200,
+                "headers": [
+                    (b"content-type", b"text/event-stream"),
+                    (b"cache-control", b"no-cache"),
+                    (b"x-accel-buffering", b"no"),
+                    (b"access-control-allow-origin", b"*"),
+                ],
+            })
+            for pid_path, tags in loops.items():
+                # The first client of a loop waits for its window to be fetched
+                tokens[pid_path], snapshot = await loop.run_in_executor(io_pool, hub.subscribe, pid_path, tags, deliver)
+                await send({"type": "http.response.body", "body": snapshot, "more_body": True})
+            while not watcher.done():
+                getter = asyncio.ensure_future(messages.get())
+                done, _ = await asyncio.wait({getter, watcher}, timeout=keepalive, return_when=asyncio.FIRST_COMPLETED)
+                if getter not in done:
+                    getter.cancel()
+                    if not done:
+                        await send({"type": "http.response.body", "body": SSE_KEEPALIVE, "more_body": True})
+                    continue
+                message = getter.result()
+                if message is None:  # fell too far behind; EventSource will reconnect
+                    break
+                await send({"type": "http.response.body", "body": message, "more_body": True})
+            if not watcher.done():
+                await send({"type": "http.response.body", "body": b""})
+        finally:
+            watcher.cancel()
+            for pid_path, token in tokens.items():
+                hub.unsubscribe(pid_path, token)
+
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                self.pools()
+                if Index1.SCHEDULER_PERIOD:
+                    Index1.SCHEDULER.start()
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                Index1.SCHEDULER.stop()
+                Index1.LIVE_HUB.stop()
+                self.close()
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+
+app = PIDTunerApp(Index1.app)
@@ -0,0 +1,144 @@
+# autotune.py
+import time
+
+import numpy as np
+from   scipy.optimize import minimize
+
+from   simulation import gain_grid, pid_metrics, simulate_pid_array, simulate_pid_batch
+
+
+OBJECTIVES = ("iae", "ise", "overshoot", "settling_time")
+
+
+class _StopSearch(Exception):
+    """Raised from inside the objective to end the optimizer run early."""
+
+    def __init__(self, reason):
+        super().__init__(reason)
+        self.reason = reason
+
+
+def autotune_pid(
+    setpoint,
+    initial_value,
+    initial_gains,
+    dt=0.1,
+    process_gain=0.01,
+    objective="iae",
+    tolerance=0.03,
+    max_evals=400,
+    time_budget=5.0,
+    seed_points=6,
+    max_scale=4.0,
+    patience=60,
+    min_improvement=1e-4,
+):
+    """
+    Searches the (Kp, Ki, Kd) space for the gains that minimise a response metric.
+
+    The search has two stages. A coarse grid of seed_points**3 candidates between 0
+    and max_scale times the current gains is scored in one simulate_pid_batch pass,
+    then Nelder-Mead refines the best seed using the same process model as
+    simulate_pid_response. Every simulated candidate counts against max_evals.
+
+    Parameters:
+        setpoint (array-like): Historical setpoint trace.
+        initial_value (float): Measured value at the first sample.
+        initial_gains (sequence): Current (Kp, Ki, Kd).
+        dt (float): Time interval between samples.
+        process_gain (float): Gain factor simulating process dynamics.
+        objective (str): Metric to minimise, one of OBJECTIVES.
+        tolerance (float): Settling band as a fraction of the setpoint.
+        max_evals (int): Evaluation budget, including the seed grid.
+        time_budget (float): Wall-clock limit in seconds, checked between evaluations.
+        seed_points (int): Grid points per gain in the seeding stage (0 to skip).
+                           Reduced when the grid would use over half of max_evals.
+        max_scale (float): Upper search bound as a multiple of the current gains.
+        patience (int): Stop after this many evaluations without improvement.
+        min_improvement (float): Relative score drop that counts as improvement.
+
+    Returns:
+        dict: Tuned "kp", "ki", "kd", their "score", the "initial_score" of the
+        current gains, "evaluations", "elapsed" seconds and the "stopped" reason
+        ("converged", "max_evals", "time_budget" or "no_improvement").
+    """
+    if objective not in OBJECTIVES:
+        raise ValueError(f"objective must be one of {OBJECTIVES}, got {objective!r}")
+
+    started = time.perf_counter()
+    deadline = started + time_budget
+    setpoint = np.ascontiguousarray(setpoint, dtype=np.float64)
+    x0 = np.maximum(np.asarray(initial_gains, dtype=np.float64), 0.0)
+    upper = np.maximum(x0, 1.0) * max_scale
+    bounds = [(0.0, hi) for hi in upper]
+
+    def score(gains):
+        response = simulate_pid_array(setpoint, initial_value, *gains, dt=dt, process_gain=process_gain)
+        value = pid_metrics(response, setpoint, dt=dt, tolerance=tolerance)[objective]
+        return value if np.isfinite(value) else np.inf
+
+    state = {"evals": 1, "best_x": x0.copy(), "best_score": score(x0), "stale": 0}
+    initial_score = state["best_score"]
+
+    def record(x, value):
+        best = state["best_score"]
+        if value < best and (not np.isfinite(best) or best - value > min_improvement * abs(best)):
+            state["stale"] = 0
+        else:
+            state["stale"] += 1
+        if value < best:
+            state["best_x"], state["best_score"] = np.array(x, dtype=np.float64), value
+
+    # Stage 1: score a coarse grid in a single batched pass.
+    # The grid shrinks so that it never uses more than half of the budget.
+    seed_points = min(seed_points, int(round((max(max_evals - 1, 0) / 2) ** (1 / 3), 6)))
+    if seed_points > 1:
+        axes = [np.linspace(0.0, hi, seed_points) for hi in upper]
+        seeds = gain_grid(*axes)
+        _, metrics = simulate_pid_batch(
+            setpoint, initial_value, seeds, dt=dt, process_gain=process_gain,
+            tolerance=tolerance, return_responses=False,
+        )
+        values = np.where(np.isfinite(metrics[objective]), metrics[objective], np.inf)
+        state["evals"] += len(seeds)
+        best = int(np.argmin(values))
+        if values[best] < state["best_score"]:
+            state["best_x"], state["best_score"] = seeds[best].copy(), float(values[best])
+
+    # Stage 2: Nelder-Mead refinement from the best point so far.
+    stopped = "max_evals"
+    remaining = max_evals - state["evals"]
+    if remaining > 0 and time.perf_counter() < deadline:
+        def objective_fn(x):
+            if time.perf_counter() > deadline:
+                raise _StopSearch("time_budget")
+            if state["stale"] >= patience:
+                raise _StopSearch("no_improvement")
+            value = score(x)
+            state["evals"] += 1
+            record(x, value)
+            return value
+
+        try:
+            result = minimize(
+                objective_fn, state["best_x"], method="Nelder-Mead", bounds=bounds,
+                options={"maxfev": remaining, "xatol": 1e-4, "fatol": 1e-6},
+            )
+            stopped = "converged" if result.success else "max_evals"
+        except _StopSearch as stop:
+            stopped = stop.reason
+    elif remaining > 0:
+        stopped = "time_budget"
+
+    kp, ki, kd = (float(v) for v in state["best_x"])
+    return {
+        "kp": kp,
+        "ki": ki,
+        "kd": kd,
+        "score": float(state["best_score"]),
+        "initial_score": float(initial_score),
+        "objective": objective,
+        "evaluations": state["evals"],
+        "elapsed": time.perf_counter() - started,
+        "stopped": stopped,
+    }
@@ -0,0 +1,225 @@
+# cascade.py
+# Closed-loop simulation of the primary/secondary cascades in pid-architecture.json:
+#
+#   setpointPrimary -> PID1 -> setpointSecondary -> PID2 -> valve -> inner process
+#        ^                          measureValueSecondary <------------'   |
+#        '-- measureValuePrimary <- outer process <-------------------------'
+#
+# Both processes are first- or second-order lags with dead time (FOPDT / SOPDT),
+# discretised with a zero-order hold; dead time is a ring-buffer delay line. The
+# valve saturates and is rate limited, and both controllers stop integrating while
+# their output is held at a limit. Every scenario (gains, models, limits) is a lane
+# of the same NumPy arrays, so a batch costs one pass over time.
+import numpy as np
+
+
+def process_model(gain, tau, dead_time=0.0, tau2=0.0):
+    """
+    Describes a process block: gain * exp(-dead_time s) / ((tau s + 1)(tau2 s + 1)).
+
+    tau2 = 0 gives a FOPDT model, tau2 > 0 a SOPDT one. Every value may be a scalar
+    or a length-N array with one entry per scenario. Times are in seconds.
+    """
+    return {"gain": gain, "tau": tau, "dead_time": dead_time, "tau2": tau2}
+
+
+def _lane(value, n):
+    return np.broadcast_to(np.asarray(value, dtype=np.float64), (n,)).copy()
+
+
+def _gain_rows(gains, n):
+    gains = np.atleast_2d(np.asarray(gains, dtype=np.float64))
+    if gains.shape[1] != 3:
+        raise ValueError("gains must be (Kp, Ki, Kd) or an (N, 3) matrix of them")
+    return np.broadcast_to(gains, (n, 3)).T.copy()
+
+
+class DelayLine:
+    """
+    Ring buffer delaying each lane by its own whole number of steps.
+
+    Parameters:
+        delays (array): Steps of delay per lane.
+        initial (array): Value every lane reads until its delay has filled.
+    """
+
+    def __init__(self, delays, initial):
+        self.delays = np.asarray(delays, dtype=np.int64)
+        self.lanes = np.arange(len(self.delays))
+        self.buffer = np.tile(np.asarray(initial, dtype=np.float64), (int(self.delays.max(initial=0)) + 1, 1))
+        self.position = 0
+
+    def push(self, value):
+        """Stores this step's input; returns the input of `delay` steps ago per lane."""
+        size = len(self.buffer)
+        self.position = (self.position + 1) % size
+        self.buffer[self.position] = value
+        return self.buffer[(self.position - self.delays) % size, self.lanes]
+
+
+class LagProcess:
+    """One FOPDT / SOPDT block per lane, in deviation from its initial steady state."""
+
+    def __init__(self, model, n, step, input0, output0):
+        self.gain = _lane(model["gain"], n)
+        tau, tau2 = _lane(model["tau"], n), _lane(model["tau2"], n)
+        # Zero-order-hold pole of each lag; a lag of 0 s passes its input straight through
+        self.a1 = np.where(tau > 0, np.exp(-step / np.where(tau > 0, tau, 1.0)), 0.0)
+        self.a2 = np.where(tau2 > 0, np.exp(-step / np.where(tau2 > 0, tau2, 1.0)), 0.0)
+        self.delay = DelayLine(np.rint(_lane(model["dead_time"], n) / step), _lane(input0, n))
+        self.input0 = _lane(input0, n)
+        self.output0 = _lane(output0, n)
+        self.x1 = np.zeros(n)
+        self.x2 = np.zeros(n)
+
+    def step(self, value):
+        delayed = self.delay.push(value) - self.input0
+        self.x1 = self.a1 * self.x1 + (1 - self.a1) * self.gain * delayed
+        self.x2 = self.a2 * self.x2 + (1 - self.a2) * self.x1
+        return self.output0 + self.x2
+
+
+class CascadePID:
+    """
+    Positional PID per lane around a bias, with conditional-integration anti-windup.
+
+    The action follows the sign of the process gain, so a loop on a negative-gain
+    process (more spray, lower temperature) is reverse acting.
+    """
+
+    def __init__(self, gains, n, bias, process_gain, integral_limit):
+        self.kp, self.ki, self.kd = _gain_rows(gains, n)
+        self.bias = _lane(bias, n)
+        self.action = np.where(_lane(process_gain, n) < 0, -1.0, 1.0)
+        self.integral_limit = integral_limit
+        self.integral = np.zeros(n)
+        self.previous_error = None
+
+    def update(self, setpoint, measured, step, low=None, high=None):
+        error = setpoint - measured
+        integral = np.clip(self.integral + error * step, -self.integral_limit, self.integral_limit)
+        derivative = 0.0 if self.previous_error is None else (error - self.previous_error) / step
+        self.previous_error = error
+        raw = self.bias + self.action * (self.kp * error + self.ki * integral + self.kd * derivative)
+        output = np.clip(raw, low, high) if low is not None or high is not None else raw
+
+        # Integrate only while the output is free, or while the error drives it back
+        held = (output != raw) & (np.sign(self.action * error) == np.sign(raw - output))
+        self.integral = np.where(held, self.integral, integral)
+        return output
+
+
+def simulate_cascade(
+    setpoint,
+    primary_gains,
+    secondary_gains,
+    inner,
+    outer,
+    dt=10.0,
+    substeps=1,
+    initial_primary=None,
+    initial_secondary=None,
+    initial_valve=50.0,
+    valve_limits=(0.0, 100.0),
+    valve_rate=None,
+    secondary_limits=(None, None),
+    disturbance=None,
+    integral_limit=5000.0,
+    tolerance=0.03,
+    return_responses=True,
+):
+    """
+    Simulates N cascade scenarios against one primary setpoint trace.
+
+    Parameters:
+        setpoint (array-like): setpointPrimary, one value per sample (length T).
+        primary_gains, secondary_gains (array-like): (Kp, Ki, Kd) of PID1 and PID2,
+            one row or an (N, 3) matrix.
+        inner (dict): process_model from the valve to measureValueSecondary.
+        outer (dict): process_model from measureValueSecondary to measureValuePrimary.
+        dt (float): Seconds between samples.
+        substeps (int): Secondary-loop steps per sample; the inner loop of a cascade
+            usually runs faster than the outer one.
+        initial_primary, initial_secondary (float): Steady state at the first sample,
+            setpoint[0] for both if None.
+        initial_valve (float): Valve position at that steady state, in %.
+        valve_limits (tuple): Valve travel limits, in %.
+        valve_rate (float): Largest valve movement in % per second, None for no limit.
+        secondary_limits (tuple): Clamp on the secondary setpoint PID1 may ask for.
+        disturbance (array-like): Load change added to measureValueSecondary, one value
+            per sample, e.g. a step in steam flow; None for none.
+        integral_limit (float): Clamp on both integral terms.
+        tolerance (float): Settling band of the metrics, as a fraction of the setpoint.
+        return_responses (bool): If False, only the metrics are returned.
+
+    Returns:
+        tuple: (responses, metrics). responses is None or a dict of (N, T) arrays:
+        "primary", "secondary", "secondarySetpoint" and "valve". metrics is a dict of
+        length-N arrays: "iae", "ise", "overshoot" and "settling_time" of the primary
+        loop as in simulate_pid_batch, plus "valve_travel" (total % moved) and
+        "valve_saturated" (fraction of samples at a travel limit).
+    """
+    setpoint = np.ascontiguousarray(setpoint, dtype=np.float64)
+    n_samples = setpoint.shape[0]
+    n = max(np.atleast_2d(primary_gains).shape[0], np.atleast_2d(secondary_gains).shape[0],
+            *(np.size(v) for model in (inner, outer) for v in model.values()))
+    substeps = max(int(substeps), 1)
+    step = dt / substeps
+
+    primary0 = float(setpoint[0] if initial_primary is None else initial_primary)
+    secondary0 = float(primary0 if initial_secondary is None else initial_secondary)
+    inner_process = LagProcess(inner, n, step, initial_valve, secondary0)
+    outer_process = LagProcess(outer, n, step, secondary0, primary0)
+    pid1 = CascadePID(primary_gains, n, secondary0, outer["gain"], integral_limit)
+    pid2 = CascadePID(secondary_gains, n, initial_valve, inner["gain"], integral_limit)
+    disturbance = np.zeros(n_samples) if disturbance is None else np.asarray(disturbance, dtype=np.float64)
+    valve_low, valve_high = valve_limits
+    max_move = np.inf if valve_rate is None else valve_rate * step
+
+    primary = np.full(n, primary0)
+    secondary = np.full(n, secondary0)
+    valve = np.full(n, float(initial_valve))
+    if return_responses:
+        responses = {key: np.empty((n_samples, n)) for key in ("primary", "secondary", "secondarySetpoint", "valve")}
+
+    iae, ise, overshoot = np.zeros(n), np.zeros(n), np.zeros(n)
+    last_outside = np.full(n, -1, dtype=np.int64)
+    travel, saturated = np.zeros(n), np.zeros(n)
+    band = np.abs(setpoint) * tolerance
+
+    for i in range(n_samples):
+        secondary_sp = pid1.update(setpoint[i], primary, dt, *secondary_limits)
+        for _ in range(substeps):
+            command = pid2.update(secondary_sp, secondary, step, valve_low, valve_high)
+            moved = np.clip(command - valve, -max_move, max_move)
+            valve = valve + moved
+            travel += np.abs(moved)
+            secondary = inner_process.step(valve) + disturbance[i]
+            primary = outer_process.step(secondary)
+        saturated += (valve <= valve_low) | (valve >= valve_high)
+
+        if return_responses:
+            responses["primary"][i] = primary
+            responses["secondary"][i] = secondary
+            responses["secondarySetpoint"][i] = secondary_sp
+            responses["valve"][i] = valve
+
+        error = primary - setpoint[i]
+        np.maximum(overshoot, error, out=overshoot)
+        iae += np.abs(error) * dt
+        ise += error * error * dt
+        last_outside[np.abs(error) > band[i]] = i
+
+    settling_time = (last_outside + 1) * dt
+    settling_time[(last_outside >= 0) & (last_outside == n_samples - 1)] = np.inf
+    metrics = {
+        "iae": iae,
+        "ise": ise,
+        "overshoot": overshoot,
+        "settling_time": settling_time,
+        "valve_travel": travel,
+        "valve_saturated": saturated / max(n_samples, 1),
+    }
+    if not return_responses:
+        return None, metrics
+    return {key: value.T for key, value in responses.items()}, metrics
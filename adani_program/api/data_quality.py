@@ -0,0 +1,68 @@
+# data_quality.py
+# PI returns "No Good Data For Calculation" (as a string or PIException) for buckets
+# it could not summarise. These helpers turn such values into NaN column by column,
+# so statistics, detectors and the simulator can skip them instead of seeing a
+# numeric sentinel.
+import numpy as np
+import pandas as pd
+
+
+def quality_mask(df, columns=None):
+    """
+    Splits PI values into NaN-safe numeric columns and a good-quality mask.
+
+    Each column is converted in one vectorized pass: anything that is not a finite
+    number (PI error markers, None, inf) becomes NaN.
+
+    Parameters:
+        df (DataFrame): Fetched PI data.
+        columns (list): Columns to clean; every column except 'time' if None.
+
+    Returns:
+        tuple: (clean, mask) where clean is a copy of df with float64 value columns
+        and mask is a boolean DataFrame over the same columns, True where good.
+    """
+    if columns is None:
+        columns = [col for col in df.columns if col != 'time']
+    clean = df.copy()
+    for col in columns:
+        values = df[col]
+        if values.dtype == object:
+            values = pd.to_numeric(values, errors='coerce')
+        values = values.astype(np.float64)
+        clean[col] = values.where(np.isfinite(values))
+    mask = clean[columns].notna()
+    return clean, mask
+
+
+def valid_positions(df, columns):
+    """Returns the integer positions of rows where every given column holds a good value."""
+    return np.flatnonzero(df[columns].notna().all(axis=1).to_numpy())
+
+
+def json_values(series):
+    """Converts a series to a list with None for bad values, which JSON can encode."""
+    return series.astype(object).where(series.notna(), None).tolist()
+
+
+class NoGoodData(ValueError):
+    """A column an analysis needs has no good value in the fetched window."""
+
+    def __init__(self, column):
+        super().__init__(column)
+        self.column = column
+
+    def __str__(self):
+        return f"No good data for {self.column} in the requested window"
+
+
+def first_valid(series):
+    """Returns the first good value of a series, or None if it has none."""
+    valid = series.dropna()
+    return valid.iloc[0] if len(valid) else None
+
+
+def last_valid(series):
+    """Returns the last good value of a series, or None if it has none."""
+    valid = series.dropna()
+    return valid.iloc[-1] if len(valid) else None
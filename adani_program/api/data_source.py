@@ -0,0 +1,228 @@
+# data_source.py
+# Every place loop data can come from, behind one interface: the PI server
+# (pi_client.py), the Kawai readdata HTTP service (readdata_client.py), a wide
+# CSV/Parquet export replayed from disk, and the synthetic signals in fake_pi.py.
+# Each source returns the frame PIDataClient.summaries does, so it can be handed
+# to TimeSeriesCache or used directly by the analysis.
+import os
+import threading
+from   concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from   pi_client import split_loops
+
+
+def role_frame(df, tags):
+    """
+    Renames a frame with one column per tag to the loop's role columns in one step.
+
+    Parameters:
+        df (DataFrame): Time-indexed, or with a 'time' column, one column per tag.
+        tags (dict): role -> tag map, as in pid-architecture.json. Roles whose tag
+            is missing from df are left out; two roles may share a tag.
+
+    Returns:
+        DataFrame: 'time' column followed by one column per role.
+    """
+    if "time" in df.columns:
+        df = df.set_index("time")
+    return split_loops(df, {"loop": tags})["loop"]
+
+
+class DataSource:
+    """
+    Base class for loop data sources.
+
+    Subclasses implement summaries(). fetch() is what callers use: it returns a
+    window started earlier with prefetch() if there is one, so the next window can
+    be read while the current one is analysed.
+
+    Parameters:
+        readahead (int): Windows fetched in the background at once.
+    """
+
+    def __init__(self, readahead=2):
+        self.readahead = readahead
+        self._pool = None
+        self._pending = {}
+        self._lock = threading.Lock()
+
+    def summaries(self, tags, start, end, interval):
+        """Returns a time-indexed frame with one column per tag the source knows."""
+        raise NotImplementedError
+
+    def _key(self, tags, start, end, interval):
+        return tuple(dict.fromkeys(tags)), pd.Timestamp(start), pd.Timestamp(end), interval
+
+    def prefetch(self, tags, start, end, interval):
+        """Starts fetching a window in the background; returns its Future."""
+        key = self._key(tags, start, end, interval)
+        with self._lock:
+            if self._pool is None:
+                self._pool = ThreadPoolExecutor(self.readahead, thread_name_prefix=type(self).__name__)
+            if key not in self._pending:
+                self._pending[key] = self._pool.submit(self.summaries, *key)
+            return self._pending[key]
+
+    def fetch(self, tags, start, end, interval):
+        """summaries(), served from a pending prefetch of the same window if there is one."""
+        with self._lock:
+            future = self._pending.pop(self._key(tags, start, end, interval), None)
+        if future is not None:
+            return future.result()
+        return self.summaries(tags, start, end, interval)
+
+    def loop_frame(self, tags, start, end, interval):
+        """Fetches one loop's {role: tag} map; returns a 'time' column plus role columns."""
+        return role_frame(self.fetch(list(tags.values()), start, end, interval), tags)
+
+    def iter_windows(self, tags, windows, interval):
+        """
+        Yields (start, end, frame) for consecutive windows of one loop, keeping up to
+        readahead windows in flight ahead of the caller.
+
+        Parameters:
+            tags (dict): role -> tag map.
+            windows (iterable): (start, end) pairs.
+        """
+        windows = list(windows)
+        tag_list = list(tags.values())
+        for i, (start, end) in enumerate(windows):
+            for ahead_start, ahead_end in windows[i + 1:i + 1 + self.readahead]:
+                self.prefetch(tag_list, ahead_start, ahead_end, interval)
+            yield start, end, role_frame(self.fetch(tag_list, start, end, interval), tags)
+
+    def close(self):
+        with self._lock:
+            if self._pool is not None:
+                self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+            self._pending.clear()
+
+
+class FetchSource(DataSource):
+    """Wraps a fetch function, e.g. HistoryStore.summaries or HistoryStore.recording(...)."""
+
+    def __init__(self, fetch, readahead=2):
+        super().__init__(readahead)
+        self.fetch_function = fetch
+
+    def summaries(self, tags, start, end, interval):
+        return self.fetch_function(tags, start, end, interval)
+
+
+class PISource(FetchSource):
+    """The PI server, through a shared PIDataClient."""
+
+    def __init__(self, client, readahead=2):
+        super().__init__(client.summaries, readahead)
+        self.client = client
+
+    def close(self):
+        super().close()
+        self.client.close()
+
+
+class ReadDataSource(DataSource):
+    """
+    The Kawai readdata service, through a ReadDataClient.
+
+    readdata returns raw samples, so they are averaged into interval buckets
+    labelled by their start, the way PI summaries are.
+    """
+
+    def __init__(self, client, readahead=2):
+        super().__init__(readahead)
+        self.client = client
+
+    def summaries(self, tags, start, end, interval):
+        df = self.client.fetch(list(dict.fromkeys(tags)), start, end)
+        if df.empty:  # nothing read: no 'time' values to build a DatetimeIndex from
+            return pd.DataFrame(index=pd.DatetimeIndex([], name='time'))
+        df = df.set_index("time").resample(pd.to_timedelta(interval)).mean()
+        df.index.name = 'time'
+        return df
+
+    def close(self):
+        super().close()
+        self.client.close()
+
+
+class FileSource(DataSource):
+    """
+    Replays a wide CSV or Parquet export: a 'time' column plus one column per tag.
+
+    The file is loaded once. A requested interval coarser than the file's own is
+    averaged into buckets; a finer one returns the file's samples as they are.
+    Parquet needs pyarrow or fastparquet.
+    """
+
+    def __init__(self, path, readahead=2):
+        super().__init__(readahead)
+        self.path = path
+        self._frame = None
+        self._step = None
+
+    def frame(self):
+        if self._frame is None:
+            if self.path.lower().endswith((".parquet", ".pq")):
+                df = pd.read_parquet(self.path)
+            else:
+                df = pd.read_csv(self.path)
+            df["time"] = pd.to_datetime(df["time"])
+            df = df.set_index("time").sort_index()
+            self._step = pd.Timedelta(np.median(np.diff(df.index.asi8))) if len(df) > 1 else None
+            self._frame = df
+        return self._frame
+
+    def summaries(self, tags, start, end, interval):
+        df = self.frame()
+        columns = [tag for tag in dict.fromkeys(tags) if tag in df.columns]
+        lo, hi = df.index.searchsorted(pd.Timestamp(start), "left"), df.index.searchsorted(pd.Timestamp(end), "right")
+        window = df.iloc[lo:hi][columns]
+        step = pd.to_timedelta(interval)
+        if self._step is not None and step > self._step:
+            window = window.resample(step).mean()
+        window.index.name = 'time'
+        return window
+
+
+class SyntheticSource(DataSource):
+    """The deterministic per-tag signals of fake_pi.py, without a PI session."""
+
+    def __init__(self, bad_fraction=0.0, latency=0.0, readahead=2):
+        super().__init__(readahead)
+        self.bad_fraction = bad_fraction
+        self.latency = latency
+
+    def summaries(self, tags, start, end, interval):
+        from fake_pi import FakePIPoint
+
+        columns = {tag: FakePIPoint(tag, self.bad_fraction, self.latency).summaries(start, end, interval)["AVERAGE"]
+                   for tag in dict.fromkeys(tags)}
+        df = pd.DataFrame(columns)
+        df.index.name = 'time'
+        return df
+
+
+def open_source(spec, pi_client=None):
+    """
+    Builds a source from a short spec, as used by the DATA_SOURCE setting in Index1.py.
+
+    Parameters:
+        spec (str): "pi", "synthetic", "readdata" or "readdata=<url>", or the path
+            of a .csv / .parquet file.
+        pi_client (PIDataClient): Client for "pi".
+    """
+    if spec == "pi":
+        return PISource(pi_client)
+    if spec == "synthetic":
+        return SyntheticSource()
+    if spec == "readdata" or spec.startswith("readdata="):
+        from readdata_client import READDATA_URL, ReadDataClient
+        return ReadDataSource(ReadDataClient(spec.partition("=")[2] or READDATA_URL))
+    if os.path.splitext(spec)[1].lower() in (".csv", ".parquet", ".pq"):
+        return FileSource(spec)
+    raise ValueError(f"Unknown data source: {spec}")
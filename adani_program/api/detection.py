@@ -0,0 +1,129 @@
+# detection.py
+# Fused issue detection: overshoot, undershoot, sluggish response, settling time and
+# oscillations for one loop from a single set of NumPy arrays. Results are integer row
+# positions into the frame, matching the rows the separate detect_* functions return.
+import numpy as np
+
+from   spectral import oscillation_rows
+
+
+ISSUES = ("overshoot", "undershoot", "sluggish", "settling", "oscillations")
+OSCILLATION_METHODS = ("zero_crossing", "spectral")
+
+
+def _extrema(step):
+    """
+    Returns (peaks, valleys) of x from step = np.diff(x), like find_peaks(x) and
+    find_peaks(-x).
+
+    Runs of equal values are collapsed first, so a flat top or bottom counts once, at
+    the middle of the run (rounded down), as find_peaks reports it. Peaks and valleys
+    alternate, so both come from one search for the runs where the direction turns.
+    """
+    if len(step) < 2:
+        empty = np.empty(0, dtype=np.intp)
+        return empty, empty
+    moves = np.flatnonzero(step != 0)  # moves[i] + 1 starts run i + 1, moves[i + 1] ends it
+    rising = step[moves] > 0
+    turns = np.flatnonzero(rising[1:] != rising[:-1])
+    middle = (moves[turns] + moves[turns + 1] + 1) // 2
+    skip = int(len(turns) > 0 and not rising[turns[0]])  # the first turn is a valley
+    return middle[skip::2], middle[1 - skip::2]
+
+
+def _upper_quantile(counts, q):
+    """np.quantile(counts, q) for small non-negative integers, from a histogram instead of a sort."""
+    cumulative = np.cumsum(np.bincount(counts))
+    position = q * (len(counts) - 1)
+    below = int(position)
+    lo = np.searchsorted(cumulative, below, side="right")
+    hi = np.searchsorted(cumulative, min(below + 1, len(counts) - 1), side="right")
+    return lo + (hi - lo) * (position - below)
+
+
+def _zero_crossing_rows(step, window):
+    # Same as sign(diff) != shift(1), rolling(window).sum() > quantile(0.90) in pandas,
+    # from step = np.diff(x). Counts stay in int8/bool/int32 arrays, not float64.
+    if len(step) + 1 < window:
+        return np.empty(0, dtype=np.intp)
+    direction = (step > 0).view(np.int8) - (step < 0).view(np.int8)
+    changes = np.ones(len(step) + 1, dtype=bool)  # the first two rows compare against NaN
+    np.not_equal(direction[1:], direction[:-1], out=changes[2:])
+    total = np.cumsum(changes, dtype=np.int32)
+    rolling = total[window - 1:].copy()
+    rolling[1:] -= total[:-window]
+    threshold = _upper_quantile(rolling, 0.90)
+    return np.flatnonzero(rolling > threshold) + window - 1
+
+
+def detect_issues(df, pid_setpoint, pid_meas, sluggish_setpoint, sluggish_meas, control_valve,
+                  cv_low, tolerance=0.03, window=10, oscillation="zero_crossing", dt=10.0):
+    """
+    Runs all five detectors over one loop frame.
+
+    Each column is read once into an array; the error signal, the peak and valley
+    indices, the zero-crossing counts and the tolerance-band mask are computed from
+    those arrays without copying the frame.
+
+    Parameters:
+        df (DataFrame): Loop frame from fetch_loop_frame, NaN where quality is bad.
+        pid_setpoint, pid_meas (str): Columns checked for overshoot, undershoot,
+            settling time and oscillations.
+        sluggish_setpoint, sluggish_meas (str): Columns checked for sluggish response.
+        control_valve (str): Control valve column.
+        cv_low (float): Valve opening under which a response counts as sluggish.
+        tolerance (float): Settling band as a fraction of the setpoint.
+        window (int): Rolling window of the zero-crossing count.
+        oscillation (str): "zero_crossing" flags the rows where the rolling count of
+            direction changes is in its top 10%, so some rows are always flagged;
+            "spectral" flags the rows of the windows spectral.oscillation_scan finds a
+            sustained oscillation in, none for a loop that does not oscillate.
+        dt (float): Seconds between samples, for the spectral method.
+
+    Returns:
+        dict: Issue name (see ISSUES) -> sorted integer row positions into df.
+    """
+    setpoint = df[pid_setpoint].to_numpy(dtype=np.float64)
+    meas = df[pid_meas].to_numpy(dtype=np.float64)
+    valve = df[control_valve].to_numpy(dtype=np.float64)
+    error = meas - setpoint
+
+    # Peaks and valleys are searched across bad-quality gaps; NaN error never counts.
+    good = np.flatnonzero(~np.isnan(meas))
+    step = np.diff(meas[good])  # shared by the peak search and the zero-crossing count
+    peaks, valleys = _extrema(step)
+    peaks, valleys = good[peaks], good[valleys]
+
+    if oscillation == "spectral":
+        oscillations = oscillation_rows(meas, dt)
+    elif oscillation == "zero_crossing":
+        oscillations = good[_zero_crossing_rows(step, window)]
+    else:
+        raise ValueError(f"unknown oscillation method {oscillation!r}, expected one of {OSCILLATION_METHODS}")
+
+    sluggish = (df[sluggish_meas].to_numpy(dtype=np.float64) < df[sluggish_setpoint].to_numpy(dtype=np.float64)) & (valve < cv_low)
+
+    return {
+        "overshoot": peaks[error[peaks] > 0],
+        "undershoot": valleys[error[valleys] < 0],
+        "sluggish": np.flatnonzero(sluggish),
+        "settling": np.flatnonzero(np.abs(error) > setpoint * tolerance),
+        "oscillations": oscillations,
+    }
+
+
+def issue_frame(df, issue, positions, pid_setpoint, pid_meas, control_valve, cv_high, cv_low):
+    """
+    Builds the rows of one detected issue as the DataFrame suggest_tuning and
+    prepare_issue_plot_data expect, with the amount and valve columns for overshoot
+    and undershoot.
+    """
+    issue_df = df.iloc[positions].copy()
+    if issue == "overshoot":
+        issue_df["overshoot_amount"] = issue_df[pid_meas] - issue_df[pid_setpoint]
+    elif issue == "undershoot":
+        issue_df["undershoot_amount"] = issue_df[pid_setpoint] - issue_df[pid_meas]
+    if issue in ("overshoot", "undershoot"):
+        issue_df["control_valve_high"] = issue_df[control_valve] > cv_high
+        issue_df["control_valve_low"] = issue_df[control_valve] < cv_low
+    return issue_df
@@ -0,0 +1,132 @@
+# downsample.py
+# Decimation of chart series to a point budget. Both methods pick rows of the loop
+# frame, so every series of the plot is sampled at the same timestamps. Rows passed in
+# `keep` (issue points) share the budget: up to half of it goes to them, thinned to the
+# lowest and highest flagged row per bucket when there are more.
+import numpy as np
+
+
+METHODS = ("lttb", "minmax")
+
+
+def _bucket_edges(start, stop, buckets):
+    return np.linspace(start, stop, buckets + 1).astype(np.intp)
+
+
+def lttb_rows(values, max_points):
+    """
+    Largest-Triangle-Three-Buckets over row number vs value.
+
+    The first and last rows are always kept; the rows in between are split into
+    max_points - 2 buckets and from each the row forming the largest triangle with
+    the previously kept row and the mean of the next bucket is chosen. Bad (NaN)
+    samples are only chosen when a whole bucket is bad.
+
+    Returns:
+        ndarray: Sorted row positions, at most max_points of them.
+    """
+    n = len(values)
+    if max_points >= n or max_points < 3:
+        return np.arange(n)
+    y = np.asarray(values, dtype=np.float64)
+    edges = _bucket_edges(1, n - 1, max_points - 2)
+    rows = np.empty(max_points, dtype=np.intp)
+    rows[0], rows[-1] = 0, n - 1
+
+    # Mean of every bucket's good samples; the last row forms a bucket of its own.
+    bounds = np.append(edges, n)
+    finite = np.isfinite(y)
+    sums = np.add.reduceat(np.where(finite, y, 0.0), bounds[:-1])
+    counts = np.add.reduceat(finite.astype(np.int64), bounds[:-1])
+    centres = (bounds[:-1] + bounds[1:] - 1) / 2
+
+    previous = 0
+    for b in range(max_points - 2):
+        lo, hi = edges[b], edges[b + 1]
+        mean_x = centres[b + 1]
+        mean_y = sums[b + 1] / counts[b + 1] if counts[b + 1] else y[previous]
+        x = np.arange(lo, hi)
+        area = np.abs((previous - mean_x) * (y[lo:hi] - y[previous]) - (previous - x) * (mean_y - y[previous]))
+        try:
+            chosen = lo + int(np.nanargmax(area))
+        except ValueError:  # bucket (or previous row) entirely bad
+            chosen = lo
+        rows[b + 1] = chosen
+        if finite[chosen]:
+            previous = chosen
+    return rows
+
+
+def minmax_rows(values, max_points):
+    """
+    Min/max bucketing: the lowest and highest good sample of each of max_points // 2
+    buckets, plus the first and last rows, so every local peak and valley survives
+    at its exact height.
+
+    Returns:
+        ndarray: Sorted row positions, at most max_points + 2 of them.
+    """
+    n = len(values)
+    buckets = max_points // 2
+    if max_points >= n or buckets < 1:
+        return np.arange(n)
+    y = np.asarray(values, dtype=np.float64)
+    edges = _bucket_edges(0, n, buckets)
+    starts = edges[:-1]
+    bucket = np.repeat(np.arange(buckets), np.diff(edges))
+
+    rows = [np.array([0, n - 1])]
+    for fill, reduce in ((np.inf, np.minimum), (-np.inf, np.maximum)):
+        filled = np.where(np.isnan(y), fill, y)
+        extreme = reduce.reduceat(filled, starts)
+        hit = np.flatnonzero(filled == extreme[bucket])
+        _, first = np.unique(bucket[hit], return_index=True)  # first row reaching it
+        rows.append(hit[first])
+    return np.unique(np.concatenate(rows))
+
+
+def marker_rows(values, rows, max_points):
+    """
+    Thins marker rows (issue points) to at most max_points: the lowest and highest
+    good value among the rows of each of max_points // 2 buckets of the series.
+    Rows on bad samples, which plot nothing, are dropped.
+
+    Returns:
+        ndarray: Sorted row positions.
+    """
+    rows = np.unique(np.asarray(rows, dtype=np.intp))
+    rows = rows[np.isfinite(values[rows])]
+    if len(rows) <= max_points:
+        return rows
+    buckets = max(max_points // 2, 1)
+    bucket = rows * buckets // len(values)
+    order = np.lexsort((values[rows], bucket))  # by bucket, then value
+    change = bucket[order][1:] != bucket[order][:-1]
+    ends = np.r_[True, change] | np.r_[change, True]  # first (lowest) and last (highest) of each bucket
+    return np.sort(rows[order[ends]])
+
+
+def downsample_rows(values, max_points, keep=(), method="minmax"):
+    """
+    Picks the rows to plot for a series of len(values) samples.
+
+    Parameters:
+        values (array): Series the shape is taken from (the measured output).
+        max_points (int): Point budget, e.g. the chart width in pixels. None or 0
+            keeps every row.
+        keep (array): Row positions to include (issue points), thinned by
+            marker_rows to half of max_points if there are more.
+        method (str): "minmax" (default), which keeps every peak and valley at its
+            exact height, or "lttb", which follows the visual shape more closely.
+
+    Returns:
+        ndarray: Sorted, unique row positions.
+    """
+    if method not in METHODS:
+        raise ValueError(f"unknown downsampling method {method!r}, expected one of {METHODS}")
+    if not max_points or max_points >= len(values):
+        return np.arange(len(values))
+    values = np.asarray(values, dtype=np.float64)
+    markers = marker_rows(values, keep, int(max_points) // 2)
+    pick = lttb_rows if method == "lttb" else minmax_rows
+    return np.union1d(pick(values, int(max_points) - len(markers)), markers)
@@ -0,0 +1,79 @@
+# fake_pi.py
+# Offline stand-in for the parts of PIconnect used by pi_client.py. Signals are
+# synthetic but deterministic per tag, so repeated fetches return the same data.
+import time
+import zlib
+
+import numpy as np
+import pandas as pd
+
+
+NO_GOOD = "[-11059] No Good Data For Calculation"
+
+
+class FakePIPoint:
+    def __init__(self, name, bad_fraction=0.0, latency=0.0):
+        self.name = name
+        self.bad_fraction = bad_fraction
+        self.latency = latency
+        self.calls = 0
+
+    def summaries(self, start, end, interval, summary_types=None):
+        self.calls += 1
+        if self.latency:
+            time.sleep(self.latency)  # round trip to the PI server
+        index = pd.date_range(pd.Timestamp(start), pd.Timestamp(end), freq=pd.to_timedelta(interval))
+        seed = zlib.crc32(self.name.encode())
+        # Values depend only on the tag and the absolute timestamp, so overlapping
+        # windows agree on their shared buckets.
+        t = index.as_unit("s").asi8
+        rng = np.random.default_rng(seed)
+        phase, period = rng.uniform(0, 2 * np.pi), rng.uniform(300, 1800)
+
+        if self.name.endswith("_OP"):
+            values = 50 + 20 * np.sin(2 * np.pi * t / period + phase)
+        else:
+            base = 500 + seed % 60
+            values = base + 5 * np.sin(2 * np.pi * t / period + phase)
+            if not self.name.endswith("_SP"):
+                values = values + 1.5 * np.sin(2 * np.pi * t / 97.0 + phase)
+
+        column = pd.Series(values, index=index, dtype=object if self.bad_fraction else float)
+        if self.bad_fraction:
+            bad = (np.abs(np.sin(t * 12.9898 + seed)) % 1.0) < self.bad_fraction
+            column[bad] = NO_GOOD
+        return pd.DataFrame({"AVERAGE": column})
+
+
+class FakePIServer:
+    """
+    Mimics PIconnect.PIServer: a context manager with search(query, source=None).
+
+    Every tag name searched for exists. Counters record how often the server was
+    opened and searched, so pooling behaviour can be checked without a PI server.
+    latency (seconds) is added to every summaries call to mimic a remote server.
+    """
+
+    def __init__(self, host=None, bad_fraction=0.0, latency=0.0):
+        self.host = host
+        self.bad_fraction = bad_fraction
+        self.latency = latency
+        self.connects = 0
+        self.searches = 0
+        self.connected = False
+
+    def __enter__(self):
+        self.connects += 1
+        self.connected = True
+        return self
+
+    def __exit__(self, *exc):
+        self.connected = False
+
+    def search(self, query, source=None):
+        if not self.connected:
+            raise RuntimeError("FakePIServer is not connected")
+        self.searches += 1
+        if isinstance(query, str):
+            query = [query]
+        return [FakePIPoint(name, self.bad_fraction, self.latency) for name in query]
@@ -0,0 +1,91 @@
+# fake_readdata.py
+# Local mock of the Kawai readdata endpoint for tests and benchmarks. Rows come from
+# fake_pi's deterministic signals at a fixed sample interval, in the long format the
+# real service returns:
+#   {"data": [{"time": "...", "sensorid": "...", "measurement": ...}, ...]}
+#
+#   python api/fake_readdata.py --port 8085 --latency 0.2 --row-cost 0.00001
+import argparse
+import json
+import threading
+import time
+from   http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pandas as pd
+
+from   fake_pi import FakePIPoint
+
+
+READDATA_PATH = '/kawai/api/v1/readdata'
+
+
+def readdata_rows(sensorids, start, end, interval='15s'):
+    """Returns the long-format rows readdata would for sensorids over [start, end]."""
+    rows = []
+    for sensorid in sensorids:
+        column = FakePIPoint(sensorid).summaries(start, end, interval)["AVERAGE"]
+        times = column.index.strftime('%Y-%m-%d %H:%M:%S')
+        rows += [{"time": t, "sensorid": sensorid, "measurement": round(float(v), 4)}
+                 for t, v in zip(times, column.to_numpy())]
+    return rows
+
+
+class ReadDataHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive, like the real server
+    interval = '15s'
+    latency = 0.0
+    row_cost = 0.0
+    requests_served = 0
+
+    def do_POST(self):
+        if self.path != READDATA_PATH:
+            self.send_error(404)
+            return
+        query = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+        rows = readdata_rows(query["sensorids"], pd.Timestamp(query["starttime"]),
+                             pd.Timestamp(query["endtime"]), self.interval)
+        if self.latency or self.row_cost:
+            # query time on the database behind the service: a fixed part plus a scan per row
+            time.sleep(self.latency + self.row_cost * len(rows))
+        body = json.dumps({"data": rows}).encode()
+        type(self).requests_served += 1
+
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def serve(port=0, latency=0.0, interval='15s', row_cost=0.0):
+    """
+    Starts the mock on a background thread.
+
+    Returns:
+        tuple: (server, url) where url is the readdata endpoint; call
+        server.shutdown() to stop it.
+    """
+    handler = type("Handler", (ReadDataHandler,), {"latency": latency, "interval": interval,
+                                                   "row_cost": row_cost})
+    server = ThreadingHTTPServer(("127.0.0.1", port), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}{READDATA_PATH}"
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Mock Kawai readdata server.")
+    parser.add_argument("--port", type=int, default=8085)
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds added to every request")
+    parser.add_argument("--interval", default='15s', help="sample interval of the generated rows")
+    parser.add_argument("--row-cost", type=float, default=0.0, help="seconds added per returned row")
+    args = parser.parse_args()
+
+    server, url = serve(args.port, args.latency, args.interval, args.row_cost)
+    print(f"readdata mock listening on {url}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
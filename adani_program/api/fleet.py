@@ -0,0 +1,174 @@
+# fleet.py
+import json
+import os
+import traceback
+from   concurrent.futures import ProcessPoolExecutor, as_completed
+from   datetime import datetime, timedelta
+
+
+ARCHITECTURE_FILE = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "..", "workspaces", "kawai", "pid-architecture.json"
+)
+
+
+def load_architecture(path=ARCHITECTURE_FILE):
+    with open(path) as f:
+        return json.load(f)
+
+
+def iter_loops(architecture):
+    """
+    Yields (pid_path, config) for every PID in the architecture.
+
+    pid_path uses the same "-" joined form as data-pid-path in pid2.js, e.g.
+    "BOILER SYSTEM-super_heater-LHS-First_stage-0-primary_pid".
+    """
+    def walk(node, path):
+        if isinstance(node, dict):
+            if "tags" in node:
+                yield "-".join(path), node
+                return
+            for key, value in node.items():
+                yield from walk(value, path + [key])
+        elif isinstance(node, list):
+            for index, value in enumerate(node):
+                yield from walk(value, path + [str(index)])
+
+    yield from walk(architecture.get("System", architecture), [])
+
+
+def summarise_loop(pid_path, config, df, analyse_loop=None):
+    """
+    Runs analyse_loop on one loop frame; returns the loop's entry of the fleet report.
+
+    Callers in the process that runs the app pass its analyse_loop: under
+    `python Index1.py` the app is __main__, and importing Index1 would load a second
+    copy with its own PI session and caches.
+    """
+    if analyse_loop is None:
+        # Index1 is imported here rather than at module level because Index1 imports
+        # this module for the /fleetScan route.
+        from Index1 import analyse_loop
+
+    parameters = config.get("parameters", {})
+    result = {"pidPath": pid_path, "tags": config["tags"]}
+    try:
+        percentages, data = analyse_loop(df, parameters.get("closed_loop"), parameters.get("open_loop"))
+        result["percentages"] = percentages
+        if data is None:
+            result["status"] = "normal"
+        else:
+            result["status"] = data["status"]
+            result["recommendation"] = data["recommendation"]
+            result["parameters"] = data["parameters"]
+            result["suggestedParameters"] = data["suggestedParameters"]
+            result["setpoint"] = data["setpoint"]
+    except Exception as e:
+        traceback.print_exc()
+        result["status"] = "error"
+        result["error"] = str(e)
+    return result
+
+
+def _scan_loop(job):
+    # Runs in a worker process
+    return summarise_loop(*job)
+
+
+def _analyse_request(job):
+    # Runs in a worker process
+    from Index1 import pid_analysis
+
+    index, data, df = job
+    result = {"index": index, "pidPath": data.get("pidPath")}
+    try:
+        result["percentages"], result["data"] = pid_analysis(df, data)
+    except Exception as e:
+        traceback.print_exc()
+        result["error"] = str(e)
+    return result
+
+
+def analyse_loops(jobs, max_workers=None):
+    """
+    Analyses several /fetchPISummaries requests across a process pool.
+
+    Parameters:
+        jobs (list): (index, request body, loop frame) per loop.
+        max_workers (int): Pool size, os.cpu_count() if None.
+
+    Yields:
+        dict: {"index", "pidPath", "percentages", "data"} per loop, or "error" in place
+        of the results, in the order the loops finish.
+    """
+    if not jobs:
+        return
+    with ProcessPoolExecutor(max_workers=max_workers) as pool:
+        for future in as_completed([pool.submit(_analyse_request, job) for job in jobs]):
+            yield future.result()
+
+
+def fleet_summary(loops):
+    """Counts the loops of a report by status."""
+    summary = {"total": len(loops), "normal": 0, "issue": 0, "error": 0}
+    for loop in loops:
+        if loop["status"] in ("normal", "error"):
+            summary[loop["status"]] += 1
+        else:
+            summary["issue"] += 1
+    return summary
+
+
+def scan_fleet(architecture=None, starttime=None, endtime=None, time_interval='10s', max_workers=None,
+               fetch_frames=None):
+    """
+    Runs detection, suggestion and simulation for every loop across a process pool.
+
+    The data for every loop is fetched in one batched PI call before the fan-out.
+
+    Parameters:
+        architecture (dict): Parsed pid-architecture.json, loaded from ARCHITECTURE_FILE if None.
+        starttime, endtime (datetime): Analysis window, the last 8 hours if None.
+        time_interval (str): PI summary interval.
+        max_workers (int): Pool size, os.cpu_count() if None.
+        fetch_frames (callable): (loops, start, end, interval) -> loop name -> frame,
+            the app's Index1.fetch_loop_frames; imported from Index1 if None, for
+            running this module on its own.
+
+    Returns:
+        dict: Plant-wide report with one entry per loop under "loops" and status
+        counts under "summary".
+    """
+    if architecture is None:
+        architecture = load_architecture()
+    if endtime is None:
+        endtime = datetime.now()
+    if starttime is None:
+        starttime = endtime - timedelta(hours=8)
+
+    if fetch_frames is None:
+        from Index1 import fetch_loop_frames as fetch_frames
+
+    # All loops' tags come back from PI in one batched fetch; only the frames are
+    # shipped to the workers.
+    configs = dict(iter_loops(architecture))
+    frames = fetch_frames({pid_path: config["tags"] for pid_path, config in configs.items()},
+                               starttime, endtime, time_interval)
+    jobs = [(pid_path, config, frames[pid_path]) for pid_path, config in configs.items()]
+    if not jobs:
+        loops = []
+    else:
+        with ProcessPoolExecutor(max_workers=max_workers) as pool:
+            loops = list(pool.map(_scan_loop, jobs))
+
+    return {
+        "starttime": starttime.strftime('%Y-%m-%d %H:%M:%S'),
+        "endtime": endtime.strftime('%Y-%m-%d %H:%M:%S'),
+        "time_interval": time_interval,
+        "summary": fleet_summary(loops),
+        "loops": loops,
+    }
+
+
+if __name__ == '__main__':
+    print(json.dumps(scan_fleet(), indent=4, default=str))
@@ -0,0 +1,152 @@
+# history_store.py
+# On-disk history of PI summaries, one memory-mapped NumPy column pair per tag,
+# interval and day:
+#
+#   <root>/<tag>/<interval>/<YYYY-MM-DD>.time.npy    datetime64[s], sorted
+#   <root>/<tag>/<interval>/<YYYY-MM-DD>.value.npy   float64, NaN where PI had no good data
+#
+# Import a spreadsheet once, then replay it offline:
+#   python api/history_store.py import SuperHeaters.xlsx --root history --interval 10s
+import argparse
+import os
+
+import numpy as np
+import pandas as pd
+
+
+def _wall_clock(index):
+    index = pd.DatetimeIndex(index)
+    return index.tz_localize(None) if index.tz is not None else index
+
+
+class HistoryStore:
+    """
+    Columnar store for fetched summaries, partitioned by tag and day.
+
+    Reads memory-map the partition files, so a window inside one day is a zero-copy
+    slice of the file. summaries() has the same signature and output as
+    PIDataClient.summaries, so the store can stand in for PI anywhere a fetch
+    function is expected (TimeSeriesCache, OPMS_Average).
+
+    Parameters:
+        root (str): Directory holding the partitions.
+    """
+
+    def __init__(self, root):
+        self.root = root
+
+    def _dir(self, tag, interval):
+        return os.path.join(self.root, tag.replace(os.sep, "_"), interval)
+
+    def tags(self):
+        if not os.path.isdir(self.root):
+            return []
+        return sorted(os.listdir(self.root))
+
+    def write(self, df, interval):
+        """
+        Merges a frame with one column per tag into the day partitions.
+
+        df may be time-indexed or carry a 'time' column. Non-numeric values such as
+        PI "No Good" markers are stored as NaN. Rows already on disk for the same
+        timestamp are replaced.
+        """
+        if "time" in df.columns:
+            df = df.set_index("time")
+        times = _wall_clock(df.index).values.astype("datetime64[s]")
+        days = times.astype("datetime64[D]")
+
+        for tag in df.columns:
+            values = pd.to_numeric(df[tag], errors="coerce").to_numpy(dtype=np.float64)
+            directory = self._dir(tag, interval)
+            os.makedirs(directory, exist_ok=True)
+            for day in np.unique(days):
+                in_day = days == day
+                self._merge_partition(directory, str(day), times[in_day], values[in_day])
+
+    def _merge_partition(self, directory, day, times, values):
+        time_path = os.path.join(directory, day + ".time.npy")
+        value_path = os.path.join(directory, day + ".value.npy")
+        if os.path.exists(time_path):
+            old_times, old_values = np.load(time_path), np.load(value_path)
+            # New rows win: they are listed first, and unique keeps the first occurrence.
+            times = np.concatenate([times, old_times])
+            values = np.concatenate([values, old_values])
+        times, first = np.unique(times, return_index=True)
+        values = values[first]
+
+        for path, array in ((time_path, times), (value_path, values)):
+            tmp = path + ".tmp"
+            with open(tmp, "wb") as f:
+                np.save(f, array)
+            os.replace(tmp, path)
+
+    def read_tag(self, tag, start, end, interval):
+        """
+        Returns (times, values) for one tag in [start, end].
+
+        Both are read-only memory-mapped views when the window falls inside one day;
+        windows spanning days are concatenated.
+        """
+        directory = self._dir(tag, interval)
+        start = np.datetime64(pd.Timestamp(start).to_datetime64(), "s")
+        end = np.datetime64(pd.Timestamp(end).to_datetime64(), "s")
+        times_parts, value_parts = [], []
+        for day in np.arange(start.astype("datetime64[D]"), end.astype("datetime64[D]") + 1):
+            time_path = os.path.join(directory, str(day) + ".time.npy")
+            if not os.path.exists(time_path):
+                continue
+            times = np.load(time_path, mmap_mode="r")
+            values = np.load(os.path.join(directory, str(day) + ".value.npy"), mmap_mode="r")
+            lo, hi = np.searchsorted(times, start, "left"), np.searchsorted(times, end, "right")
+            times_parts.append(times[lo:hi])
+            value_parts.append(values[lo:hi])
+
+        if not times_parts:
+            return np.empty(0, dtype="datetime64[s]"), np.empty(0, dtype=np.float64)
+        if len(times_parts) == 1:
+            return times_parts[0], value_parts[0]
+        return np.concatenate(times_parts), np.concatenate(value_parts)
+
+    def summaries(self, tags, start, end, interval):
+        """Reads tags like PIDataClient.summaries: time-indexed, one column per stored tag."""
+        columns = {}
+        for tag in dict.fromkeys(tags):
+            times, values = self.read_tag(tag, start, end, interval)
+            if len(times):
+                columns[tag] = pd.Series(values, index=pd.DatetimeIndex(times), copy=False)
+        df = pd.DataFrame(columns)
+        df.index.name = 'time'
+        return df
+
+    def recording(self, fetch):
+        """Wraps a fetch function so everything it returns is also written to the store."""
+        def fetch_and_record(tags, start, end, interval):
+            df = fetch(tags, start, end, interval)
+            self.write(df, interval)
+            return df
+        return fetch_and_record
+
+
+def import_file(path, root, interval):
+    """Loads a wide CSV/Excel export (a 'time' column plus one column per tag) into the store."""
+    if path.lower().endswith((".xlsx", ".xls")):
+        df = pd.read_excel(path)
+    else:
+        df = pd.read_csv(path)
+    df["time"] = pd.to_datetime(df["time"])
+    HistoryStore(root).write(df, interval)
+    return len(df), len(df.columns) - 1
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Manage the on-disk PI history store.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    imp = sub.add_parser("import", help="import a wide CSV/Excel file")
+    imp.add_argument("path")
+    imp.add_argument("--root", default="history")
+    imp.add_argument("--interval", default="10s")
+    args = parser.parse_args()
+
+    rows, tags = import_file(args.path, args.root, args.interval)
+    print(f"Imported {rows} rows for {tags} tags into {args.root}")
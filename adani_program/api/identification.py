@@ -0,0 +1,330 @@
+# identification.py
+# Fits the process models cascade.py simulates, from historical loop data:
+#
+#   inner: controlvalveSecondary -> measureValueSecondary
+#   outer: measureValueSecondary -> measureValuePrimary
+#
+# Each model is a FOPDT or SOPDT lag (cascade.process_model). The fit works on the
+# windows around step events in the input; the dead-time grid is centred on the
+# peak of the FFT cross-correlation of the input and output changes, every grid
+# point is fitted at once by least squares on the discrete form of the model, and
+# the candidate whose simulated windows best match the data is kept.
+#
+# That least-squares (ARX, equation-error) fit is biased by noise on the output: on
+# closed-loop data it gives lags 15-20% short, gains a few % low and dead times a
+# sample long. The kept candidate is therefore refined on the simulated windows
+# (output error): lags and dead time on a local grid, the gain in closed form.
+import json
+import os
+import threading
+from   datetime import datetime, timedelta
+
+import numpy as np
+from   scipy import fft
+
+from   cascade import LagProcess, process_model
+
+
+TIME_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+# model -> (input role, output role)
+LOOP_MODELS = {
+    "inner": ("controlvalveSecondary", "measureValueSecondary"),
+    "outer": ("measureValueSecondary", "measureValuePrimary"),
+}
+
+
+def detect_steps(u, dt, window=900.0, lead=60.0, n_sigma=5.0, min_step=0.0):
+    """
+    Finds step events in an input series.
+
+    A step is a change over `lead` seconds larger than n_sigma robust standard
+    deviations of such changes (and than min_step). Each event gets a window that
+    starts `lead` seconds before it; windows do not overlap.
+
+    Parameters:
+        u (array): Input series, NaN for bad samples.
+        dt (float): Seconds between samples.
+        window (float): Length of each event window, in seconds.
+
+    Returns:
+        ndarray: Start positions of the windows.
+    """
+    span = max(int(round(lead / dt)), 1)
+    length = max(int(round(window / dt)), span + 2)
+    if len(u) < span + length:
+        return np.empty(0, dtype=np.int64)
+    change = u[span:] - u[:-span]
+    finite = change[np.isfinite(change)]
+    if not len(finite):
+        return np.empty(0, dtype=np.int64)
+    noise = 1.4826 * np.median(np.abs(finite - np.median(finite)))
+    threshold = max(n_sigma * noise, min_step)
+    with np.errstate(invalid="ignore"):
+        candidates = np.flatnonzero(np.abs(change) > threshold)  # position k - span of a step at k
+
+    starts, position = [], 0
+    while True:
+        i = np.searchsorted(candidates, position)
+        if i == len(candidates) or candidates[i] + length > len(u):
+            break
+        starts.append(candidates[i])
+        position = candidates[i] + length
+    return np.asarray(starts, dtype=np.int64)
+
+
+def xcorr_delay(u, y, max_lag):
+    """
+    Lag, in samples, at which the output changes correlate most with the input
+    changes, from an FFT cross-correlation of the first differences.
+    """
+    du = np.nan_to_num(np.diff(u))
+    dy = np.nan_to_num(np.diff(y))
+    size = fft.next_fast_len(len(du) + max_lag + 1, real=True)
+    r = fft.irfft(np.conj(fft.rfft(du, size)) * fft.rfft(dy, size), size)[:max_lag + 1]
+    return int(np.argmax(np.abs(r)))
+
+
+def fit_arx(u, y, rows, order, delays, groups=None):
+    """
+    Least-squares fit of y[k] = a1 y[k-1] + ... + a_order y[k-order] + b u[k-d] + c
+    for every dead time d in delays at once.
+
+    Only the u column depends on d, so the normal equations are assembled from the
+    y block, computed once, and one matrix product for the u column of every d.
+
+    Parameters:
+        rows (array): Positions k the fit uses; k >= order + max(delays).
+        groups (array): Window number of each row, the rows of a window being
+            consecutive. Each window then gets its own offset c, which absorbs slow
+            unmeasured load drift (the usual case in closed-loop data) instead of
+            folding it into the dynamics.
+
+    Returns:
+        ndarray: (len(delays), order + 1) of (a1, ..., a_order, b) per dead time.
+    """
+    groups = np.zeros(len(rows), dtype=np.int64) if groups is None else np.asarray(groups)
+    Y = np.stack([y[rows - j] for j in range(1, order + 1)] + [y[rows]], axis=-1)  # lags, then target
+    U = u[rows[None, :] - delays[:, None]]
+    good = np.isfinite(Y).all(axis=1) & np.isfinite(U).all(axis=0)  # the same rows for every d
+    Y, U, groups = Y[good], U[:, good], groups[good]
+
+    # Centre every column per window (or overall), which fits the offsets exactly
+    starts = np.flatnonzero(np.r_[True, groups[1:] != groups[:-1]])
+    sizes = np.diff(np.r_[starts, len(groups)])
+    Y = Y - np.repeat(np.add.reduceat(Y, starts, axis=0) / sizes[:, None], sizes, axis=0)
+    U = U - np.repeat(np.add.reduceat(U, starts, axis=1) / sizes, sizes, axis=1)
+
+    yy = Y.T @ Y        # (order + 1, order + 1)
+    uy = U @ Y          # (D, order + 1)
+    uu = np.einsum('dn,dn->d', U, U)
+    xtx = np.empty((len(delays), order + 1, order + 1))
+    xtx[:, :order, :order] = yy[:order, :order]
+    xtx[:, order, :order] = xtx[:, :order, order] = uy[:, :order]
+    xtx[:, order, order] = uu
+    xty = np.concatenate([np.broadcast_to(yy[:order, order], (len(delays), order)), uy[:, order:]], axis=1)
+    return np.linalg.solve(xtx + 1e-9 * np.eye(order + 1), xty[..., None])[..., 0]
+
+
+def arx_model(params, order, delay, dt):
+    """
+    Converts one fit_arx row to a process_model; None if it is not a stable,
+    non-oscillating lag.
+    """
+    a, b = params[:order], params[order]
+    if order == 1:
+        poles = np.array([a[0], 0.0])
+    else:
+        discriminant = a[0] ** 2 + 4 * a[1]
+        if discriminant < 0:
+            return None
+        poles = np.sort((a[0] + np.array([1.0, -1.0]) * np.sqrt(discriminant)) / 2)[::-1]
+    if not (0 < poles[0] < 1 and 0 <= poles[1] < 1) or b == 0:
+        return None
+    taus = [-dt / np.log(p) if p > 0 else 0.0 for p in poles]
+    return process_model(float(b / (1 - a.sum())), float(taus[0]), float(delay * dt), float(taus[1]))
+
+
+def _simulate(models, u_windows, dt):
+    """(models, windows, length) response of every model over every window, in deviation from rest."""
+    n_models, (n_windows, length) = len(models), u_windows.shape
+    lanes = {key: np.repeat([float(model[key]) for model in models], n_windows) for key in models[0]}
+    u_lanes = np.tile(u_windows, (n_models, 1))
+    process = LagProcess(lanes, n_models * n_windows, dt, u_lanes[:, 0], 0.0)
+    simulated = np.empty_like(u_lanes)
+    for j in range(length):
+        simulated[:, j] = process.step(u_lanes[:, j])
+    return simulated.reshape(n_models, n_windows, length)
+
+
+def _fit(error, y_windows):
+    spread = ((y_windows - y_windows.mean(axis=1, keepdims=True)) ** 2).sum()
+    return 100 * (1 - np.sqrt(error / max(spread, 1e-12)))
+
+
+def window_fit(models, u_windows, y_windows, dt):
+    """
+    Simulates every model over every window, each started from its window's first
+    sample, in one vectorized run.
+
+    Returns:
+        ndarray: Fit in % per model, 100 * (1 - |y - y_sim| / |y - mean(y)|).
+    """
+    change = y_windows - y_windows[:, :1]
+    return _fit(((_simulate(models, u_windows, dt) - change) ** 2).sum(axis=(1, 2)), y_windows)
+
+
+def refine(model, u_windows, y_windows, dt, scales=(np.geomspace(0.7, 1.5, 9), np.geomspace(0.95, 1.05, 5)),
+           shifts=(2, 1)):
+    """
+    Output-error refinement of a model on its windows. Each pass simulates the lags
+    scaled by every factor in scales[i] with the dead time moved by up to shifts[i]
+    samples, all at unit gain in one run; the simulated response is linear in the
+    gain, so each candidate's best gain is a least-squares ratio. The best candidate
+    seeds the next pass.
+
+    Returns:
+        tuple: (refined model, its fit in %).
+    """
+    change = y_windows - y_windows[:, :1]
+    fit = None
+    for scale, shift in zip(scales, shifts):
+        grid = [process_model(1.0, model["tau"] * s, max(model["dead_time"] + d * dt, 0.0), model["tau2"] * s)
+                for s in scale for d in range(-shift, shift + 1)]
+        simulated = _simulate(grid, u_windows, dt)
+        gains = (simulated * change).sum(axis=(1, 2)) / np.maximum((simulated ** 2).sum(axis=(1, 2)), 1e-12)
+        error = ((gains[:, None, None] * simulated - change) ** 2).sum(axis=(1, 2))
+        best = int(np.argmin(error))
+        model, fit = dict(grid[best], gain=float(gains[best])), float(_fit(error[best], y_windows))
+    return model, fit
+
+
+def identify(u, y, dt, order="auto", max_dead_time=600.0, grid_width=15, window=900.0,
+             lead=60.0, max_windows=200, sopdt_margin=1.0):
+    """
+    Identifies the FOPDT / SOPDT model from u to y.
+
+    Parameters:
+        u, y (array-like): Input and output series on one time grid, NaN for bad samples.
+        dt (float): Seconds between samples.
+        order (str): "fopdt", "sopdt" or "auto", which keeps the SOPDT model only if it
+            fits sopdt_margin percentage points better.
+        max_dead_time (float): Longest dead time searched, in seconds.
+        grid_width (int): Dead times searched either side of the cross-correlation
+            peak, in samples.
+        window, lead (float): Event windows, see detect_steps. Without step events the
+            data is cut into consecutive windows of the same length.
+        max_windows (int): Largest number of windows used, the latest ones.
+
+    Returns:
+        dict: process_model keys plus "order", "fit" (% of the window variation the
+        simulated model explains), "events" (step events found) and "samples";
+        None if there is too little good data.
+    """
+    u = np.asarray(u, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    max_lag = max(int(round(max_dead_time / dt)), 0)
+    length = max(int(round(window / dt)), 3)
+
+    starts = detect_steps(u, dt, window, lead)
+    events = len(starts)
+    if not events:
+        starts = np.arange(0, len(u) - length + 1, length)
+    windows = starts[:, None] + np.arange(length)
+    windows = windows[np.isfinite(u[windows]).all(axis=1) & np.isfinite(y[windows]).all(axis=1)][-max_windows:]
+    if not len(windows):
+        return None
+
+    rows, groups = windows.ravel(), np.repeat(np.arange(len(windows)), length)
+    groups, rows = groups[rows >= max_lag + 2], rows[rows >= max_lag + 2]
+    if len(rows) < 10:
+        return None
+    centre = xcorr_delay(np.where(np.isin(np.arange(len(u)), rows), u, np.nan), y, max_lag)
+    delays = np.arange(max(centre - grid_width, 0), min(centre + grid_width, max_lag) + 1)
+
+    candidates = []
+    for n in ([1, 2] if order == "auto" else [{"fopdt": 1, "sopdt": 2}[order]]):
+        params = fit_arx(u, y, rows, n, delays, groups)
+        for delay, row in zip(delays, params):
+            model = arx_model(row, n, delay, dt)
+            if model is not None:
+                candidates.append((n, model))
+    if not candidates:
+        return None
+
+    fits = window_fit([model for _, model in candidates], u[windows], y[windows], dt)
+    best = {n: max((i for i, (m, _) in enumerate(candidates) if m == n), key=lambda i: fits[i], default=None)
+            for n in (1, 2)}
+    choice = best[1]
+    if best[2] is not None and (choice is None or fits[best[2]] > fits[choice] + sopdt_margin):
+        choice = best[2]
+    n, model = candidates[choice]
+    model, fit = refine(model, u[windows], y[windows], dt)
+    return dict(model, order="fopdt" if n == 1 else "sopdt", fit=fit, events=events, samples=int(len(rows)))
+
+
+def identify_loop(df, dt, **options):
+    """
+    Identifies the inner and outer models of one loop frame from fetch_loop_frame.
+
+    Returns:
+        dict: "inner" and "outer" -> identify() result, None where it failed.
+    """
+    return {
+        key: identify(df[u_col].to_numpy(dtype=float), df[y_col].to_numpy(dtype=float), dt, **options)
+        for key, (u_col, y_col) in LOOP_MODELS.items()
+    }
+
+
+class ModelCache:
+    """
+    Identified models per loop, each valid until a timestamp. Models identified on a
+    past window (asof) are kept under the loop and that window's end, apart from the
+    live one.
+
+    Parameters:
+        validity (timedelta): How long an identification is used before it is redone.
+        path (str): JSON file the models are kept in across restarts; None for memory only.
+        clock (callable): Returns the current datetime.
+    """
+
+    def __init__(self, validity=timedelta(hours=24), path=None, clock=datetime.now):
+        self.validity = validity
+        self.path = path
+        self.clock = clock
+        self._lock = threading.Lock()
+        self._models = {}
+        if path and os.path.exists(path):
+            with open(path) as f:
+                self._models = json.load(f)
+
+    @staticmethod
+    def _key(pid_path, asof=None):
+        return pid_path if asof is None else f"{pid_path}@{asof.strftime(TIME_FORMAT)}"
+
+    def get(self, pid_path, asof=None):
+        """The stored entry of a loop, or None if it has none or it has expired."""
+        with self._lock:
+            entry = self._models.get(self._key(pid_path, asof))
+        if entry is None or datetime.strptime(entry["validUntil"], TIME_FORMAT) <= self.clock():
+            return None
+        return entry
+
+    def put(self, pid_path, models, asof=None):
+        """Stores identify_loop() output for a loop; returns the stamped entry."""
+        now = self.clock()
+        entry = dict(models, identifiedAt=now.strftime(TIME_FORMAT),
+                     validUntil=(now + self.validity).strftime(TIME_FORMAT))
+        with self._lock:
+            # Expired entries, replays' mostly, would otherwise pile up
+            self._models = {key: value for key, value in self._models.items()
+                            if datetime.strptime(value["validUntil"], TIME_FORMAT) > now}
+            self._models[self._key(pid_path, asof)] = entry
+            if self.path:
+                with open(self.path, "w") as f:
+                    json.dump(self._models, f, indent=2)
+        return entry
+
+    def report(self):
+        with self._lock:
+            return dict(self._models)
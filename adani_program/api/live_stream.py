@@ -0,0 +1,238 @@
+# live_stream.py
+# Push updates for loops open in the dashboard, as Server-Sent Events. One feed per
+# subscribed loop polls the new tail of its data, pushes it through a LoopMonitor
+# (online_detection.py) and encodes one message, which is handed to every client
+# watching that loop: N dashboards on a loop cost one fetch and one update, not N
+# full analyses.
+import json
+import logging
+import queue
+import threading
+import time
+import traceback
+from   collections import deque
+from   datetime import datetime, timedelta
+from   itertools import count
+
+import pandas as pd
+
+from   data_quality import json_values
+from   online_detection import LoopMonitor
+
+
+PID_SETPOINT = "setpointPrimary"
+PID_MEAS = "measureValuePrimary"
+
+logger = logging.getLogger(__name__)
+
+
+def sse_message(event, data):
+    """Encodes one Server-Sent Event."""
+    return f"event: {event}\ndata: {json.dumps(data, separators=(',', ':'))}\n\n".encode()
+
+
+SSE_KEEPALIVE = b": keepalive\n\n"
+
+
+class LoopFeed:
+    """The monitor and recent samples of one subscribed loop."""
+
+    def __init__(self, pid_path, tags, horizon, tolerance):
+        self.pid_path = pid_path
+        self.tags = tags
+        self.tolerance = tolerance
+        self.monitor = LoopMonitor(horizon, tolerance=tolerance)
+        self.recent = deque(maxlen=horizon)  # (time label, measured value) per monitor row
+        self.subscribers = {}  # token -> deliver(message) -> bool
+
+    def update(self, df):
+        """
+        Pushes the rows of df newer than the last update.
+
+        Returns:
+            dict: The "update" event data, or None if df had no new rows.
+        """
+        if self.monitor.last_time is not None:
+            df = df[pd.to_datetime(df['time']) > self.monitor.last_time]
+        if df.empty:
+            return None
+        counts = dict(self.monitor.flagged)
+        self.monitor.push_frame(df, PID_SETPOINT, PID_MEAS)
+
+        labels = pd.to_datetime(df['time']).dt.strftime('%Y-%m-%d %H:%M:%S').tolist()
+        self.recent.extend(zip(labels, df[PID_MEAS].to_numpy(dtype=float)))
+        first_row = self.monitor.samples - len(self.recent)
+        issue_points = {}
+        for issue, rows in self.monitor.flagged_since(counts).items():
+            points = [self.recent[row - first_row] for row in rows if row >= first_row]
+            issue_points[issue] = [{"time": label, "value": value} for label, value in points]
+
+        return {
+            "pidPath": self.pid_path,
+            "time": labels,
+            "series": {
+                "Setpoint": json_values(df[PID_SETPOINT]),
+                "Measured Output": json_values(df[PID_MEAS]),
+            },
+            "percentages": self.monitor.percentages(),
+            "issuePoints": issue_points,
+            "errorMargin": self.tolerance * 100,  # percent, as in plot_format.py
+        }
+
+
+class LiveHub:
+    """
+    Shared fan-out of loop updates to any number of clients.
+
+    A feed is started when the first client subscribes to a loop: its last `hours`
+    are pushed into a fresh monitor so the percentages cover the same window as
+    /fetchPISummaries. Every poll_interval seconds each feed fetches the buckets
+    completed since its last update. Feeds without clients are dropped.
+
+    Parameters:
+        fetch_frame (callable): (tags, start, end, interval) -> role-named loop
+            frame, e.g. Index1.fetch_loop_frame.
+        poll_interval (float): Seconds between polls.
+        hours (float): Window the percentages cover.
+        time_interval (str): Summary interval of the fetched data.
+        tolerance (float): Settling band, as in analyse_loop.
+        max_queue (int): Messages a slow client may fall behind before it is dropped;
+            EventSource reconnects it with a fresh snapshot.
+    """
+
+    def __init__(self, fetch_frame, poll_interval=10.0, hours=8.0, time_interval='10s', tolerance=0.03, max_queue=100):
+        self.fetch_frame = fetch_frame
+        self.poll_interval = poll_interval
+        self.hours = hours
+        self.time_interval = time_interval
+        self.tolerance = tolerance
+        self.max_queue = max_queue
+        self.step = pd.to_timedelta(time_interval)
+        self._feeds = {}    # pid path -> LoopFeed
+        self._tokens = count()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self.stats = {"polls": 0, "updates": 0, "messages": 0, "subscribers": 0, "dropped": 0}
+
+    def _window_end(self):
+        # Only completed buckets: the one still in progress would change after it was sent
+        return pd.Timestamp(datetime.now()).floor(self.step) - self.step
+
+    def subscribe(self, pid_path, tags, deliver):
+        """
+        Registers deliver(message bytes) -> bool for a loop's updates; returning False
+        unsubscribes it. Returns (token, snapshot message).
+        """
+        with self._lock:
+            feed = self._feeds.get(pid_path)
+        if feed is None:
+            horizon = int(timedelta(hours=self.hours) / self.step)
+            feed = LoopFeed(pid_path, tags, horizon, self.tolerance)
+            end = self._window_end()
+            feed.update(self.fetch_frame(tags, end - timedelta(hours=self.hours), end, self.time_interval))
+        with self._lock:
+            feed = self._feeds.setdefault(pid_path, feed)
+            token = next(self._tokens)
+            feed.subscribers[token] = deliver
+            self.stats["subscribers"] += 1
+            last_time = feed.monitor.last_time
+            snapshot = sse_message("snapshot", {
+                "pidPath": pid_path,
+                "percentages": feed.monitor.percentages(),
+                "lastTime": last_time.strftime('%Y-%m-%d %H:%M:%S') if last_time is not None else None,
+            })
+        self.start()
+        return token, snapshot
+
+    def unsubscribe(self, pid_path, token):
+        with self._lock:
+            feed = self._feeds.get(pid_path)
+            if feed is not None and feed.subscribers.pop(token, None) is not None:
+                self.stats["subscribers"] -= 1
+                if not feed.subscribers:
+                    del self._feeds[pid_path]
+
+    def poll_once(self):
+        """Fetches, updates and fans out every subscribed loop once."""
+        with self._lock:
+            feeds = list(self._feeds.values())
+        end = self._window_end()
+        for feed in feeds:
+            try:
+                start = feed.monitor.last_time if feed.monitor.last_time is not None else end - timedelta(hours=self.hours)
+                data = feed.update(self.fetch_frame(feed.tags, start, end, self.time_interval))
+            except Exception:
+                traceback.print_exc()
+                continue
+            if data is None:
+                continue
+            message = sse_message("update", data)  # encoded once for every client
+            with self._lock:
+                subscribers = list(feed.subscribers.items())
+                self.stats["updates"] += 1
+            for token, deliver in subscribers:
+                if deliver(message):
+                    self.stats["messages"] += 1
+                else:
+                    self.stats["dropped"] += 1
+                    self.unsubscribe(feed.pid_path, token)
+        self.stats["polls"] += 1
+
+    def stream(self, loops, keepalive=15.0):
+        """
+        Yields the SSE body for one client of a WSGI server.
+
+        Parameters:
+            loops (dict): pid path -> {role: tag} map of the loops to watch.
+            keepalive (float): Seconds of silence before a comment line is sent, so
+                proxies keep the connection open.
+        """
+        messages = queue.Queue(self.max_queue)
+        dropped = threading.Event()
+
+        def deliver(message):
+            try:
+                messages.put_nowait(message)
+                return True
+            except queue.Full:
+                dropped.set()
+                return False
+
+        tokens = {}
+        try:
+            for pid_path, tags in loops.items():
+                tokens[pid_path], snapshot = self.subscribe(pid_path, tags, deliver)
+                yield snapshot
+            while not dropped.is_set():
+                try:
+                    yield messages.get(timeout=keepalive)
+                except queue.Empty:
+                    yield SSE_KEEPALIVE
+        finally:
+            for pid_path, token in tokens.items():
+                self.unsubscribe(pid_path, token)
+
+    def start(self):
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="live-hub", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        thread, self._thread = self._thread, None
+        if thread is not None:
+            thread.join()
+
+    def _run(self):
+        while not self._stop.wait(self.poll_interval):
+            started = time.monotonic()
+            try:
+                self.poll_once()
+            except Exception:
+                traceback.print_exc()
+            if time.monotonic() - started > self.poll_interval:
+                logger.warning("live stream poll took longer than the poll interval")
@@ -0,0 +1,250 @@
+# online_detection.py
+# Incremental versions of the loop detectors for continuous monitoring. Each PI sample
+# is pushed once and updates running state in constant time, so the issue
+# percentages of a loop stay current without re-scanning the whole window on every
+# refresh.
+from   collections import deque
+import math
+
+import numpy as np
+import pandas as pd
+
+
+class ZeroCrossingCounter:
+    """
+    Rolling count of direction changes over the last `window` good samples, the
+    streaming form of sign(diff) != shift(1) followed by rolling(window).sum().
+
+    The first two samples count as changes, as they do against pandas' leading NaN.
+    """
+
+    def __init__(self, window=10):
+        self.window = window
+        self._flags = deque(maxlen=window)
+        self._sum = 0
+        self._last = None
+        self._direction = None
+        self._seen = 0
+
+    def push(self, value):
+        """Adds one sample; returns the rolling count, or None until the window is full."""
+        if self._last is None:
+            change = 1
+        else:
+            direction = (value > self._last) - (value < self._last)
+            change = 1 if self._seen < 2 or direction != self._direction else 0
+            self._direction = direction
+        self._last = value
+        self._seen += 1
+
+        if len(self._flags) == self.window:
+            self._sum -= self._flags[0]
+        self._flags.append(change)
+        self._sum += change
+        return self._sum if len(self._flags) == self.window else None
+
+
+class CountQuantile:
+    """
+    Exact sliding quantile of small non-negative integers, kept as a histogram.
+
+    Zero-crossing counts lie in [0, window], so add/remove are O(1) and a quantile
+    costs O(window) however long the horizon is. Quantiles interpolate linearly like
+    pandas' Series.quantile.
+    """
+
+    def __init__(self, max_value):
+        self.histogram = np.zeros(max_value + 1, dtype=np.int64)
+        self.count = 0
+
+    def add(self, value):
+        self.histogram[value] += 1
+        self.count += 1
+
+    def remove(self, value):
+        self.histogram[value] -= 1
+        self.count -= 1
+
+    def _value_at(self, cumulative, rank):
+        return int(np.searchsorted(cumulative, rank, side="right"))
+
+    def quantile(self, q):
+        if self.count == 0:
+            return math.nan
+        cumulative = np.cumsum(self.histogram)
+        position = q * (self.count - 1)
+        lower, upper = math.floor(position), math.ceil(position)
+        low, high = self._value_at(cumulative, lower), self._value_at(cumulative, upper)
+        return low + (high - low) * (position - lower)
+
+    def count_above(self, threshold):
+        return int(self.histogram[math.floor(threshold) + 1:].sum())
+
+
+class PeakValleyTracker:
+    """
+    Online peak and valley detection with hysteresis.
+
+    A peak is confirmed once the signal falls more than `hysteresis` below the running
+    maximum, a valley once it rises more than `hysteresis` above the running minimum.
+    A flat extreme is reported at the middle of its run. With hysteresis 0 this finds
+    the same peaks as find_peaks(x) and valleys as find_peaks(-x).
+    """
+
+    def __init__(self, hysteresis=0.0):
+        self.hysteresis = hysteresis
+        self._mode = None  # "up" while tracking a maximum, "down" while tracking a minimum
+        self._extreme = None
+        self._start = self._end = None
+        self._tags = []
+
+    def _restart(self, index, value, tag):
+        self._extreme = value
+        self._start = self._end = index
+        self._tags = [tag]
+
+    def push(self, index, value, tag=None):
+        """
+        Adds one sample. index counts the samples pushed so far, so consecutive
+        samples differ by one; tag is carried along with the sample (e.g. its row).
+
+        Returns:
+            tuple: ("peak" or "valley", index, value, tag) when an extreme is
+            confirmed, otherwise None.
+        """
+        if self._extreme is None:
+            self._restart(index, value, tag)
+            return None
+
+        if value == self._extreme and self._end == index - 1:
+            self._end = index
+            self._tags.append(tag)
+            return None
+
+        if self._mode is None:
+            if value != self._extreme:
+                self._mode = "up" if value > self._extreme else "down"
+            self._restart(index, value, tag)
+            return None
+
+        event = None
+        rising = self._mode == "up"
+        if (value > self._extreme) if rising else (value < self._extreme):
+            self._restart(index, value, tag)
+        elif abs(value - self._extreme) > self.hysteresis:
+            middle = (self._start + self._end) // 2
+            event = ("peak" if rising else "valley", middle, self._extreme, self._tags[middle - self._start])
+            self._mode = "down" if rising else "up"
+            self._restart(index, value, tag)
+        return event
+
+
+class LoopMonitor:
+    """
+    Keeps analyse_loop's issue percentages for one loop current as samples arrive.
+
+    Every detector keeps the row numbers of what it flagged within the last `horizon`
+    samples; push() and eviction are O(1) per sample and percentages() costs
+    O(window). Pushing a whole window into a fresh monitor gives the same
+    percentages analyse_loop computes for it.
+
+    Parameters:
+        horizon (int): Samples the percentages cover, e.g. 2880 for 8 h at 10 s.
+        tolerance (float): Settling band as a fraction of the setpoint.
+        window (int): Rolling window of the zero-crossing count.
+        hysteresis (float): Minimum reversal, in measurement units, that confirms a
+            peak or valley; 0 counts every local extreme like find_peaks.
+    """
+
+    def __init__(self, horizon, tolerance=0.03, window=10, hysteresis=0.0):
+        self.horizon = horizon
+        self.tolerance = tolerance
+        self.crossings = ZeroCrossingCounter(window)
+        self.crossing_counts = CountQuantile(window)
+        self.extremes = PeakValleyTracker(hysteresis)
+        self.samples = 0
+        self.good_samples = 0
+        self.last_time = None
+        self._counts = deque()  # (row, rolling zero-crossing count)
+        self._events = {"overshoot": deque(), "undershoot": deque(), "settling": deque()}
+        self.flagged = {issue: 0 for issue in self._events}  # rows ever flagged per issue
+
+    def push(self, setpoint, meas):
+        """Adds one sample; NaN values (bad quality) are counted but never flagged."""
+        setpoint, meas = float(setpoint), float(meas)
+        row = self.samples
+        self.samples += 1
+
+        if not math.isnan(meas):
+            if abs(meas - setpoint) > setpoint * self.tolerance:
+                self._flag("settling", row)
+
+            count = self.crossings.push(meas)
+            if count is not None:
+                self._counts.append((row, count))
+                self.crossing_counts.add(count)
+
+            # Extremes are tracked over good samples only, like find_peaks on the valid rows
+            event = self.extremes.push(self.good_samples, meas, (row, setpoint))
+            self.good_samples += 1
+            if event is not None:
+                kind, _, value, (at, at_setpoint) = event
+                if kind == "peak" and value - at_setpoint > 0:
+                    self._flag("overshoot", at)
+                elif kind == "valley" and at_setpoint - value > 0:
+                    self._flag("undershoot", at)
+
+        self._evict(self.samples - self.horizon)
+
+    def _flag(self, issue, row):
+        self._events[issue].append(row)
+        self.flagged[issue] += 1
+
+    def flagged_since(self, counts):
+        """
+        Returns the rows flagged after counts, an earlier copy of self.flagged, that are
+        still within the horizon: issue -> list of rows. Oscillations are left out, as
+        their rows depend on a threshold that moves with every sample.
+        """
+        rows = {}
+        for issue, events in self._events.items():
+            new = min(self.flagged[issue] - counts.get(issue, 0), len(events))
+            rows[issue] = [events[i] for i in range(len(events) - new, len(events))]
+        return rows
+
+    def _evict(self, first_row):
+        for events in self._events.values():
+            while events and events[0] < first_row:
+                events.popleft()
+        while self._counts and self._counts[0][0] < first_row:
+            self.crossing_counts.remove(self._counts.popleft()[1])
+
+    def push_frame(self, df, pid_setpoint, pid_meas):
+        """
+        Pushes the rows of a fetched loop frame that are newer than the last push.
+
+        Returns:
+            int: Number of rows pushed.
+        """
+        times = pd.to_datetime(df['time'])
+        new = df[times > self.last_time] if self.last_time is not None else df
+        for setpoint, meas in zip(new[pid_setpoint].to_numpy(dtype=np.float64), new[pid_meas].to_numpy(dtype=np.float64)):
+            self.push(setpoint, meas)
+        if len(new):
+            self.last_time = times.iloc[-1]
+        return len(new)
+
+    def percentages(self):
+        """Returns the issue percentages over the horizon, keyed like analyse_loop's."""
+        rows = min(self.samples, self.horizon)
+        if rows == 0:
+            return {"oscillationPercentage": 0, "overshootPercentage": 0,
+                    "undershootPercentage": 0, "SettlingTimePercentage": 0}
+        threshold = self.crossing_counts.quantile(0.90)
+        oscillations = 0 if math.isnan(threshold) else self.crossing_counts.count_above(threshold)
+        return {
+            "oscillationPercentage": oscillations / rows * 100,
+            "overshootPercentage": len(self._events["overshoot"]) / rows * 100,
+            "undershootPercentage": len(self._events["undershoot"]) / rows * 100,
+            "SettlingTimePercentage": len(self._events["settling"]) / rows * 100,
+        }
@@ -0,0 +1,169 @@
+# pi_client.py
+import logging
+import threading
+from   concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+
+
+PI_TIMEZONE = 'Asia/Kolkata'
+
+logger = logging.getLogger(__name__)
+
+
+def _pi_server_factory(host):
+    import PIconnect as PI
+    PI.PIConfig.DEFAULT_TIMEZONE = PI_TIMEZONE
+    return PI.PIServer(host)
+
+
+def _average_summary():
+    try:
+        from PIconnect.PIConsts import SummaryType
+    except ImportError:  # fake_pi ignores the summary type
+        return "AVERAGE"
+    return SummaryType.AVERAGE
+
+
+class PIDataClient:
+    """
+    Long-lived PI session shared by every request.
+
+    The server connection is opened on first use and kept open, PIPoint handles are
+    cached by tag name so server.search only runs for tags not seen before, and the
+    summaries for many loops are fetched together with each tag fetched once.
+
+    Parameters:
+        host (str): PI server address.
+        source (str): Point source passed to server.search.
+        server_factory (callable): host -> PIServer-like context manager. Defaults to
+            PIconnect; pass fake_pi.FakePIServer to work offline.
+        summary_type: Summary to fetch, SummaryType.AVERAGE if None.
+        fetch_workers (int): Points of one fetch whose summaries are requested at once.
+    """
+
+    def __init__(self, host, source=None, server_factory=None, summary_type=None, fetch_workers=8):
+        self.host = host
+        self.source = source
+        self.server_factory = server_factory or _pi_server_factory
+        self.summary_type = summary_type if summary_type is not None else _average_summary()
+        self._server = None
+        self._generation = 0  # counts the sessions opened, so a failed fetch closes only its own
+        self._points = {}
+        self._lock = threading.RLock()
+        self.fetch_workers = fetch_workers
+        self._fetch_pool = None
+        self.stats = {"connects": 0, "searches": 0, "point_hits": 0, "point_misses": 0, "fetches": 0}
+
+    def _session(self):
+        if self._server is None:
+            server = self.server_factory(self.host)
+            self._server = server.__enter__() or server
+            self._generation += 1
+            self.stats["connects"] += 1
+        return self._server
+
+    def generation(self):
+        """Opens the session if needed; returns its number."""
+        with self._lock:
+            self._session()
+            return self._generation
+
+    def close(self, generation=None):
+        """
+        Exits the session and drops the point cache. With a generation, only if that
+        session is still the current one: a fetch that failed on an old session must
+        not close the one another thread has just reopened.
+        """
+        with self._lock:
+            if self._server is not None and generation in (None, self._generation):
+                try:
+                    self._server.__exit__(None, None, None)
+                finally:
+                    self._server = None
+                    self._points.clear()
+
+    def points(self, tags):
+        """Returns the cached PIPoint handles for tags, searching only for new ones."""
+        with self._lock:
+            missing = [tag for tag in tags if tag not in self._points]
+            self.stats["point_hits"] += len(tags) - len(missing)
+            self.stats["point_misses"] += len(missing)
+            if missing:
+                self.stats["searches"] += 1
+                for point in self._session().search(missing, source=self.source):
+                    self._points[point.name] = point
+            return [self._points[tag] for tag in tags if tag in self._points]
+
+    def summaries(self, tags, start, end, interval):
+        """
+        Fetches one summary column per tag in a single session.
+
+        Duplicate tags are fetched once. Tags PI does not know are left out. On a
+        failure the session and point cache are dropped, unless another thread has
+        already replaced that session, and the fetch is retried once on the current
+        connection. Safe to call from several threads at once.
+
+        Returns:
+            DataFrame: Time-indexed frame with one column per tag name.
+        """
+        tags = list(dict.fromkeys(tags))
+        generation = None
+        try:
+            generation = self.generation()
+            return self._fetch(tags, start, end, interval)
+        except Exception:
+            logger.warning("PI fetch failed, reconnecting", exc_info=True)
+            if generation is not None:
+                self.close(generation)
+            return self._fetch(tags, start, end, interval)
+
+    def _fetch(self, tags, start, end, interval):
+        # Only the session and point lookup hold the lock; the summary calls of
+        # concurrent requests run side by side on the shared connection.
+        points = self.points(tags)
+        with self._lock:
+            self.stats["fetches"] += 1
+        if not points:
+            return pd.DataFrame(index=pd.DatetimeIndex([], name='time'))
+        summaries = lambda point: point.summaries(start, end, interval, self.summary_type)
+        if self.fetch_workers > 1 and len(points) > 1:
+            # A batched fetch of many loops' tags waits for one round trip per worker, not per tag
+            with self._lock:
+                if self._fetch_pool is None:
+                    self._fetch_pool = ThreadPoolExecutor(self.fetch_workers, thread_name_prefix="pi-points")
+            frames = list(self._fetch_pool.map(summaries, points))
+        else:
+            frames = [summaries(point) for point in points]
+        df = pd.concat(frames, axis=1)
+        df.columns = [point.name for point in points]
+        df.index.name = 'time'
+        return df
+
+    def fetch_loops(self, loops, start, end, interval):
+        """
+        Fetches the union of several loops' tags in one batch and splits it per loop.
+
+        Parameters:
+            loops (dict): loop name -> {role: tag} map, as in pid-architecture.json.
+
+        Returns:
+            dict: loop name -> DataFrame with a 'time' column and one column per role.
+        """
+        return split_loops(self.summaries(loop_tags(loops), start, end, interval), loops)
+
+
+def loop_tags(loops):
+    """Returns the de-duplicated tags of several {role: tag} maps, in first-seen order."""
+    return list(dict.fromkeys(tag for tags in loops.values() for tag in tags.values()))
+
+
+def split_loops(wide, loops):
+    """Splits a frame with one column per tag into per-loop frames with role columns."""
+    frames = {}
+    for name, tags in loops.items():
+        roles = [(role, tag) for role, tag in tags.items() if tag in wide.columns]
+        frame = wide[[tag for _, tag in roles]].copy()
+        frame.columns = [role for role, _ in roles]
+        frames[name] = frame.reset_index()
+    return frames
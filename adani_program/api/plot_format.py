@@ -0,0 +1,83 @@
+# plot_format.py
+# Compact encoding of the issue plot response. Instead of one timestamp string and
+# one JSON float per sample, the time axis is sent as start + step (plus the grid rows
+# of a downsampled series) and each series as base64-packed little-endian float32,
+# with NaN where the value is missing. Series that are derived from others (the
+# acceptable limits) are replaced by their parameters. pid2.js expands the compact
+# form back into the standard response.
+import base64
+
+import numpy as np
+
+
+ENCODING = "float32-le-base64"
+TIME_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+
+def pack_values(values):
+    """Packs numbers as base64 little-endian float32; NaN/None stay NaN."""
+    array = np.asarray(values, dtype='<f4')
+    return base64.b64encode(array.tobytes()).decode('ascii')
+
+
+def pack_positions(positions):
+    """Packs row positions as base64 little-endian int32."""
+    return base64.b64encode(np.asarray(positions, dtype='<i4').tobytes()).decode('ascii')
+
+
+def time_axis(index):
+    """
+    Describes a DatetimeIndex as {"start", "step", "count"}.
+
+    step is the largest interval every timestamp lies on. When the index does not
+    fill that grid (a downsampled series), "rows" carries the packed int32 grid row
+    of each timestamp.
+
+    Returns:
+        dict or None: None when the index cannot be put on a grid, which then has to
+        be sent as timestamps.
+    """
+    if len(index) == 0:
+        return {"start": None, "step": 0, "count": 0}
+    times = index.asi8
+    steps = np.diff(times)
+    step = int(np.gcd.reduce(steps)) if len(steps) else 0
+    axis = {"start": index[0].strftime(TIME_FORMAT), "step": step / 1e9, "count": len(index)}
+    if len(steps) and (steps != step).any():
+        if step == 0:
+            return None
+        rows = (times - times[0]) // step
+        if np.abs(rows).max() > np.iinfo(np.int32).max:
+            return None
+        axis["rows"] = pack_positions(rows)
+    return axis
+
+
+def compact_plot_data(response, index, columns, issue_positions, tolerance):
+    """
+    Turns a standard plot response (without its timestamps and series) into the
+    compact form.
+
+    Parameters:
+        response (dict): Response fields other than "timestamps" and "series".
+        index (DatetimeIndex): Time axis of the loop frame.
+        columns (dict): Series name -> values, sent packed.
+        issue_positions (array): Row positions of the issue points; their values are
+            the measured output at those rows.
+        tolerance (float): Acceptable band, sent instead of the limit series.
+
+    Returns:
+        dict: The compact response.
+    """
+    compact = dict(response)
+    compact["format"] = "compact"
+    compact["encoding"] = ENCODING
+    compact["errorMargin"] = tolerance * 100
+    axis = time_axis(index)
+    if axis is None:
+        compact["timestamps"] = index.strftime(TIME_FORMAT).tolist()
+    else:
+        compact["time"] = axis
+    compact["series"] = {name: pack_values(values) for name, values in columns.items()}
+    compact["issuePositions"] = pack_positions(issue_positions)
+    return compact
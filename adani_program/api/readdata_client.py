@@ -0,0 +1,169 @@
+# readdata_client.py
+# Client for the Kawai readdata HTTP source (POST /kawai/api/v1/readdata), which
+# returns long-format rows {"time", "sensorid", "measurement"} under "data".
+import codecs
+import json
+import threading
+from   concurrent.futures import ThreadPoolExecutor
+from   datetime import timedelta
+
+import numpy as np
+import pandas as pd
+import requests
+from   requests.adapters import HTTPAdapter
+from   urllib3.util.retry import Retry
+
+
+READDATA_URL = 'http://10.79.58.13/kawai/api/v1/readdata'
+TIME_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+
+def iter_record_batches(chunks, encoding='utf-8'):
+    """
+    Parses a streamed readdata body into batches of records as the bytes arrive,
+    so the whole body is never held in memory at once.
+
+    Parameters:
+        chunks (iterable): Raw body chunks (bytes), e.g. response.iter_content().
+
+    Yields:
+        list: Record dicts found in each chunk, in body order.
+    """
+    decoder = codecs.getincrementaldecoder(encoding)()
+    scan = json.JSONDecoder().raw_decode
+    buffer = ""
+    state = "before"  # before the "data" array, inside it, or past its end
+    for chunk in chunks:
+        if state == "after":
+            break
+        buffer += decoder.decode(chunk)
+        if state == "before":
+            key = buffer.find('"data"')
+            start = buffer.find('[', key) if key >= 0 else -1
+            if start < 0:
+                continue
+            buffer = buffer[start + 1:]
+            state = "inside"
+
+        batch, pos = [], 0
+        while True:
+            while pos < len(buffer) and buffer[pos] in ' \r\n\t,':
+                pos += 1
+            if pos < len(buffer) and buffer[pos] == ']':
+                state = "after"
+                break
+            try:
+                record, pos = scan(buffer, pos)
+            except ValueError:  # the next record is not complete yet
+                break
+            batch.append(record)
+        buffer = buffer[pos:]
+        if batch:
+            yield batch
+
+
+def wide_frame(times, sensors, values):
+    """
+    Builds the wide frame df.pivot(index='time', columns='sensorid') would, in one
+    scatter into a NaN-filled array. Later rows win when a (time, sensor) pair repeats.
+
+    Returns:
+        DataFrame: 'time' column plus one float column per sensor, sorted by time.
+    """
+    times = pd.to_datetime(pd.Series(times, dtype=object), errors='coerce')
+    good = times.notna().to_numpy()
+    time_codes, time_index = pd.factorize(times[good], sort=True)
+    sensor_codes, sensor_names = pd.factorize(pd.Series(sensors, dtype=object)[good], sort=True)
+    grid = np.full((len(time_index), len(sensor_names)), np.nan)
+    grid[time_codes, sensor_codes] = pd.to_numeric(pd.Series(values, dtype=object)[good], errors='coerce')
+
+    df = pd.DataFrame(grid, columns=list(sensor_names))
+    df.insert(0, 'time', time_index)
+    return df
+
+
+class ReadDataClient:
+    """
+    Pooled, concurrent client for readdata.
+
+    One keep-alive session is shared by every call. A long window is split into
+    slices of `chunk` that are requested in parallel, each body is parsed as it
+    streams in, and the slices are merged into one wide frame.
+
+    Parameters:
+        url (str): readdata endpoint.
+        table (str): tableName sent with every request.
+        chunk (timedelta): Longest time range one request asks for.
+        max_workers (int): Slices in flight at once; also the connection pool size.
+        timeout (float): Seconds to wait for a slice to connect / send data.
+        retries (int): Retries per slice on connection errors and 5xx responses.
+    """
+
+    def __init__(self, url=READDATA_URL, table="sensordataKawai", chunk=timedelta(hours=6),
+                 max_workers=8, timeout=10, retries=2):
+        self.url = url
+        self.table = table
+        self.chunk = pd.Timedelta(chunk)
+        self.timeout = timeout
+        self.session = requests.Session()
+        retry = Retry(total=retries, backoff_factor=0.2, status_forcelist=(502, 503, 504),
+                      allowed_methods=None)  # readdata is a read, so POST is safe to retry
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max_workers, max_retries=retry)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self.pool = ThreadPoolExecutor(max_workers, thread_name_prefix="readdata")
+        self.stats = {"requests": 0, "records": 0}
+        self._stats_lock = threading.Lock()  # slices finish on pool threads
+
+    def close(self):
+        self.pool.shutdown(wait=True)
+        self.session.close()
+
+    def slices(self, start, end):
+        """Splits [start, end] into consecutive windows no longer than chunk."""
+        start, end = pd.Timestamp(start), pd.Timestamp(end)
+        if start > end:
+            raise ValueError(f"start {start} is after end {end}")
+        edges = list(pd.date_range(start, end, freq=self.chunk))
+        if edges[-1] != end:
+            edges.append(end)
+        if len(edges) == 1:
+            return [(start, end)]
+        return list(zip(edges[:-1], edges[1:]))
+
+    def fetch_slice(self, tags, start, end, table=None):
+        """Fetches one window; returns (times, sensorids, measurements) lists."""
+        payload = {
+            "tableName": table or self.table,
+            "sensorids": list(tags),
+            "starttime": pd.Timestamp(start).strftime(TIME_FORMAT),
+            "endtime": pd.Timestamp(end).strftime(TIME_FORMAT),
+        }
+        times, sensors, values = [], [], []
+        with self.session.post(self.url, json=payload, timeout=self.timeout, stream=True) as response:
+            response.raise_for_status()
+            for batch in iter_record_batches(response.iter_content(chunk_size=1 << 16)):
+                for record in batch:
+                    times.append(record["time"])
+                    sensors.append(record["sensorid"])
+                    values.append(record["measurement"])
+        with self._stats_lock:
+            self.stats["requests"] += 1
+            self.stats["records"] += len(times)
+        return times, sensors, values
+
+    def fetch(self, tags, start, end, table=None):
+        """
+        Fetches tags over [start, end] as a wide frame, like getdata in trial/pidtuner.py.
+        table overrides the client's tableName for this call.
+
+        Returns:
+            DataFrame: 'time' column plus one column per sensor id that returned data.
+        """
+        parts = self.pool.map(lambda window: self.fetch_slice(tags, *window, table=table), self.slices(start, end))
+        times, sensors, values = [], [], []
+        for part_times, part_sensors, part_values in parts:
+            times += part_times
+            sensors += part_sensors
+            values += part_values
+        return wide_frame(times, sensors, values)
@@ -0,0 +1,74 @@
+# result_cache.py
+import threading
+import time
+from   collections import OrderedDict
+
+
+class ResultCache:
+    """
+    Finished analysis responses, kept as serialized JSON bytes so a repeated request
+    skips the fetch, the analysis and the encoding.
+
+    Entries expire ttl seconds after they were stored. When either max_entries or
+    max_bytes would be exceeded, the least recently used entries are dropped.
+
+    Parameters:
+        ttl (float): Seconds an entry stays valid; 0 disables the cache.
+        max_entries (int): Most entries kept at once.
+        max_bytes (int): Memory budget for the stored bodies.
+        clock (callable): Time source in seconds, time.monotonic by default.
+    """
+
+    def __init__(self, ttl=30.0, max_entries=256, max_bytes=64 << 20, clock=time.monotonic):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.clock = clock
+        self._entries = OrderedDict()  # key -> (expires, body), least recently used first
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0, "expired": 0, "evictions": 0, "entries": 0, "bytes": 0}
+
+    def get(self, key):
+        """Returns the stored body for key, or None if it is missing or expired."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] <= self.clock():
+                self._drop(key)
+                self.stats["expired"] += 1
+                entry = None
+            if entry is None:
+                self.stats["misses"] += 1
+                return None
+            self._entries.move_to_end(key)
+            self.stats["hits"] += 1
+            return entry[1]
+
+    def put(self, key, body):
+        """Stores body (bytes) under key; bodies larger than the whole budget are not kept."""
+        if self.ttl <= 0 or len(body) > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._drop(key)
+            self._entries[key] = (self.clock() + self.ttl, body)
+            self._bytes += len(body)
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                self._drop(next(iter(self._entries)))
+                self.stats["evictions"] += 1
+            self._update_size()
+
+    def _drop(self, key):
+        _, body = self._entries.pop(key)
+        self._bytes -= len(body)
+        self._update_size()
+
+    def _update_size(self):
+        self.stats["entries"] = len(self._entries)
+        self.stats["bytes"] = self._bytes
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+            self._update_size()
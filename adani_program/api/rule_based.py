@@ -3,11 +3,14 @@ import numpy as np
 import pandas as pd
 from   scipy.signal import find_peaks
 import matplotlib.pyplot as plt
+from   simulation import simulate_pid_array
+from   data_quality import NoGoodData, first_valid, json_values, last_valid, valid_positions
 
 
 def detect_overshoot(df, pid_setpoint, pid_meas, control_valve,cv_high,cv_low):
-    peaks, _ = find_peaks(df[pid_meas])
-    overshoot_df = df.iloc[peaks].copy()
+    valid = valid_positions(df, [pid_meas])  # peaks are searched across bad-quality gaps
+    peaks, _ = find_peaks(df[pid_meas].to_numpy()[valid])
+    overshoot_df = df.iloc[valid[peaks]].copy()
     overshoot_df["overshoot_amount"] = overshoot_df[pid_meas] - overshoot_df[pid_setpoint]
     overshoot_df = overshoot_df[overshoot_df["overshoot_amount"] > 0]  # True overshoot only
     overshoot_df["control_valve_high"] = overshoot_df[control_valve] > cv_high
@@ -15,8 +18,9 @@ def detect_overshoot(df, pid_setpoint, pid_meas, control_valve,cv_high,cv_low):
     return overshoot_df
 
 def detect_undershoot(df, pid_setpoint, pid_meas, control_valve,cv_high,cv_low):
-    valleys, _ = find_peaks(-df[pid_meas])  # Find local minima (valleys)
-    undershoot_df = df.iloc[valleys].copy()
+    valid = valid_positions(df, [pid_meas])
+    valleys, _ = find_peaks(-df[pid_meas].to_numpy()[valid])  # Find local minima (valleys)
+    undershoot_df = df.iloc[valid[valleys]].copy()
     undershoot_df["undershoot_amount"] = undershoot_df[pid_setpoint] - undershoot_df[pid_meas]
     undershoot_df = undershoot_df[undershoot_df["undershoot_amount"] > 0]  # True undershoot only
     undershoot_df["control_valve_high"] = undershoot_df[control_valve] > cv_high
@@ -25,6 +29,7 @@ def detect_undershoot(df, pid_setpoint, pid_meas, control_valve,cv_high,cv_low):
 
 
 def detect_sluggish_response(df, pid_setpoint, pid_meas, control_valve,cv_low):
+    # NaN (bad quality) compares False, so bad samples are never flagged here or below
     return df[(df[pid_meas] < df[pid_setpoint]) & (df[control_valve] < cv_low)]
 
 # Function to detect long settling time (Adaptive Threshold)
@@ -34,10 +39,11 @@ def detect_settling_time(df, pid_setpoint, pid_meas, tolerance=0.03):  # 5% of s
 
 # Function to detect oscillations using Zero-Crossing Rate
 def detect_oscillations(df, pid_meas, window=10):
-    diff = np.sign(df[pid_meas].diff())
+    good_df = df.iloc[valid_positions(df, [pid_meas])]  # NaN would count as a sign change
+    diff = np.sign(good_df[pid_meas].diff())
     zero_crossings = (diff != diff.shift(1)).astype(int).rolling(window=window).sum()
     threshold = zero_crossings.quantile(0.90)  # High-frequency changes
-    return df[zero_crossings > threshold]
+    return good_df[zero_crossings > threshold]
 
 
 class PID:
@@ -69,7 +75,7 @@ def simulate_pid_response(
     process_gain=0.01,
 ):
     """
-    Simulates PID response using a class-based approach and returns the simulated response.
+    Simulates PID response on the array engine in simulation.py and returns the simulated response.
 
     Parameters:
         df (DataFrame): DataFrame containing the time series.
@@ -83,20 +89,18 @@ def simulate_pid_response(
     Returns:
         np.ndarray: Simulated PID-controlled response values.
     """
-    time = np.arange(len(df))
-    setpoint = df[setpoint_col]
-    measured_value = df[measured_col].iloc[0]
-
-    pid = PID(Kp, Ki, Kd)
-    simulated_values = []
-
-    for i in range(len(df)):
-        output = pid.update(setpoint.iloc[i], measured_value, dt)
-        measured_value += process_gain * output
-        simulated_values.append(measured_value)
-
+    initial = first_valid(df[measured_col])
+    if initial is None:
+        raise NoGoodData(measured_col)
+    return simulate_pid_array(
+        # Bad-quality setpoints hold the last good value; the start is the first good measurement.
+        df[setpoint_col].astype(float).ffill().bfill().to_numpy(),
+        initial,
+        Kp, Ki, Kd,
+        dt=dt,
+        process_gain=process_gain,
+    )
 
-    return np.array(simulated_values)
 def suggest_pid_tuning(issue,pid,closedloop,openLoop,):
     """Suggest adjustments to Kp, Ki, and Kd based on detected issues."""
     tuning_recommendations = {}
@@ -228,14 +232,14 @@ def prepare_issue_plot_data(df, issue_df, pid_meas, pid_setpoint,closedloop,open
         "parameters":{"closed_loop":closedloop,"open_loop":openLoop},
         "suggestedParameters":{"closed_loop":tuning_suggestions[0]["tuning"].get("PID2",empty),"open_loop":tuning_suggestions[0]["tuning"].get("PID1",empty)},
         "recommendation":tuning_suggestions[0]["message"],
-        "setpoint":df[pid_setpoint].tolist()[-1],
+        "setpoint":last_valid(df[pid_setpoint]),
         "status": status,
         "series": {
-            "Setpoint": df[pid_setpoint].tolist(),
-            "Upper Acceptable Limit": (df[pid_setpoint] * (1 + tolerance)).tolist(),
-            "Lower Acceptable Limit": (df[pid_setpoint] * (1 - tolerance)).tolist(),
-            "Measured Output": df[pid_meas].tolist(),
-            "finetunedValues": df["finetunedValues"].tolist()
+            "Setpoint": json_values(df[pid_setpoint]),
+            "Upper Acceptable Limit": json_values(df[pid_setpoint] * (1 + tolerance)),
+            "Lower Acceptable Limit": json_values(df[pid_setpoint] * (1 - tolerance)),
+            "Measured Output": json_values(df[pid_meas]),
+            "finetunedValues": json_values(df["finetunedValues"])
         }
     }
 
@@ -0,0 +1,159 @@
+# scheduler.py
+# In-process background refresh of every loop in pid-architecture.json. Each round
+# fetches the live window of every loop, runs detection and suggestion, and keeps
+# the result, so /loopHealth answers from memory and /fetchPISummaries can analyse
+# a loop without waiting for PI.
+import threading
+import time
+import traceback
+from   concurrent.futures import ThreadPoolExecutor
+from   datetime import datetime, timedelta
+
+from   fleet import fleet_summary, iter_loops, load_architecture, summarise_loop
+
+
+def _tags_key(tags):
+    return tuple(sorted(tags.items()))
+
+
+class HealthScheduler:
+    """
+    Periodically analyses every loop and keeps the latest health per loop.
+
+    Loops are refreshed in priority order: loops never analysed first, then loops
+    whose issue percentages rose since their previous run (largest rise first),
+    then the longest-unrefreshed. At most max_concurrency loops are fetched and
+    analysed at once, so PI sees a bounded number of requests.
+
+    Parameters:
+        fetch_frame (callable): (tags, start, end, interval) -> role-named loop
+            frame, e.g. Index1.fetch_loop_frame.
+        analyse (callable): analyse_loop, see fleet.summarise_loop.
+        architecture (dict): Parsed pid-architecture.json, loaded from the default path if None.
+        period (float): Seconds between the starts of two rounds.
+        batch_size (int): Loops refreshed per round, all of them if None.
+        max_concurrency (int): Loops in flight at once.
+        hours (float): Length of the analysed window, ending at the time of the run.
+        time_interval (str): PI summary interval.
+    """
+
+    def __init__(self, fetch_frame, analyse=None, architecture=None, period=300.0, batch_size=None,
+                 max_concurrency=2, hours=8.0, time_interval='10s'):
+        self.fetch_frame = fetch_frame
+        self.analyse = analyse
+        self.architecture = architecture
+        self.period = period
+        self.batch_size = batch_size
+        self.max_concurrency = max_concurrency
+        self.hours = hours
+        self.time_interval = time_interval
+        self._health = {}   # pid path -> latest summary entry
+        self._frames = {}   # pid path -> (monotonic time, endtime, loop frame)
+        self._by_tags = {}  # sorted tag items -> pid path
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self.stats = {"rounds": 0, "refreshed": 0, "errors": 0, "frame_hits": 0, "frame_misses": 0}
+
+    def loops(self):
+        if self.architecture is None:
+            self.architecture = load_architecture()
+        return dict(iter_loops(self.architecture))
+
+    def priority(self, pid_path):
+        """Sort key: smaller runs first."""
+        entry = self._health.get(pid_path)
+        if entry is None:
+            return (0, 0.0, 0.0)
+        rise = max(entry["trend"].values(), default=0.0)
+        return (1, -max(rise, 0.0), entry["refreshed"])
+
+    def run_once(self):
+        """Refreshes one round of loops; returns the pid paths refreshed, in order."""
+        configs = self.loops()
+        with self._lock:
+            order = sorted(configs, key=self.priority)
+        if self.batch_size:
+            order = order[:self.batch_size]
+        with ThreadPoolExecutor(self.max_concurrency, thread_name_prefix="health") as pool:
+            list(pool.map(lambda pid_path: self.refresh(pid_path, configs[pid_path]), order))
+        self.stats["rounds"] += 1
+        return order
+
+    def refresh(self, pid_path, config):
+        """Fetches and analyses one loop now, and stores its health and frame."""
+        endtime = datetime.now()
+        try:
+            df = self.fetch_frame(config["tags"], endtime - timedelta(hours=self.hours), endtime, self.time_interval)
+            entry = summarise_loop(pid_path, config, df.copy(), self.analyse)  # analyse_loop modifies its frame
+        except Exception as e:
+            traceback.print_exc()
+            df, entry = None, {"pidPath": pid_path, "tags": config["tags"], "status": "error", "error": str(e)}
+
+        with self._lock:
+            previous = self._health.get(pid_path, {}).get("percentages", {})
+            current = entry.get("percentages", {})
+            entry["trend"] = {key: value - previous[key] for key, value in current.items() if key in previous}
+            entry["refreshed"] = time.monotonic()
+            entry["endtime"] = endtime.strftime('%Y-%m-%d %H:%M:%S')
+            self._health[pid_path] = entry
+            if df is not None:
+                self._frames[pid_path] = (entry["refreshed"], endtime, df)
+                self._by_tags[_tags_key(config["tags"])] = pid_path
+            self.stats["refreshed"] += 1
+            self.stats["errors"] += entry["status"] == "error"
+        return entry
+
+    def recent_frame(self, tags, max_age):
+        """
+        Returns a copy of the scheduled live-window frame for a loop's tags if it is at
+        most max_age seconds old, else None.
+        """
+        with self._lock:
+            pid_path = self._by_tags.get(_tags_key(tags))
+            stored = self._frames.get(pid_path)
+            if stored is None or time.monotonic() - stored[0] > max_age:
+                self.stats["frame_misses"] += 1
+                return None
+            self.stats["frame_hits"] += 1
+            return stored[2].copy()
+
+    def report(self):
+        """Returns the latest health of every refreshed loop, in the shape of scan_fleet's report."""
+        now = time.monotonic()
+        with self._lock:
+            loops = []
+            for entry in self._health.values():
+                entry = {key: value for key, value in entry.items() if key != "refreshed"}
+                entry["age"] = round(now - self._health[entry["pidPath"]]["refreshed"], 1)
+                loops.append(entry)
+        return {
+            "time_interval": self.time_interval,
+            "hours": self.hours,
+            "period": self.period,
+            "summary": fleet_summary(loops),
+            "loops": loops,
+        }
+
+    def start(self):
+        """Starts the refresh rounds on a daemon thread."""
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="health-scheduler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _run(self):
+        while not self._stop.is_set():
+            started = time.monotonic()
+            try:
+                self.run_once()
+            except Exception:
+                traceback.print_exc()
+            self._stop.wait(max(0.0, self.period - (time.monotonic() - started)))
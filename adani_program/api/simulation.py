@@ -0,0 +1,231 @@
+# simulation.py
+import numpy as np
+
+try:
+    from numba import njit
+except ImportError:  # numba is optional, the plain loop is used without it
+    njit = None
+
+
+def _pid_loop(setpoint, out, measured_value, Kp, Ki, Kd, dt, process_gain, integral_limit):
+    # Same recurrence and operation order as PID.update in rule_based.py, so the
+    # results match the class-based loop exactly.
+    integral = 0.0
+    previous_error = 0.0
+    has_derivative = dt > 0
+    for i in range(len(setpoint)):
+        error = setpoint[i] - measured_value
+        integral += error * dt
+        if integral > integral_limit:
+            integral = integral_limit
+        elif integral < -integral_limit:
+            integral = -integral_limit
+        derivative = (error - previous_error) / dt if has_derivative else 0.0
+        output = Kp * error + Ki * integral + Kd * derivative
+        previous_error = error
+        measured_value += process_gain * output
+        out[i] = measured_value
+    return out
+
+
+_pid_loop_compiled = njit(cache=True)(_pid_loop) if njit is not None else None
+
+
+def simulate_pid_array(
+    setpoint,
+    initial_value,
+    Kp,
+    Ki,
+    Kd,
+    dt=0.1,
+    process_gain=0.01,
+    integral_limit=5000,
+):
+    """
+    Simulates the PID response over a NumPy setpoint trace.
+
+    The recurrence runs in a numba-compiled kernel when numba is installed and in a
+    plain Python loop over native floats otherwise; neither touches pandas per sample.
+
+    Parameters:
+        setpoint (array-like): Setpoint values, one per sample.
+        initial_value (float): Measured value at the first sample.
+        Kp, Ki, Kd (float): PID gains.
+        dt (float): Time interval between samples.
+        process_gain (float): Gain factor simulating process dynamics.
+        integral_limit (float): Anti-windup clamp on the integral term.
+
+    Returns:
+        np.ndarray: Simulated PID-controlled response values.
+    """
+    setpoint = np.ascontiguousarray(setpoint, dtype=np.float64)
+    args = (float(initial_value), float(Kp), float(Ki), float(Kd),
+            float(dt), float(process_gain), float(integral_limit))
+
+    if _pid_loop_compiled is not None:
+        return _pid_loop_compiled(setpoint, np.empty_like(setpoint), *args)
+
+    out = _pid_loop(setpoint.tolist(), [0.0] * len(setpoint), *args)
+    return np.array(out, dtype=np.float64)
+
+
+def gain_grid(kp_values, ki_values, kd_values):
+    """
+    Builds the (N, 3) candidate matrix for every combination of the given gains.
+
+    Parameters:
+        kp_values, ki_values, kd_values (array-like): Values to sweep for each gain.
+
+    Returns:
+        np.ndarray: Rows of (Kp, Ki, Kd), Kp varying slowest.
+    """
+    grids = np.meshgrid(
+        np.asarray(kp_values, dtype=np.float64),
+        np.asarray(ki_values, dtype=np.float64),
+        np.asarray(kd_values, dtype=np.float64),
+        indexing="ij",
+    )
+    return np.stack(grids, axis=-1).reshape(-1, 3)
+
+
+def simulate_pid_batch(
+    setpoint,
+    initial_value,
+    gains,
+    dt=0.1,
+    process_gain=0.01,
+    integral_limit=5000,
+    tolerance=0.03,
+    return_responses=True,
+):
+    """
+    Simulates many (Kp, Ki, Kd) candidates against the same setpoint trace at once.
+
+    Time is stepped once and every candidate is advanced together with NumPy vector
+    operations, so row i of the result equals simulate_pid_array with gains[i].
+    Metrics are accumulated during the pass, so they are available even when
+    return_responses is False and the (N, T) matrix is never allocated.
+
+    Parameters:
+        setpoint (array-like): Setpoint values, one per sample (length T).
+        initial_value (float): Measured value at the first sample.
+        gains (array-like): (N, 3) matrix of Kp, Ki, Kd rows.
+        dt (float): Time interval between samples.
+        process_gain (float): Gain factor simulating process dynamics.
+        integral_limit (float): Anti-windup clamp on the integral term.
+        tolerance (float): Settling band as a fraction of the setpoint.
+        return_responses (bool): If False, skip storing the response matrix.
+
+    Returns:
+        tuple: (responses, metrics) where responses is an (N, T) array (or None) and
+        metrics is a dict of length-N arrays:
+            "iae"           - integral of absolute error
+            "ise"           - integral of squared error
+            "overshoot"     - largest excursion above the setpoint (0 if none)
+            "settling_time" - time after which the response stays inside the
+                              tolerance band (inf if it never settles)
+    """
+    setpoint = np.ascontiguousarray(setpoint, dtype=np.float64)
+    gains = np.atleast_2d(np.asarray(gains, dtype=np.float64))
+    if gains.ndim != 2 or gains.shape[1] != 3:
+        raise ValueError("gains must be an (N, 3) matrix of Kp, Ki, Kd")
+
+    n_candidates = gains.shape[0]
+    n_samples = setpoint.shape[0]
+    kp, ki, kd = gains[:, 0].copy(), gains[:, 1].copy(), gains[:, 2].copy()
+
+    measured_value = np.full(n_candidates, float(initial_value))
+    integral = np.zeros(n_candidates)
+    previous_error = np.zeros(n_candidates)
+    error = np.empty(n_candidates)
+    output = np.empty(n_candidates)
+    term = np.empty(n_candidates)
+
+    iae = np.zeros(n_candidates)
+    ise = np.zeros(n_candidates)
+    overshoot = np.zeros(n_candidates)
+    last_outside = np.full(n_candidates, -1, dtype=np.int64)
+
+    # Stored time-major so each step writes one contiguous row.
+    responses = np.empty((n_samples, n_candidates)) if return_responses else None
+    band = np.abs(setpoint) * tolerance
+
+    for i in range(n_samples):
+        sp = setpoint[i]
+        np.subtract(sp, measured_value, out=error)
+        integral += error * dt
+        np.clip(integral, -integral_limit, integral_limit, out=integral)
+
+        np.multiply(kp, error, out=output)
+        np.multiply(ki, integral, out=term)
+        output += term
+        if dt > 0:
+            np.subtract(error, previous_error, out=term)
+            term /= dt
+        else:
+            term.fill(0.0)
+        term *= kd
+        output += term
+        previous_error, error = error, previous_error
+
+        output *= process_gain
+        measured_value += output
+        if responses is not None:
+            responses[i] = measured_value
+
+        # Metrics against the simulated value just produced for this sample.
+        np.subtract(measured_value, sp, out=term)
+        np.maximum(overshoot, term, out=overshoot)
+        np.abs(term, out=term)
+        iae += term * dt
+        last_outside[term > band[i]] = i
+        term *= term
+        ise += term * dt
+
+    settling_time = (last_outside + 1) * dt
+    settling_time[(last_outside >= 0) & (last_outside == n_samples - 1)] = np.inf
+    metrics = {
+        "iae": iae,
+        "ise": ise,
+        "overshoot": overshoot,
+        "settling_time": settling_time,
+    }
+    return (responses.T if responses is not None else None), metrics
+
+
+def pid_metrics(responses, setpoint, dt=0.1, tolerance=0.03):
+    """
+    Computes the simulate_pid_batch metrics for responses that are already simulated.
+
+    Parameters:
+        responses (array-like): One response (length T) or an (N, T) matrix.
+        setpoint (array-like): Setpoint values, one per sample.
+        dt (float): Time interval between samples.
+        tolerance (float): Settling band as a fraction of the setpoint.
+
+    Returns:
+        dict: "iae", "ise", "overshoot" and "settling_time", as floats for a single
+        response or length-N arrays for a matrix.
+    """
+    setpoint = np.asarray(setpoint, dtype=np.float64)
+    single = np.ndim(responses) == 1
+    responses = np.atleast_2d(np.asarray(responses, dtype=np.float64))
+    n_samples = responses.shape[1]
+
+    error = responses - setpoint
+    abs_error = np.abs(error)
+    outside = abs_error > np.abs(setpoint) * tolerance
+    last_outside = n_samples - 1 - np.argmax(outside[:, ::-1], axis=1)
+    last_outside[~outside.any(axis=1)] = -1
+
+    settling_time = (last_outside + 1) * dt
+    settling_time[(last_outside >= 0) & (last_outside == n_samples - 1)] = np.inf
+    metrics = {
+        "iae": abs_error.sum(axis=1) * dt,
+        "ise": (error * error).sum(axis=1) * dt,
+        "overshoot": error.max(axis=1, initial=0.0),
+        "settling_time": settling_time,
+    }
+    if single:
+        return {k: float(v[0]) for k, v in metrics.items()}
+    return metrics
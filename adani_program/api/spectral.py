@@ -0,0 +1,242 @@
+# spectral.py
+# Oscillation detection in the frequency domain. Every tag is cut into long sliding
+# windows; the windows of all tags are stacked into one matrix, so the Welch power
+# spectra of the whole plant come from one batched FFT and the autocorrelations from
+# a second one. Per window this gives the period of the strongest oscillation, its
+# amplitude, and a regularity-based confidence that separates a limit cycle from
+# noise and slow drift. scipy.fft spreads the rows of those batched FFTs over all
+# cores (workers=-1), which a call per tag cannot.
+import numpy as np
+from   numpy.lib.stride_tricks import sliding_window_view
+from   scipy import fft
+
+
+def _window_rows(signals, length, hop):
+    """(tags, T) -> (tags, windows, length) view of the sliding windows, and their starts."""
+    starts = np.arange(0, signals.shape[1] - length + 1, hop)
+    return sliding_window_view(signals, length, axis=1)[:, starts], starts
+
+
+def _detrend(rows):
+    """Removes the least-squares line from every row."""
+    t = np.arange(rows.shape[-1], dtype=np.float64)
+    t -= t.mean()
+    centred = rows - rows.mean(axis=-1, keepdims=True)
+    return centred - np.outer((centred @ t) / (t @ t), t).reshape(rows.shape)
+
+
+def analysis_windows(signals, dt, window=14400.0, hop=3600.0, max_bad=0.1):
+    """
+    Cuts (tags, T) signals into the sliding windows the spectral analyses work on.
+
+    Bad samples take the mean of their window, and every window is detrended; windows
+    with more than max_bad bad samples are zeroed and marked unusable.
+
+    Returns:
+        tuple: ((tags * windows, length) rows, usable mask per row, window starts,
+        window length in samples).
+    """
+    signals = np.atleast_2d(np.asarray(signals, dtype=np.float64))
+    length = min(max(int(round(window / dt)), 8), signals.shape[1])
+    windows, starts = _window_rows(signals, length, max(int(round(hop / dt)), 1))
+    rows = windows.reshape(-1, length)
+    bad = np.isnan(rows)
+    usable = bad.mean(axis=1) <= max_bad
+    # With max_bad small, filling with the mean barely moves the spectrum
+    filled = np.where(bad, np.nanmean(np.where(usable[:, None], rows, 0.0), axis=1, keepdims=True), rows)
+    return _detrend(np.where(usable[:, None], filled, 0.0)), usable, starts, length
+
+
+def welch_psd(rows, segment, dt, workers=-1):
+    """
+    One-sided Welch power spectral density of every row: Hann-windowed segments with
+    50% overlap, all rows and segments in one FFT call.
+
+    Returns:
+        tuple: (frequencies in Hz, (rows, bins) PSD scaled so each row sums to the
+        variance of the row, i.e. per-bin power).
+    """
+    segments = sliding_window_view(rows, segment, axis=-1)[:, ::max(segment // 2, 1)]
+    segments = segments - segments.mean(axis=-1, keepdims=True)
+    hann = np.hanning(segment)
+    power = np.abs(fft.rfft(segments * hann, axis=-1, workers=workers)) ** 2
+    one_sided = np.full(power.shape[-1], 2.0)
+    one_sided[0] = 1.0
+    if segment % 2 == 0:
+        one_sided[-1] = 1.0
+    psd = (power * one_sided).mean(axis=1) / (segment * (hann ** 2).sum())
+    return fft.rfftfreq(segment, dt), psd
+
+
+def welch_cross(a, b, segment, dt, workers=-1):
+    """
+    Welch cross-spectrum of the rows of a with the rows of b, both stacked into one
+    FFT call, with the same segments and Hann window as welch_psd.
+
+    Returns:
+        tuple: (frequencies in Hz, coherence |Pab|^2 / (Paa Pbb), phase of b relative
+        to a in degrees), each (rows, bins).
+    """
+    segments = sliding_window_view(np.stack([a, b]), segment, axis=-1)[:, :, ::max(segment // 2, 1)]
+    segments = segments - segments.mean(axis=-1, keepdims=True)
+    spectra = fft.rfft(segments * np.hanning(segment), axis=-1, workers=workers)
+    paa, pbb = (np.abs(spectra) ** 2).mean(axis=2)
+    pab = (np.conj(spectra[0]) * spectra[1]).mean(axis=1)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        coherence = np.abs(pab) ** 2 / (paa * pbb)
+    return fft.rfftfreq(segment, dt), coherence, np.degrees(np.angle(pab))
+
+
+def autocorrelation(rows, max_lag=None, workers=-1):
+    """
+    Unbiased, normalised autocorrelation of every row for lags 0..max_lag (all lags if
+    None), via FFT; padding the rows by max_lag is enough to keep those lags free of
+    wrap-around.
+    """
+    length = rows.shape[-1]
+    lags = length if max_lag is None else min(int(max_lag) + 1, length)
+    size = fft.next_fast_len(length + lags, real=True)
+    spectrum = fft.rfft(rows, size, axis=-1, workers=workers)
+    acf = fft.irfft(np.abs(spectrum) ** 2, size, axis=-1, workers=workers)[:, :lags] / np.arange(length, length - lags, -1)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return acf / acf[:, :1]
+
+
+def _at_lag(acf, lags):
+    """Linear interpolation of each row of acf at its own fractional lag."""
+    lags = np.clip(np.nan_to_num(lags), 0, acf.shape[1] - 1)
+    low = np.floor(lags).astype(np.intp)
+    high = np.minimum(low + 1, acf.shape[1] - 1)
+    rows = np.arange(len(acf))
+    return acf[rows, low] + (lags - low) * (acf[rows, high] - acf[rows, low])
+
+
+def segment_length(dt, length, segment=None):
+    """Welch segment length in samples: segment seconds, or half the window if None."""
+    return min(max(int(round(segment / dt)) if segment else length // 2, 8), length)
+
+
+def oscillation_scan(signals, dt, window=14400.0, hop=3600.0, segment=None, min_period=None,
+                     max_period=None, min_confidence=0.5, min_amplitude=0.0, max_bad=0.1):
+    """
+    Finds sustained oscillations in many tags at once.
+
+    Parameters:
+        signals (array-like): (tags, T) samples on one time grid, NaN for bad quality;
+            a 1-D series is one tag.
+        dt (float): Seconds between samples.
+        window, hop (float): Length of the analysis windows and the step between
+            them, in seconds; a series shorter than window is one window.
+        segment (float): Welch segment length in seconds, window / 2 if None.
+        min_period, max_period (float): Periods searched, in seconds; 4 samples and
+            segment / 2 by default, so every segment holds at least two cycles.
+        min_confidence (float): Confidence at which a window counts as oscillating.
+        min_amplitude (float): Smallest amplitude that counts, in the tag's units.
+        max_bad (float): Largest fraction of bad samples a window may hold.
+
+    Returns:
+        dict: (tags, windows) arrays:
+            "start", "end" - row positions of each window (end exclusive)
+            "period" - seconds per cycle of the strongest spectral peak
+            "amplitude" - its amplitude (half the peak-to-peak swing)
+            "concentration" - fraction of the window's variance in that peak
+            "confidence" - (acf(period) - acf(period / 2)) / 2, clipped to 0..1:
+                1 for a clean limit cycle, 0 for noise or drift
+            "oscillating" - confidence and amplitude above their thresholds
+        Values are NaN, and "oscillating" False, for windows with too much bad data.
+    """
+    signals = np.atleast_2d(np.asarray(signals, dtype=np.float64))
+    n_tags, n_samples = signals.shape
+    if n_samples < 8:
+        empty = lambda dtype: np.empty((n_tags, 0), dtype=dtype)
+        scan = {key: empty(np.float64) for key in ("period", "amplitude", "concentration", "confidence")}
+        return dict(scan, start=empty(np.int64), end=empty(np.int64), oscillating=empty(bool))
+
+    filled, usable, starts, length = analysis_windows(signals, dt, window, hop, max_bad)
+    seg = segment_length(dt, length, segment)
+    min_lag = max((min_period or 4 * dt) / dt, 2.0)
+    max_lag = (max_period or seg * dt / 2) / dt
+
+    frequencies, psd = welch_psd(filled, seg, dt)
+    with np.errstate(divide="ignore"):
+        periods = 1 / frequencies / dt  # in samples
+    band = (periods >= min_lag) & (periods <= max_lag)
+    in_band = np.where(band, psd, -np.inf)
+    peak = np.argmax(in_band, axis=1)
+    index = np.arange(len(psd))
+
+    # Parabolic interpolation of the peak between its neighbours
+    left = psd[index, np.maximum(peak - 1, 0)]
+    centre = psd[index, peak]
+    right = psd[index, np.minimum(peak + 1, psd.shape[1] - 1)]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        shift = np.clip(np.nan_to_num(0.5 * (left - right) / (left - 2 * centre + right)), -0.5, 0.5)
+        period = 1 / ((peak + shift) * (frequencies[1] - frequencies[0])) / dt  # samples
+    # A peak on the edge of the band is a trend or noise leaking in, not a cycle
+    interior = (centre > left) & (centre > right) & band[np.maximum(peak - 1, 0)] & band[np.minimum(peak + 1, len(band) - 1)]
+
+    lobe = (np.arange(psd.shape[1])[None, :] >= peak[:, None] - 2) & (np.arange(psd.shape[1])[None, :] <= peak[:, None] + 2)
+    peak_power = (psd * lobe).sum(axis=1)
+    total = psd[:, 1:].sum(axis=1)
+    amplitude = np.sqrt(2 * peak_power)
+
+    acf = autocorrelation(filled, np.ceil(np.nanmax(np.where(interior, period, 0), initial=0)) + 1)
+    confidence = np.clip((_at_lag(acf, period) - _at_lag(acf, period / 2)) / 2, 0.0, 1.0)
+    confidence = np.where(interior, np.nan_to_num(confidence), 0.0)
+
+    shape = (n_tags, len(starts))
+    nan = lambda values: np.where(usable, values, np.nan).reshape(shape)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        concentration = peak_power / total
+    return {
+        "start": np.broadcast_to(starts, shape).copy(),
+        "end": np.broadcast_to(starts + length, shape).copy(),
+        "period": nan(period * dt),
+        "amplitude": nan(amplitude),
+        "concentration": nan(concentration),
+        "confidence": nan(confidence),
+        "oscillating": (usable & (confidence >= min_confidence) & (amplitude >= min_amplitude)).reshape(shape),
+    }
+
+
+def oscillation_rows(x, dt, **options):
+    """
+    Row positions of x inside a window oscillation_scan flags, the rows that
+    detect_issues reports as oscillating with the spectral method.
+    """
+    scan = oscillation_scan(x, dt, **options)
+    flagged = np.zeros(len(x), dtype=np.int64)
+    for start, end in zip(scan["start"][0][scan["oscillating"][0]], scan["end"][0][scan["oscillating"][0]]):
+        flagged[start:end] = 1
+    return np.flatnonzero(flagged & ~np.isnan(np.asarray(x, dtype=np.float64)))
+
+
+def summarise_scan(scan):
+    """
+    Collapses oscillation_scan output to one result per tag: the most confident window
+    and the fraction of usable windows that oscillate.
+
+    Returns:
+        list: Per tag {"oscillating", "period", "amplitude", "confidence",
+        "concentration", "window": [start, end], "fraction"}, None for values of a
+        tag without usable windows.
+    """
+    results = []
+    for i in range(scan["confidence"].shape[0]):
+        confidence = scan["confidence"][i]
+        usable = ~np.isnan(confidence)
+        if not usable.any():
+            results.append({"oscillating": False, "period": None, "amplitude": None, "confidence": None,
+                            "concentration": None, "window": None, "fraction": None})
+            continue
+        best = int(np.nanargmax(confidence))
+        results.append({
+            "oscillating": bool(scan["oscillating"][i, best]),
+            "period": float(scan["period"][i, best]),
+            "amplitude": float(scan["amplitude"][i, best]),
+            "confidence": float(confidence[best]),
+            "concentration": float(scan["concentration"][i, best]),
+            "window": [int(scan["start"][i, best]), int(scan["end"][i, best])],
+            "fraction": float(scan["oscillating"][i][usable].mean()),
+        })
+    return results
@@ -0,0 +1,149 @@
+# ts_cache.py
+import threading
+from   concurrent.futures import Future
+from   datetime import timedelta
+
+import pandas as pd
+
+
+def _wall_clock(index):
+    # PI returns timestamps in PIConfig.DEFAULT_TIMEZONE while requests use naive local
+    # datetimes; everything in the cache is kept as naive wall-clock time.
+    return index.tz_localize(None) if getattr(index, "tz", None) is not None else index
+
+
+class TimeSeriesCache:
+    """
+    Keeps already-fetched summary buckets per (tag, interval) so a refresh only asks
+    PI for the tail that is new since the last call.
+
+    Windows are aligned to the interval grid so buckets from different refreshes line
+    up. The bucket still in progress at the end of a window is returned but fetched
+    again next time. Data older than retention before the newest request is dropped,
+    unless that request itself reaches further back. Concurrent requests that need the
+    same fetch (same tags, start and end) share one call to the source.
+
+    Parameters:
+        fetch (callable): (tags, start, end, interval) -> time-indexed frame with one
+            column per tag, e.g. PIDataClient.summaries.
+        retention (timedelta): How much history to keep per tag.
+    """
+
+    def __init__(self, fetch, retention=timedelta(hours=24)):
+        self.fetch = fetch
+        self.retention = pd.Timedelta(retention)
+        self._series = {}
+        self._complete = {}
+        self._inflight = {}  # (tags, fetch_from, end, interval) -> Future of the fetched frame
+        self._lock = threading.Lock()
+        self.stats = {"requests": 0, "full_fetches": 0, "tail_fetches": 0, "shared_fetches": 0,
+                      "rows_fetched": 0, "rows_served": 0}
+
+    def get(self, tags, start, end, interval):
+        """
+        Returns the same frame fetch would for the aligned window, from cache where possible.
+
+        Returns:
+            DataFrame: Index named 'time', one column per tag known to the source.
+        """
+        step = pd.to_timedelta(interval)
+        start = pd.Timestamp(start).floor(step)
+        end = pd.Timestamp(end).floor(step)
+        tags = list(dict.fromkeys(tags))
+
+        with self._lock:
+            self.stats["requests"] += 1
+            # Tags needing the same start are fetched together in one call.
+            groups = {}
+            for tag in tags:
+                key = (tag, interval)
+                series = self._series.get(key)
+                # A cold tag, a longer window or a gap since the last refresh needs the whole window.
+                if series is None or series.index[0] > start or self._complete[key] + step < start:
+                    fetch_from = start
+                    self.stats["full_fetches"] += 1
+                else:
+                    fetch_from = self._complete[key] + step
+                    self.stats["tail_fetches"] += 1
+                if fetch_from <= end:
+                    groups.setdefault(fetch_from, []).append(tag)
+
+        # PI is asked outside the lock so requests for other loops, or ones the cache can
+        # already answer, are not held up behind a slow fetch.
+        fetched = []
+        for fetch_from, group in groups.items():
+            fetched.append((fetch_from, self._fetch_once(group, fetch_from, end, interval)))
+
+        with self._lock:
+            for fetch_from, fresh in fetched:
+                for tag in fresh.columns:
+                    self._merge((tag, interval), fresh[tag], fetch_from - step, end - step, step)
+
+            # A window longer than retention keeps its own start, so it is served whole
+            # and the next refresh of it fetches only the tail
+            self._evict(min(start, end - self.retention))
+            columns = {tag: self._series[(tag, interval)] for tag in tags if (tag, interval) in self._series}
+
+        df = pd.DataFrame(columns).loc[start:end]
+        df.index.name = 'time'
+        self.stats["rows_served"] += df.size
+        return df
+
+    def _fetch_once(self, tags, start, end, interval):
+        # Single flight: a request needing a fetch that is already running waits for it
+        # instead of asking PI again, e.g. concurrent requests for the same cold loop.
+        key = (tuple(tags), start, end, interval)
+        with self._lock:
+            future = self._inflight.get(key)
+            shared = future is not None
+            if shared:
+                self.stats["shared_fetches"] += 1
+            else:
+                future = self._inflight[key] = Future()
+        if shared:
+            return future.result()
+        try:
+            fresh = self.fetch(tags, start, end, interval)
+            fresh.index = _wall_clock(pd.DatetimeIndex(fresh.index))
+            future.set_result(fresh)
+            with self._lock:
+                self.stats["rows_fetched"] += len(fresh) * len(fresh.columns)
+            return fresh
+        except Exception as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                del self._inflight[key]
+
+    def _merge(self, key, fresh, contiguous_from, complete_until, step):
+        old = self._series.get(key)
+        if fresh.empty:
+            return
+        complete = min(fresh.index[-1], complete_until)
+        # The cached buckets are kept only if they join up with the new ones without a
+        # gap on either side, so every series stays one contiguous span: a concurrent
+        # request may already have merged newer buckets, while a replay of a window
+        # older than the cache replaces it.
+        if (old is not None and self._complete[key] >= contiguous_from
+                and old.index[0] <= fresh.index[-1] + step):
+            fresh = pd.concat([old[old.index < fresh.index[0]], fresh, old[old.index > fresh.index[-1]]])
+            complete = max(complete, self._complete[key])
+        self._series[key] = fresh
+        self._complete[key] = complete
+
+    def _evict(self, cutoff):
+        for key in list(self._series):
+            series = self._series[key]
+            if series.index[0] < cutoff:
+                series = series[series.index >= cutoff]
+                if series.empty:
+                    del self._series[key]
+                    del self._complete[key]
+                else:
+                    self._series[key] = series
+
+    def clear(self):
+        with self._lock:
+            self._series.clear()
+            self._complete.clear()
@@ -0,0 +1,147 @@
+# tuning_rules.py
+# Closed-form PID settings from identified process models (identification.py):
+# SIMC, IMC, Ziegler-Nichols (reaction curve) and Cohen-Coon. Every rule is a few
+# array expressions, so all loops of the plant are tuned in one call.
+#
+# Gains are for the parallel form the simulators use, u = kp e + ki int(e) + kd de/dt,
+# with time in time_unit seconds, and as Pband = 100 / kp as in rule_based.py. The
+# magnitudes are returned; "action" gives the sign (reverse for a negative process
+# gain, e.g. spray valve -> temperature).
+import numpy as np
+
+
+RULES = ("simc", "imc", "zn", "cohen_coon")
+RULE_NAMES = {"simc": "SIMC", "imc": "IMC", "zn": "Ziegler-Nichols", "cohen_coon": "Cohen-Coon"}
+
+
+def half_rule(tau, dead_time, tau2):
+    """FOPDT approximation of a SOPDT model (Skogestad): half of tau2 goes to each."""
+    return tau + tau2 / 2, dead_time + tau2 / 2
+
+
+def _simc(gain, tau, dead_time, tau2, tau_c):
+    # Series PID: kc = tau / (K (tau_c + theta)), ti = min(tau, 4 (tau_c + theta)), td = tau2
+    kc = tau / (gain * (tau_c + dead_time))
+    ti = np.minimum(tau, 4 * (tau_c + dead_time))
+    factor = 1 + tau2 / ti
+    return kc * factor, ti * factor, tau2 / factor
+
+
+def _imc(gain, tau, dead_time, lam):
+    kc = (tau + dead_time / 2) / (gain * (lam + dead_time / 2))
+    return kc, tau + dead_time / 2, tau * dead_time / (2 * tau + dead_time)
+
+
+def _zn(gain, tau, dead_time):
+    return 1.2 * tau / (gain * dead_time), 2 * dead_time, 0.5 * dead_time
+
+
+def _cohen_coon(gain, tau, dead_time):
+    r = dead_time / tau
+    kc = tau / (gain * dead_time) * (4 / 3 + r / 4)
+    return kc, dead_time * (32 + 6 * r) / (13 + 8 * r), 4 * dead_time / (11 + 2 * r)
+
+
+def pid_rules(gain, tau, dead_time, tau2=0.0, rules=RULES, tau_c=None, min_tau_c=10.0, time_unit=1.0):
+    """
+    Computes PID settings for N process models with each rule.
+
+    Parameters:
+        gain, tau, dead_time, tau2 (array-like): Process models as in
+            cascade.process_model, one entry per loop; times in seconds.
+        rules (tuple): Any of RULES.
+        tau_c (array-like): SIMC closed-loop time constant, and the IMC lambda; the
+            dead time (SIMC) or max(0.8 theta, tau / 10) (IMC, after Rivera et al.)
+            if None. Never below min_tau_c.
+        time_unit (float): Seconds per time unit of ki and kd, e.g. 60 for minutes.
+
+    Returns:
+        dict: rule -> {"kp", "ki", "kd", "Pband", "action"}, each a length-N array;
+        NaN where the rule does not apply (Z-N and Cohen-Coon need a dead time).
+    """
+    gain, tau, dead_time, tau2 = np.broadcast_arrays(*(np.asarray(v, dtype=np.float64) for v in (gain, tau, dead_time, tau2)))
+    tau1, theta = half_rule(tau, dead_time, tau2)
+    magnitude = np.abs(gain)
+    results = {}
+    with np.errstate(divide="ignore", invalid="ignore"):
+        for rule in rules:
+            if rule == "simc":
+                closed = np.maximum(dead_time if tau_c is None else tau_c, min_tau_c)
+                kc, ti, td = _simc(magnitude, tau, dead_time, tau2, closed)
+            elif rule == "imc":
+                lam = np.maximum(np.maximum(0.8 * theta, 0.1 * tau1) if tau_c is None else tau_c, min_tau_c)
+                kc, ti, td = _imc(magnitude, tau1, theta, lam)
+            elif rule == "zn":
+                kc, ti, td = _zn(magnitude, tau1, theta)
+            elif rule == "cohen_coon":
+                kc, ti, td = _cohen_coon(magnitude, tau1, theta)
+            else:
+                raise ValueError(f"unknown tuning rule {rule!r}, expected one of {RULES}")
+            usable = np.isfinite(kc) & (kc > 0) & np.isfinite(ti) & (ti > 0)
+            kp = np.where(usable, kc, np.nan)
+            results[rule] = {
+                "kp": kp,
+                "ki": kp / ti * time_unit,
+                "kd": kp * td / time_unit,
+                "Pband": 100 / kp,
+                "action": np.where(gain < 0, "reverse", "direct"),
+            }
+    return results
+
+
+def cascade_rules(inner, outer, rules=RULES, min_tau_c=10.0, **options):
+    """
+    Tunes both PIDs of N cascades.
+
+    PID2 is tuned on the inner model (valve -> secondary). PID1 sees the inner loop
+    closed, which a SIMC-tuned inner loop makes a delay of about its dead time plus
+    its tau_c, so that is added to the outer model's dead time.
+
+    Parameters:
+        inner, outer (dict): process_model-like dicts of scalars or length-N arrays.
+
+    Returns:
+        dict: rule -> {"PID1": ..., "PID2": ...} as from pid_rules.
+    """
+    field = lambda model, key: np.asarray(model.get(key, 0.0), dtype=np.float64)
+    inner_lag = field(inner, "dead_time") + np.maximum(field(inner, "dead_time"), min_tau_c)
+    pid2 = pid_rules(*(field(inner, k) for k in ("gain", "tau", "dead_time", "tau2")),
+                     rules=rules, min_tau_c=min_tau_c, **options)
+    pid1 = pid_rules(field(outer, "gain"), field(outer, "tau"), field(outer, "dead_time") + inner_lag,
+                     field(outer, "tau2"), rules=rules, min_tau_c=min_tau_c, **options)
+    return {rule: {"PID1": pid1[rule], "PID2": pid2[rule]} for rule in rules}
+
+
+def tune_loops(models, rules=RULES, **options):
+    """
+    Tunes every loop of a plant in one vectorized pass.
+
+    Parameters:
+        models (dict): pid path -> {"inner": model, "outer": model}, e.g. ModelCache
+            entries. Loops missing either model are left out.
+
+    Returns:
+        dict: pid path -> rule -> {"PID1": gains, "PID2": gains}, gains being
+        {"kp", "ki", "kd", "Pband", "action"} rounded to 3 places plus "time_unit"
+        (seconds per ki / kd time unit), None where the rule does not apply.
+    """
+    paths = [p for p, m in models.items() if m and m.get("inner") and m.get("outer")]
+    if not paths:
+        return {}
+    stack = lambda key: {k: np.array([float(models[p][key].get(k, 0.0)) for p in paths])
+                         for k in ("gain", "tau", "dead_time", "tau2")}
+    tuned = cascade_rules(stack("inner"), stack("outer"), rules=rules, **options)
+
+    # Rounded and converted column by column, then picked per loop
+    columns = {
+        (rule, pid): ({k: (v.tolist() if k == "action" else np.round(v, 3).tolist()) for k, v in values.items()},
+                      np.isfinite(values["kp"]).tolist())
+        for rule, pids in tuned.items() for pid, values in pids.items()
+    }
+    time_unit = float(options.get("time_unit", 1.0))
+    gains = lambda rule, pid, i: (dict({k: v[i] for k, v in columns[rule, pid][0].items()}, time_unit=time_unit)
+                                  if columns[rule, pid][1][i] else None)
+    return {
+        path: {rule: {pid: gains(rule, pid, i) for pid in ("PID1", "PID2")} for rule in rules}
+        for i, path in enumerate(paths)
+    }
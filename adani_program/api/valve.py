@@ -0,0 +1,174 @@
+# valve.py
+# Control valve diagnostics from controlvalveSecondary (the output of PID2, OP) and
+# measureValueSecondary (its measurement, PV), for any number of loops at once:
+#
+#   saturation - time the valve spends at a travel limit, and the longest such spell;
+#                the closed limit only counts while the loop is off setpoint, as a
+#                spray valve parked shut at low load is normal
+#   travel     - valve movement in % of stroke per hour
+#   reversals  - changes of direction per hour, movements inside a deadband ignored
+#   stiction   - windows in which the valve cycles (spectral.oscillation_scan) and
+#                the OP-PV plot of that cycle is an open ellipse rather than a line
+#
+# The OP-PV shape test is the frequency-domain form of Horch's cross-correlation
+# test: a sticking valve turns the triangular OP ramp into a square PV step, a phase
+# of about 90 degrees between OP and PV at the cycle frequency, while a loop that
+# oscillates because it is tuned too tight keeps OP and PV near 0 or 180 degrees.
+import numpy as np
+
+from   spectral import analysis_windows, oscillation_scan, segment_length, welch_cross
+
+
+VALVE_ISSUES = ("stiction", "saturation")
+
+
+def _runs(mask):
+    """(rows, T) bool -> (row, start, end) of every run of True, end exclusive."""
+    edges = np.diff(np.pad(mask.astype(np.int8), ((0, 0), (1, 1))), axis=1)
+    rows, starts = np.nonzero(edges == 1)
+    _, ends = np.nonzero(edges == -1)
+    return rows, starts, ends
+
+
+def _reversals(valve, deadband):
+    """(rows, T) mask of the samples where the valve changes direction, ignoring steps no larger than deadband."""
+    step = np.nan_to_num(np.diff(valve, axis=1))
+    direction = np.where(np.abs(step) > deadband, np.sign(step), 0.0)
+    # Each move compared with the last move before it
+    last = np.maximum.accumulate(np.where(direction != 0, np.arange(direction.shape[1]), -1), axis=1)
+    previous = np.where(last[:, :-1] >= 0, np.take_along_axis(direction, np.maximum(last[:, :-1], 0), axis=1), 0.0)
+    reversals = np.zeros(valve.shape, dtype=bool)
+    reversals[:, 2:] = (direction[:, 1:] * previous) < 0
+    return reversals
+
+
+def valve_diagnostics(valve, pv, dt, off_setpoint=None, limits=(0.0, 100.0), margin=1.0, deadband=0.1,
+                      window=14400.0, hop=3600.0, min_confidence=0.3, min_amplitude=0.5, min_coherence=0.8,
+                      max_cos=0.5, period_tolerance=0.2):
+    """
+    Diagnoses the valves of many loops in one pass.
+
+    Parameters:
+        valve, pv (array-like): (loops, T) OP and PV on one time grid, NaN for bad
+            quality; 1-D series are one loop.
+        dt (float): Seconds between samples.
+        off_setpoint (array-like): (loops, T) mask of the samples where the loop's
+            controlled variable is away from its setpoint; a valve at the low limit
+            only counts as saturated there. None counts the high limit only.
+        limits (tuple): Valve travel limits, in %.
+        margin (float): Distance from a limit, in %, that counts as saturated.
+        deadband (float): Largest valve step, in %, not counted as a movement for
+            reversals.
+        window, hop (float): Stiction windows, as in spectral.oscillation_scan.
+        min_confidence, min_amplitude: Smallest oscillation_scan confidence and
+            amplitude (in %) of a valve cycle checked for stiction.
+        min_coherence (float): Smallest OP-PV coherence at the cycle frequency, so PV
+            is known to follow the valve.
+        max_cos (float): Largest |cos(phase)| between OP and PV that counts as an
+            open OP-PV ellipse; 0.5 is 60 to 120 degrees.
+        period_tolerance (float): Largest relative difference between the valve cycle
+            and the dominant period of PV; with only a few Welch segments per window,
+            coherence alone also passes two unrelated cycles of similar frequency.
+
+    Returns:
+        dict: Per loop: "saturatedHigh", "saturatedLow" (fraction of good samples at
+        each limit, whatever the setpoint), "saturatedTime" (fraction counted as
+        saturated), "longestSaturation" (s, of the counted spells), "travel" (% per
+        hour), "reversals" (per hour). Per (loop, window), as from oscillation_scan:
+        "start", "end", "period", "amplitude", "confidence", plus "coherence", "phase"
+        (degrees) and "stiction". "saturated" and "reversing": (loops, T) masks of the
+        counted saturated samples and of the valve's changes of direction.
+    """
+    valve = np.atleast_2d(np.asarray(valve, dtype=np.float64))
+    pv = np.atleast_2d(np.asarray(pv, dtype=np.float64))
+    good = ~np.isnan(valve)
+    hours = np.maximum(good.sum(axis=1), 1) * dt / 3600
+
+    with np.errstate(invalid="ignore"):
+        high = valve >= limits[1] - margin
+        low = valve <= limits[0] + margin
+    off = np.zeros_like(low) if off_setpoint is None else np.atleast_2d(np.asarray(off_setpoint, dtype=bool))
+    saturated = high | (low & off)
+    rows, starts, ends = _runs(saturated)
+    reversals = _reversals(valve, deadband)
+    longest = np.zeros(len(valve))
+    np.maximum.at(longest, rows, (ends - starts) * dt)
+
+    scan = oscillation_scan(valve, dt, window=window, hop=hop, min_confidence=min_confidence,
+                            min_amplitude=min_amplitude)
+    pv_period = oscillation_scan(pv, dt, window=window, hop=hop)["period"]
+    shape = scan["confidence"].shape
+    coherence = phase = np.full(shape, np.nan)
+    if shape[1]:
+        op_rows, usable, _, length = analysis_windows(valve, dt, window, hop)
+        pv_rows, pv_usable, _, _ = analysis_windows(pv, dt, window, hop)
+        frequencies, coherences, phases = welch_cross(op_rows, pv_rows, segment_length(dt, length), dt)
+        # The bin of each window's valve cycle
+        with np.errstate(divide="ignore", invalid="ignore"):
+            bins = np.rint(np.nan_to_num(1 / scan["period"].ravel()) / frequencies[1]).astype(np.intp)
+        bins = np.clip(bins, 1, len(frequencies) - 1)
+        index = np.arange(len(bins))
+        coherence = np.where(usable & pv_usable, coherences[index, bins], np.nan).reshape(shape)
+        phase = np.where(usable & pv_usable, phases[index, bins], np.nan).reshape(shape)
+    with np.errstate(invalid="ignore"):
+        stiction = (scan["oscillating"] & (coherence >= min_coherence)
+                    & (np.abs(pv_period / scan["period"] - 1) <= period_tolerance)
+                    & (np.abs(np.cos(np.radians(phase))) <= max_cos))
+
+    return {
+        "saturatedHigh": high.sum(axis=1) / np.maximum(good.sum(axis=1), 1),
+        "saturatedLow": low.sum(axis=1) / np.maximum(good.sum(axis=1), 1),
+        "saturatedTime": saturated.sum(axis=1) / np.maximum(good.sum(axis=1), 1),
+        "longestSaturation": longest,
+        "travel": np.nansum(np.abs(np.diff(valve, axis=1)), axis=1) / hours,
+        "reversals": reversals.sum(axis=1) / hours,
+        "saturated": saturated,
+        "reversing": reversals,
+        **{key: scan[key] for key in ("start", "end", "period", "amplitude", "confidence")},
+        "coherence": coherence,
+        "phase": phase,
+        "stiction": stiction,
+    }
+
+
+def valve_rows(diagnostics, loop=0):
+    """
+    Row positions of one loop with a valve issue, for detect_issues-style callers.
+
+    Returns:
+        dict: "stiction" (rows where the valve reverses inside a stiction window, two
+        per stick-slip cycle rather than the whole window) and "saturation" (saturated
+        rows), each sorted.
+    """
+    flagged = np.zeros(diagnostics["saturated"].shape[1], dtype=bool)
+    windows = diagnostics["stiction"][loop]
+    for start, end in zip(diagnostics["start"][loop][windows], diagnostics["end"][loop][windows]):
+        flagged[start:end] = True
+    return {"stiction": np.flatnonzero(flagged & diagnostics["reversing"][loop]), "saturation": np.flatnonzero(diagnostics["saturated"][loop])}
+
+
+def summarise_valves(diagnostics):
+    """
+    One JSON-ready result per loop: the per-loop figures, rounded, and the strongest
+    stiction window (None if there is none).
+    """
+    results = []
+    for i in range(len(diagnostics["travel"])):
+        result = {key: round(float(diagnostics[key][i]), 3)
+                  for key in ("saturatedHigh", "saturatedLow", "saturatedTime", "longestSaturation", "travel",
+                              "reversals")}
+        windows = np.flatnonzero(diagnostics["stiction"][i])
+        result["stiction"] = None
+        if len(windows):
+            best = windows[np.argmax(diagnostics["confidence"][i][windows])]
+            result["stiction"] = {
+                "period": round(float(diagnostics["period"][i, best]), 1),
+                "amplitude": round(float(diagnostics["amplitude"][i, best]), 3),
+                "phase": round(float(diagnostics["phase"][i, best]), 1),
+                "coherence": round(float(diagnostics["coherence"][i, best]), 3),
+                "confidence": round(float(diagnostics["confidence"][i, best]), 3),
+                "window": [int(diagnostics["start"][i, best]), int(diagnostics["end"][i, best])],
+                "fraction": round(float(diagnostics["stiction"][i].mean()), 3),
+            }
+        results.append(result)
+    return results
@@ -0,0 +1,67 @@
+# bench_asgi.py
+# Dashboard-style load: one /fetchPISummaries request per loop in pid-architecture.json,
+# against a fake PI server with a round-trip latency. The Flask app answering one
+# request at a time versus the ASGI app in api/asgi.py with all of them in flight.
+#
+#   python benchmarks/bench_asgi.py
+import asyncio
+import functools
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "api"))
+os.environ.setdefault("PI_FAKE", "1")
+
+import httpx
+
+import Index1
+from asgi import PIDTunerApp
+from fake_pi import FakePIServer
+from fleet import iter_loops, load_architecture
+
+
+LATENCY = 0.05  # seconds per PI summaries call
+
+
+def bodies(asof):
+    return [
+        {
+            "tags": config["tags"],
+            "closedloop": config["parameters"]["closed_loop"],
+            "open_loop": config["parameters"]["open_loop"],
+            "format": "compact",
+            "asof": asof,
+        }
+        for _, config in iter_loops(load_architecture())
+    ]
+
+
+async def concurrent(app, requests):
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://pid", timeout=120) as client:
+        return await asyncio.gather(*(client.post("/fetchPISummaries", json=body) for body in requests))
+
+
+if __name__ == "__main__":
+    Index1.PI_CLIENT.server_factory = functools.partial(FakePIServer, latency=LATENCY)
+    app = PIDTunerApp(Index1.app)
+    asyncio.run(concurrent(app, bodies("2025-01-01 08:00:00")[:1]))  # start the worker processes
+
+    # Windows days apart, so neither run is served from the other's cache
+    requests = bodies("2025-01-05 08:00:00")
+    client = Index1.app.test_client()
+    start = time.perf_counter()
+    serial = [client.post("/fetchPISummaries", json=body) for body in requests]
+    t_serial = time.perf_counter() - start
+
+    requests = bodies("2025-01-10 08:00:00")
+    start = time.perf_counter()
+    responses = asyncio.run(concurrent(app, requests))
+    t_async = time.perf_counter() - start
+    app.close()
+
+    assert all(r.status_code == 200 for r in serial) and all(r.status_code == 200 for r in responses)
+    print(f"{len(requests)} loop requests, {LATENCY * 1000:.0f} ms per PI call, {app.cpu_workers} analysis workers")
+    print(f"  flask, one at a time  {t_serial:6.2f} s  {len(requests) / t_serial:5.1f} req/s")
+    print(f"  asgi, concurrent      {t_async:6.2f} s  {len(requests) / t_async:5.1f} req/s")
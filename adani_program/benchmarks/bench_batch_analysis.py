@@ -0,0 +1,61 @@
+# bench_batch_analysis.py
+# The summary report's view of every loop: one /fetchPISummaries per loop, one after
+# another, versus one /fetchPISummariesBatch that fetches the union of the tags in a
+# single PI call and analyses the loops in parallel, streamed back as NDJSON.
+#
+#   python benchmarks/bench_batch_analysis.py
+import functools
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "api"))
+os.environ.setdefault("PI_FAKE", "1")
+
+import Index1
+from fake_pi import FakePIServer
+from fleet import iter_loops, load_architecture
+
+
+LATENCY = 0.05  # seconds per PI summaries call
+ASOF = "2025-01-03 06:00:00"
+
+
+def reset():
+    Index1.PI_CACHE.clear()
+    Index1.RESULT_CACHE.clear()
+
+
+if __name__ == "__main__":
+    Index1.PI_CLIENT.server_factory = functools.partial(FakePIServer, latency=LATENCY)
+    loops = [
+        {
+            "pidPath": pid_path,
+            "tags": config["tags"],
+            "closedloop": config["parameters"]["closed_loop"],
+            "open_loop": config["parameters"]["open_loop"],
+            "format": "compact",
+        }
+        for pid_path, config in iter_loops(load_architecture())
+    ]
+    tags = [tag for loop in loops for tag in loop["tags"].values()]
+    client = Index1.app.test_client()
+
+    reset()
+    start = time.perf_counter()
+    single = [client.post("/fetchPISummaries", json=dict(loop, asof=ASOF)).json for loop in loops]
+    t_single = time.perf_counter() - start
+
+    reset()
+    fetches = Index1.PI_CLIENT.stats["fetches"]
+    start = time.perf_counter()
+    response = client.post("/fetchPISummariesBatch", json={"loops": loops, "asof": ASOF})
+    results = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+    t_batch = time.perf_counter() - start
+
+    assert all(result["data"] == single[result["index"]] for result in results), "batch results differ"
+    print(f"{len(loops)} loops, {len(tags)} tags ({len(set(tags))} distinct), {LATENCY * 1000:.0f} ms per PI call")
+    print(f"  one request per loop  {t_single:6.2f} s")
+    print(f"  one batch request     {t_batch:6.2f} s  speedup {t_single / t_batch:4.1f}x  "
+          f"({Index1.PI_CLIENT.stats['fetches'] - fetches} PI fetch)")
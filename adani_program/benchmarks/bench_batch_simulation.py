@@ -0,0 +1,40 @@
+# bench_batch_simulation.py
+# Ranks a 10k-candidate gain grid with simulate_pid_batch and compares it with
+# looping simulate_pid_response once per candidate.
+#
+#   python benchmarks/bench_batch_simulation.py
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "api"))
+
+from bench_simulation import legacy_simulate_pid_response, make_frame
+from simulation import gain_grid, simulate_pid_batch
+
+
+if __name__ == "__main__":
+    df = make_frame(2_880)
+    setpoint = df["setpointPrimary"].to_numpy()
+    initial_value = df["measureValuePrimary"].iloc[0]
+    gains = gain_grid(np.linspace(0.5, 5.0, 25), np.linspace(0.1, 5.0, 20), np.linspace(0.0, 1.0, 20))
+
+    start = time.perf_counter()
+    _, metrics = simulate_pid_batch(setpoint, initial_value, gains, return_responses=False)
+    ranking = np.argsort(metrics["iae"])
+    t_batch = time.perf_counter() - start
+
+    # Time a sample of the per-candidate loop and extrapolate to the full grid.
+    sample = 50
+    start = time.perf_counter()
+    for kp, ki, kd in gains[:sample]:
+        legacy_simulate_pid_response(df, "setpointPrimary", "measureValuePrimary", kp, ki, kd)
+    t_loop = (time.perf_counter() - start) / sample * len(gains)
+
+    best = gains[ranking[0]]
+    print(f"{len(gains)} candidates x {len(setpoint)} samples")
+    print(f"  batch  {t_batch:8.2f} s")
+    print(f"  loop   {t_loop:8.2f} s (extrapolated from {sample})")
+    print(f"  speedup {t_loop / t_batch:6.1f}x, best IAE gains kp={best[0]:.3f} ki={best[1]:.3f} kd={best[2]:.3f}")
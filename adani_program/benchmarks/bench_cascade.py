@@ -0,0 +1,58 @@
+# bench_cascade.py
+# What-if replays of a whole cascade (PID1 -> PID2 -> spray valve -> SOPDT secondary ->
+# FOPDT primary, with dead times and a rate-limited valve): one simulate_cascade run
+# per scenario versus every scenario as a lane of one vectorized run.
+#
+#   python benchmarks/bench_cascade.py
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "api"))
+
+from bench_simulation import make_frame
+from cascade import process_model, simulate_cascade
+from simulation import gain_grid
+
+
+if __name__ == "__main__":
+    df = make_frame(2_880)  # 8 h at 10 s
+    setpoint = df["setpointPrimary"].to_numpy()
+    rng = np.random.default_rng(0)
+    primary = gain_grid(np.linspace(0.2, 2.0, 10), np.linspace(0.001, 0.02, 10), [0.0])
+    secondary = np.tile([1.5, 0.05, 0.0], (len(primary), 1))
+    # Spray lowers the desuperheater outlet temperature; the dead times differ per scenario
+    inner = process_model(-0.8, 30.0, dead_time=rng.uniform(10, 30, len(primary)), tau2=15.0)
+    outer = process_model(1.0, 120.0, dead_time=rng.uniform(30, 90, len(primary)))
+    disturbance = np.where(np.arange(len(setpoint)) > len(setpoint) // 2, 5.0, 0.0)
+    options = dict(initial_valve=40.0, valve_rate=1.0, substeps=2, disturbance=disturbance)
+
+    start = time.perf_counter()
+    _, batch = simulate_cascade(setpoint, primary, secondary, inner, outer, return_responses=False, **options)
+    t_batch = time.perf_counter() - start
+
+    # Time a sample of the per-scenario runs and extrapolate to all of them.
+    sample = 10
+    start = time.perf_counter()
+    single = [
+        simulate_cascade(
+            setpoint, primary[i], secondary[i],
+            process_model(-0.8, 30.0, dead_time=inner["dead_time"][i], tau2=15.0),
+            process_model(1.0, 120.0, dead_time=outer["dead_time"][i]),
+            return_responses=False, **options,
+        )[1]
+        for i in range(sample)
+    ]
+    t_loop = (time.perf_counter() - start) / sample * len(primary)
+
+    for key, values in batch.items():
+        assert np.allclose(values[:sample], [metrics[key][0] for metrics in single]), f"{key} differs"
+    best = np.argmin(batch["iae"])
+    print(f"{len(primary)} scenarios x {len(setpoint)} samples x 2 substeps")
+    print(f"  one run per scenario  {t_loop:7.2f} s (extrapolated from {sample})")
+    print(f"  one vectorized run    {t_batch:7.2f} s  speedup {t_loop / t_batch:5.1f}x")
+    print(f"  best IAE PID1 kp={primary[best][0]:.3f} ki={primary[best][1]:.4f}: "
+          f"IAE {batch['iae'][best]:.0f}, valve travel {batch['valve_travel'][best]:.0f} %, "
+          f"saturated {batch['valve_saturated'][best]:.1%}")
@@ -0,0 +1,102 @@
+# bench_data_source.py
+# Throughput of each source in api/data_source.py on the same job: a day of one loop
+# in hourly windows, each window run through the detectors. Every source is timed
+# reading window by window, then with readahead fetching the next windows while the
+# current one is analysed. Also times the per-column rename loop fetch_loop_frame
+# used against role_frame.
+#
+#   python benchmarks/bench_data_source.py
+import os
+import sys
+import tempfile
+import time
+
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "api"))
+
+from data_source import FetchSource, FileSource, ReadDataSource, SyntheticSource, role_frame
+from detection import detect_issues
+from fake_readdata import serve
+from fleet import iter_loops, load_architecture
+from history_store import HistoryStore
+from readdata_client import ReadDataClient
+
+
+LATENCY = 0.05  # seconds per remote call, for the synthetic and readdata sources
+START = pd.Timestamp("2025-01-01 00:00:00")
+WINDOWS = [(START + pd.Timedelta(hours=h), START + pd.Timedelta(hours=h + 1)) for h in range(24)]
+INTERVAL = '10s'
+
+
+def analyse(df):
+    cv = df["controlvalveSecondary"]
+    return detect_issues(df, "setpointPrimary", "measureValuePrimary", "measureValueSecondary",
+                         "measureValueSecondary", "controlvalveSecondary", cv.mean() - cv.std())
+
+
+def run(source, tags, readahead):
+    start = time.perf_counter()
+    rows = 0
+    if readahead:
+        for _, _, df in source.iter_windows(tags, WINDOWS, INTERVAL):
+            analyse(df)
+            rows += len(df)
+    else:
+        for window_start, window_end in WINDOWS:
+            df = source.loop_frame(tags, window_start, window_end, INTERVAL)
+            analyse(df)
+            rows += len(df)
+    return rows, time.perf_counter() - start
+
+
+def legacy_rename(df, tags):
+    for col in df.columns:
+        if col != "time":
+            fdf = {v: k for k, v in tags.items() if k != v}
+            df = df.rename(columns=fdf)
+    return df
+
+
+if __name__ == "__main__":
+    _, config = next(iter_loops(load_architecture()))
+    tags = config["tags"]
+    tag_list = list(tags.values())
+    day = SyntheticSource().summaries(tag_list, WINDOWS[0][0], WINDOWS[-1][1], INTERVAL)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        csv_path = os.path.join(tmp, "export.csv")
+        day.reset_index().to_csv(csv_path, index=False)
+        store = HistoryStore(os.path.join(tmp, "history"))
+        store.write(day, INTERVAL)
+        server, url = serve(latency=LATENCY, interval=INTERVAL)
+
+        sources = {
+            "synthetic (remote)": lambda: SyntheticSource(latency=LATENCY),
+            "readdata (remote)": lambda: ReadDataSource(ReadDataClient(url)),
+            "csv file": lambda: FileSource(csv_path),
+            "history store": lambda: FetchSource(store.summaries),
+        }
+        print(f"{len(WINDOWS)} hourly windows of {len(tags)} tags, {LATENCY * 1000:.0f} ms per remote call")
+        for name, make in sources.items():
+            timings = []
+            for readahead in (False, True):
+                source = make()
+                rows, elapsed = run(source, tags, readahead)
+                source.close()
+                timings.append(elapsed)
+            print(f"  {name:20}  sequential {timings[0]:6.2f} s  readahead {timings[1]:6.2f} s  "
+                  f"{rows / timings[1]:9.0f} rows/s")
+        server.shutdown()
+
+    wide = day.reset_index()
+    start = time.perf_counter()
+    for _ in range(200):
+        old = legacy_rename(wide, tags)
+    t_old = (time.perf_counter() - start) / 200
+    start = time.perf_counter()
+    for _ in range(200):
+        new = role_frame(wide, tags)
+    t_new = (time.perf_counter() - start) / 200
+    pd.testing.assert_frame_equal(old[new.columns], new)
+    print(f"  rename per column {t_old * 1000:6.2f} ms  role_frame {t_new * 1000:6.2f} ms")
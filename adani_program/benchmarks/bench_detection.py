@@ -0,0 +1,64 @@
+# bench_detection.py
+# Runs the five detect_* functions one after another, as getpid used to, and the
+# fused detect_issues over the same loop frame, and checks they flag the same rows.
+#
+#   python benchmarks/bench_detection.py
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "api"))
+
+from bench_simulation import make_frame
+from detection import detect_issues
+from rule_based import (detect_oscillations, detect_overshoot, detect_settling_time,
+                        detect_sluggish_response, detect_undershoot)
+
+
+def loop_frame(rows, seed=0):
+    rng = np.random.default_rng(seed)
+    df = make_frame(rows, seed).round(1)  # rounding leaves flat tops for the peak search
+    df.loc[rows // 3: rows // 2, "measureValuePrimary"] += 20  # a disturbance outside the settling band
+    df["measureValueSecondary"] = df["measureValuePrimary"] + rng.normal(0, 0.5, rows)
+    df["controlvalveSecondary"] = np.clip(50 + np.cumsum(rng.normal(0, 0.5, rows)), 0, 100)
+    df.loc[rng.random(rows) < 0.01, "measureValuePrimary"] = np.nan  # bad-quality buckets
+    return df
+
+
+def separate(df, cv_high, cv_low):
+    return {
+        "overshoot": detect_overshoot(df, "setpointPrimary", "measureValuePrimary", "controlvalveSecondary", cv_high, cv_low),
+        "undershoot": detect_undershoot(df, "setpointPrimary", "measureValuePrimary", "controlvalveSecondary", cv_high, cv_low),
+        "sluggish": detect_sluggish_response(df, "setpointPrimary", "measureValueSecondary", "controlvalveSecondary", cv_low),
+        "settling": detect_settling_time(df, "setpointPrimary", "measureValuePrimary"),
+        "oscillations": detect_oscillations(df, "measureValuePrimary"),
+    }
+
+
+def fused(df, cv_low):
+    return detect_issues(df, "setpointPrimary", "measureValuePrimary", "setpointPrimary", "measureValueSecondary",
+                         "controlvalveSecondary", cv_low)
+
+
+if __name__ == "__main__":
+    # 8 h at 10 s, one day at 1 s, one week at 1 s
+    for rows in (2_880, 86_400, 604_800):
+        df = loop_frame(rows)
+        cv_low = df["controlvalveSecondary"].mean() - df["controlvalveSecondary"].std()
+        cv_high = df["controlvalveSecondary"].mean() + df["controlvalveSecondary"].std()
+
+        start = time.perf_counter()
+        old = separate(df, cv_high, cv_low)
+        t_old = time.perf_counter() - start
+
+        start = time.perf_counter()
+        new = fused(df, cv_low)
+        t_new = time.perf_counter() - start
+
+        for issue, issue_df in old.items():
+            assert np.array_equal(df.index.get_indexer(issue_df.index), new[issue]), f"{issue} rows differ"
+        counts = ", ".join(f"{issue} {len(found)}" for issue, found in new.items())
+        print(f"{rows:>8} rows  separate {t_old * 1000:8.1f} ms  fused {t_new * 1000:7.1f} ms  "
+              f"speedup {t_old / t_new:5.1f}x  ({counts})")
@@ -0,0 +1,38 @@
+# bench_downsample.py
+# Decimating the measured output to a 1920-pixel chart: points left and time taken
+# for min/max bucketing and LTTB as the window grows, with issue rows inside the
+# budget: a sparse set kept whole and a dense one (a third of the rows) thinned.
+#
+#   python benchmarks/bench_downsample.py
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "api"))
+
+from bench_simulation import make_frame
+from downsample import METHODS, downsample_rows
+
+
+MAX_POINTS = 1920
+
+
+if __name__ == "__main__":
+    # 8 h at 10 s, one day at 1 s, one week at 1 s
+    for rows in (2_880, 86_400, 604_800):
+        values = make_frame(rows)["measureValuePrimary"].to_numpy()
+        issue_rows = np.arange(0, rows, rows // 100)
+        dense_rows = np.arange(rows // 3, 2 * rows // 3)
+        line = f"{rows:>8} rows"
+        for method in METHODS:
+            start = time.perf_counter()
+            kept = downsample_rows(values, MAX_POINTS, keep=issue_rows, method=method)
+            elapsed = time.perf_counter() - start
+            assert np.isin(issue_rows, kept).all(), "sparse issue rows dropped"
+            dense = downsample_rows(values, MAX_POINTS, keep=dense_rows, method=method)
+            assert len(dense) <= MAX_POINTS + 2, f"{len(dense)} points for a {MAX_POINTS} budget"
+            peak = "peaks kept" if values[kept].max() == values.max() and values[kept].min() == values.min() else "peaks lost"
+            line += f"  {method} {len(kept):5d} pts {elapsed * 1000:6.1f} ms ({peak})"
+        print(line)
@@ -0,0 +1,58 @@
+# bench_history_store.py
+# Loading a month of 10 s history for one loop: parsing a CSV export versus reading
+# the memory-mapped history store.
+#
+#   python benchmarks/bench_history_store.py
+import os
+import sys
+import tempfile
+import time
+from   datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "api"))
+
+import pandas as pd
+
+from fake_pi import FakePIServer
+from history_store import HistoryStore
+from pi_client import PIDataClient
+
+
+TAGS = [
+    "KAWAI_U2_1ST_STG_LHS_MN_P_PID_SP",
+    "KAWAI_U2_1ST_STG_LHS_MN_P_PID_MEAS",
+    "KAWAI_U2_1ST_STG_LHS_MN_P_PID_OP",
+    "KAWAI_U2_1ST_STG_LHS_MN_S_PID_SP",
+    "KAWAI_U2_1ST_STG_LHS_MN_S_PID_MEAS",
+    "KAWAI_U2_1ST_STG_LHS_MN_S_PID_OP",
+]
+
+
+if __name__ == "__main__":
+    end = datetime(2025, 2, 1)
+    start = end - timedelta(days=30)
+    df = PIDataClient("fake", server_factory=FakePIServer).summaries(TAGS, start, end, "10s")
+
+    with tempfile.TemporaryDirectory() as root:
+        csv_path = os.path.join(root, "history.csv")
+        df.reset_index().to_csv(csv_path, index=False)
+        store = HistoryStore(os.path.join(root, "store"))
+        store.write(df, "10s")
+
+        t0 = time.perf_counter()
+        from_csv = pd.read_csv(csv_path, parse_dates=["time"]).set_index("time")
+        t_csv = time.perf_counter() - t0
+
+        t0 = time.perf_counter()
+        from_store = store.summaries(TAGS, start, end, "10s")
+        t_store = time.perf_counter() - t0
+
+        t0 = time.perf_counter()
+        store.summaries(TAGS, end - timedelta(hours=8), end, "10s")
+        t_window = time.perf_counter() - t0
+
+    assert from_store.shape == from_csv.shape
+    print(f"{len(df)} rows x {len(TAGS)} tags")
+    print(f"  read_csv        {t_csv * 1000:8.1f} ms")
+    print(f"  history store   {t_store * 1000:8.1f} ms  ({t_csv / t_store:.1f}x)")
+    print(f"  8 h window      {t_window * 1000:8.1f} ms")
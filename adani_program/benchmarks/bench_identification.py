@@ -0,0 +1,87 @@
+# bench_identification.py
+# Identifies the inner and outer models of 8 cascades from 3 days of 10 s closed-loop
+# data, simulated with cascade.py from known FOPDT / SOPDT plants with setpoint
+# steps, load drift and measurement noise, and compares the batched dead-time grid
+# fit with one np.linalg.lstsq per dead time. Checks that the output-error refinement
+# removes the ARX bias from the outer (FOPDT) models.
+#
+#   python benchmarks/bench_identification.py
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "api"))
+
+from cascade import process_model, simulate_cascade
+from identification import fit_arx, identify_loop
+
+
+DT = 10.0
+SAMPLES = 3 * 8_640  # 3 days
+LOOPS = 8
+
+
+def make_loop(rng):
+    inner = process_model(-rng.uniform(0.5, 1.2), rng.uniform(20, 60), rng.choice([10, 20, 30]), rng.uniform(0, 20))
+    outer = process_model(rng.uniform(0.8, 1.2), rng.uniform(90, 240), rng.choice([30, 60, 90]))
+    setpoint = np.repeat(540 + rng.uniform(-8, 8, SAMPLES // 360 + 1), 360)[:SAMPLES]
+    responses, _ = simulate_cascade(
+        setpoint, [0.4, 0.002, 0], [1.0, 0.03, 0], inner, outer,
+        initial_valve=40.0, valve_rate=1.0, disturbance=np.cumsum(rng.normal(0, 0.05, SAMPLES)),
+    )
+    noise = lambda values, sd: values[0] + rng.normal(0, sd, SAMPLES)
+    df = pd.DataFrame({
+        "controlvalveSecondary": responses["valve"][0],
+        "measureValueSecondary": noise(responses["secondary"], 0.1),
+        "measureValuePrimary": noise(responses["primary"], 0.1),
+    })
+    df[rng.random(df.shape) < 0.005] = np.nan  # bad-quality samples
+    return {"inner": inner, "outer": outer}, df
+
+
+def lstsq_per_delay(u, y, rows, delays):
+    """One least-squares fit per dead time, on the same rows fit_arx uses."""
+    params = []
+    for d in delays:
+        X = np.column_stack([y[rows - 1], u[rows - d], np.ones(len(rows))])
+        good = np.isfinite(X).all(axis=1) & np.isfinite(y[rows])
+        params.append(np.linalg.lstsq(X[good], y[rows][good], rcond=None)[0])
+    return np.array(params)
+
+
+if __name__ == "__main__":
+    rng = np.random.default_rng(0)
+    loops = [make_loop(rng) for _ in range(LOOPS)]
+
+    start = time.perf_counter()
+    identified = [identify_loop(df, DT) for _, df in loops]
+    t_identify = time.perf_counter() - start
+
+    u = loops[0][1]["controlvalveSecondary"].to_numpy()
+    y = loops[0][1]["measureValueSecondary"].to_numpy()
+    rows, delays = np.arange(70, SAMPLES), np.arange(61)
+    start = time.perf_counter()
+    lstsq_per_delay(u, y, rows, delays)
+    t_loop = time.perf_counter() - start
+    start = time.perf_counter()
+    fit_arx(u, y, rows, 1, delays)
+    t_batch = time.perf_counter() - start
+
+    print(f"{LOOPS} loops x 2 models, {SAMPLES} samples each: identified in {t_identify:.2f} s")
+    for (true, _), found in zip(loops, identified):
+        for key in ("inner", "outer"):
+            t, f = true[key], found[key]
+            print(f"  {key}  K {t['gain']:6.2f} -> {f['gain']:6.2f}   "
+                  f"tau {t['tau']:5.0f}+{t['tau2']:3.0f} -> {f['tau']:5.0f}+{f['tau2']:3.0f}   "
+                  f"dead time {t['dead_time']:3.0f} -> {f['dead_time']:3.0f}   fit {f['fit']:5.1f} %  ({f['order']})")
+    outer = np.array([[found["outer"][k] / true["outer"][k] - 1 for k in ("gain", "tau")]
+                      + [(found["outer"]["dead_time"] - true["outer"]["dead_time"]) / DT]
+                      for (true, _), found in zip(loops, identified)])
+    print(f"outer models: gain error {np.abs(outer[:, 0]).max():.1%}, tau error {np.abs(outer[:, 1]).max():.1%}, "
+          f"dead time off by {np.abs(outer[:, 2]).max():.0f} samples at most")
+    assert np.abs(outer[:, :2]).max() < 0.1 and np.abs(outer[:, 2]).max() <= 1, "outer models biased"
+    print(f"{len(delays)} dead times x {len(rows)} rows: lstsq per dead time {t_loop * 1000:6.1f} ms, "
+          f"batched {t_batch * 1000:6.1f} ms  speedup {t_loop / t_batch:4.1f}x")
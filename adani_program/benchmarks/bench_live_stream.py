@@ -0,0 +1,64 @@
+# bench_live_stream.py
+# N dashboards watching one loop. Polling: every dashboard re-POSTs the 8-hour
+# /fetchPISummaries each refresh. Streaming: one LiveHub feed fetches the new tail,
+# updates its LoopMonitor and hands the same encoded event to every client.
+#
+#   python benchmarks/bench_live_stream.py
+import functools
+import os
+import queue
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "api"))
+os.environ.setdefault("PI_FAKE", "1")
+
+import Index1
+from fake_pi import FakePIServer
+from fleet import iter_loops, load_architecture
+from live_stream import LiveHub
+
+
+LATENCY = 0.02  # seconds per PI summaries call
+CLIENTS = 50
+
+
+if __name__ == "__main__":
+    Index1.PI_CLIENT.server_factory = functools.partial(FakePIServer, latency=LATENCY)
+    Index1.RESULT_CACHE.ttl = 0  # every dashboard asks for its own maxPoints, so no two polls match
+    pid_path, config = next(iter_loops(load_architecture()))
+    body = {
+        "tags": config["tags"],
+        "closedloop": config["parameters"]["closed_loop"],
+        "open_loop": config["parameters"]["open_loop"],
+        "format": "compact",
+    }
+    client = Index1.app.test_client()
+    client.post("/fetchPISummaries", json=body)  # warm the PI session and bucket cache
+
+    start = time.perf_counter()
+    for i in range(CLIENTS):
+        assert client.post("/fetchPISummaries", json=dict(body, maxPoints=1000 + i)).status_code == 200
+    t_poll = time.perf_counter() - start
+
+    hub = LiveHub(Index1.fetch_loop_frame, time_interval='1s')  # 1 s buckets, so every poll has news
+    queues = [queue.Queue() for _ in range(CLIENTS)]
+    start = time.perf_counter()
+    for q in queues:
+        hub.subscribe(pid_path, config["tags"], lambda message, q=q: q.put_nowait(message) or True)
+    t_subscribe = time.perf_counter() - start
+    hub.stop()  # poll by hand below
+
+    time.sleep(2)
+    start = time.perf_counter()
+    hub.poll_once()
+    t_push = time.perf_counter() - start
+    assert all(q.qsize() == 1 for q in queues), "every client gets the update"
+    update = queues[0].get()
+
+    print(f"{CLIENTS} dashboards on one loop, {LATENCY * 1000:.0f} ms per PI call")
+    print(f"  polling, one refresh      {t_poll * 1000:8.1f} ms  ({CLIENTS} full analyses)")
+    print(f"  streaming, subscribe all  {t_subscribe * 1000:8.1f} ms  (one window pushed)")
+    print(f"  streaming, one update     {t_push * 1000:8.1f} ms  speedup {t_poll / t_push:5.0f}x  "
+          f"({len(update)} B event)")
+    print(f"  {hub.stats}")
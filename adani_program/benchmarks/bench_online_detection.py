@@ -0,0 +1,58 @@
+# bench_online_detection.py
+# Keeping one loop's issue percentages current every 10 s: re-running detect_issues
+# over the whole 8 h window per new sample versus pushing the sample into a
+# LoopMonitor.
+#
+#   python benchmarks/bench_online_detection.py
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "api"))
+
+from bench_detection import loop_frame
+from detection import detect_issues
+from online_detection import LoopMonitor
+
+
+HORIZON = 2_880  # 8 h at 10 s
+TICKS = 500
+
+
+def batch_percentages(df):
+    issues = detect_issues(df, "setpointPrimary", "measureValuePrimary", "setpointPrimary", "measureValueSecondary",
+                           "controlvalveSecondary", 0.0)
+    return {
+        "oscillationPercentage": len(issues["oscillations"]) / len(df) * 100,
+        "overshootPercentage": len(issues["overshoot"]) / len(df) * 100,
+        "undershootPercentage": len(issues["undershoot"]) / len(df) * 100,
+        "SettlingTimePercentage": len(issues["settling"]) / len(df) * 100,
+    }
+
+
+if __name__ == "__main__":
+    df = loop_frame(HORIZON + TICKS)
+    setpoint = df["setpointPrimary"].to_numpy()
+    meas = df["measureValuePrimary"].to_numpy()
+
+    # A full window pushed into a fresh monitor matches the batch detectors.
+    monitor = LoopMonitor(HORIZON)
+    for sp, pv in zip(setpoint[:HORIZON], meas[:HORIZON]):
+        monitor.push(sp, pv)
+    assert monitor.percentages() == batch_percentages(df.iloc[:HORIZON]), "monitor diverged from detect_issues"
+
+    start = time.perf_counter()
+    for tick in range(1, TICKS + 1):
+        batch_percentages(df.iloc[tick:HORIZON + tick])
+    t_batch = (time.perf_counter() - start) / TICKS
+
+    start = time.perf_counter()
+    for sp, pv in zip(setpoint[HORIZON:], meas[HORIZON:]):
+        monitor.push(sp, pv)
+        monitor.percentages()
+    t_online = (time.perf_counter() - start) / TICKS
+
+    print(f"one new sample on a {HORIZON}-sample window")
+    print(f"  rescan     {t_batch * 1e6:9.1f} us")
+    print(f"  online     {t_online * 1e6:9.1f} us  ({t_batch / t_online:.0f}x)")
+    print(f"  500 loops  {t_batch * 500 * 1000:7.1f} ms vs {t_online * 500 * 1000:6.1f} ms per 10 s refresh")
@@ -0,0 +1,64 @@
+# bench_plot_format.py
+# Payload size and build + JSON encode time of the issue plot series: the standard
+# response (timestamp strings, five float lists) versus the compact format.
+#
+#   python benchmarks/bench_plot_format.py
+import json
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "api"))
+
+from bench_simulation import make_frame
+from data_quality import json_values
+from plot_format import compact_plot_data
+
+
+TOLERANCE = 0.03
+
+
+def standard(df, issue_positions):
+    issue_points = [None] * len(df)
+    for i in issue_positions:
+        issue_points[i] = df["measureValuePrimary"].iloc[i]
+    return {
+        "timestamps": df.index.to_series().dt.strftime('%Y-%m-%d %H:%M:%S').tolist(),
+        "series": {
+            "Setpoint": json_values(df["setpointPrimary"]),
+            "Upper Acceptable Limit": json_values(df["setpointPrimary"] * (1 + TOLERANCE)),
+            "Lower Acceptable Limit": json_values(df["setpointPrimary"] * (1 - TOLERANCE)),
+            "Measured Output": json_values(df["measureValuePrimary"]),
+            "finetunedValues": df["finetunedValues"].tolist(),
+            "Issue Points": issue_points,
+        },
+    }
+
+
+def compact(df, issue_positions):
+    columns = {name: df[name] for name in ("setpointPrimary", "measureValuePrimary", "finetunedValues")}
+    return compact_plot_data({}, df.index, columns, issue_positions, TOLERANCE)
+
+
+def encoded(build, df, issue_positions):
+    start = time.perf_counter()
+    payload = json.dumps(build(df, issue_positions))
+    return len(payload), time.perf_counter() - start
+
+
+if __name__ == "__main__":
+    # 8 h at 10 s, one day at 1 s, one week at 1 s
+    for rows in (2_880, 86_400, 604_800):
+        df = make_frame(rows)
+        df.index = pd.date_range("2025-01-01", periods=rows, freq="1s", name="time")
+        df["finetunedValues"] = df["setpointPrimary"] + 0.1
+        issue_positions = np.arange(0, rows, 20)
+
+        size_std, t_std = encoded(standard, df, issue_positions)
+        size_cmp, t_cmp = encoded(compact, df, issue_positions)
+        print(f"{rows:>8} rows  standard {size_std / 1e6:7.2f} MB {t_std * 1000:8.1f} ms  "
+              f"compact {size_cmp / 1e6:6.2f} MB {t_cmp * 1000:6.1f} ms  "
+              f"({size_std / size_cmp:.1f}x smaller, {t_std / t_cmp:.0f}x faster)")
@@ -0,0 +1,76 @@
+# bench_readdata.py
+# A week of one loop's tags from readdata: the single blocking POST plus df.pivot that
+# trial/pidtuner.py used to make, versus ReadDataClient fetching 6 h slices over a
+# pooled keep-alive session in parallel. The mock server runs in its own process so it
+# does not share the GIL with the client being measured.
+#
+#   python benchmarks/bench_readdata.py
+import os
+import subprocess
+import sys
+import time
+
+import pandas as pd
+import requests
+
+API = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "api")
+sys.path.insert(0, API)
+
+from fleet import iter_loops, load_architecture
+from readdata_client import ReadDataClient
+
+
+PORT = 8097
+LATENCY = 0.1       # seconds of database time per readdata request
+ROW_COST = 0.00002  # and per row it scans
+START, END = "2025-01-01 00:00:00", "2025-01-08 00:00:00"
+
+
+def legacy_getdata(url, tags, start_time, end_time):
+    response = requests.post(url, json={"tableName": "sensordataKawai", "sensorids": tags,
+                                        "starttime": start_time, "endtime": end_time}, timeout=600)
+    df = pd.DataFrame(response.json()["data"])
+    df["time"] = pd.to_datetime(df["time"], errors='coerce')
+    pivot_df = df.pivot(index='time', columns='sensorid', values='measurement').reset_index()
+    pivot_df.columns.name = None
+    return pivot_df
+
+
+def wait_for(url):
+    for _ in range(100):
+        try:
+            requests.get(url, timeout=1)
+            return
+        except requests.ConnectionError:
+            time.sleep(0.1)
+    raise RuntimeError("readdata mock did not start")
+
+
+if __name__ == "__main__":
+    _, config = next(iter_loops(load_architecture()))
+    tags = list(config["tags"].values())
+    server = subprocess.Popen([sys.executable, os.path.join(API, "fake_readdata.py"),
+                               "--port", str(PORT), "--latency", str(LATENCY),
+                               "--row-cost", str(ROW_COST)], stdout=subprocess.DEVNULL)
+    url = f"http://127.0.0.1:{PORT}/kawai/api/v1/readdata"
+    try:
+        wait_for(url)
+
+        start = time.perf_counter()
+        old = legacy_getdata(url, tags, START, END)
+        t_old = time.perf_counter() - start
+
+        client = ReadDataClient(url, timeout=60)
+        start = time.perf_counter()
+        new = client.fetch(tags, START, END)
+        t_new = time.perf_counter() - start
+        client.close()
+    finally:
+        server.terminate()
+
+    pd.testing.assert_frame_equal(old, new, check_freq=False)
+    print(f"{len(tags)} tags x {len(new)} timestamps, {LATENCY * 1000:.0f} ms per request "
+          f"+ {ROW_COST * 1e6:.0f} us per row")
+    print(f"  single post + pivot    {t_old:6.2f} s")
+    print(f"  pooled client          {t_new:6.2f} s  ({client.stats['requests']} slices)  "
+          f"speedup {t_old / t_new:4.1f}x")
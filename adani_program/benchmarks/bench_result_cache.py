@@ -0,0 +1,55 @@
+# bench_result_cache.py
+# The UI re-requesting one loop with the same gains, as on a tab switch in pid2.js:
+# the first /fetchPISummaries runs fetch, detection, suggestion and simulation, the
+# repeats are answered from Index1.RESULT_CACHE. Also checks that a change of gains
+# is a miss and prints the /cacheStats counters.
+#
+#   python benchmarks/bench_result_cache.py
+import functools
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "api"))
+os.environ.setdefault("PI_FAKE", "1")
+
+import Index1
+from fake_pi import FakePIServer
+from fleet import iter_loops, load_architecture
+
+
+LATENCY = 0.05  # seconds per PI summaries call
+REPEATS = 50
+
+
+def timed_post(client, body):
+    start = time.perf_counter()
+    response = client.post("/fetchPISummaries", json=body)
+    assert response.status_code == 200
+    return response.get_data(), time.perf_counter() - start
+
+
+if __name__ == "__main__":
+    Index1.PI_CLIENT.server_factory = functools.partial(FakePIServer, latency=LATENCY)
+    _, config = next(iter_loops(load_architecture()))
+    body = {
+        "tags": config["tags"],
+        "closedloop": config["parameters"]["closed_loop"],
+        "open_loop": config["parameters"]["open_loop"],
+        "asof": "2025-01-01 08:00:00",
+    }
+    client = Index1.app.test_client()
+
+    first, t_first = timed_post(client, body)
+    repeats = [timed_post(client, body) for _ in range(REPEATS)]
+    assert all(data == first for data, _ in repeats), "cached response differs"
+    t_repeat = sum(t for _, t in repeats) / REPEATS
+
+    retuned = dict(body, open_loop={k: float(v) * 1.1 for k, v in body["open_loop"].items()})
+    _, t_retuned = timed_post(client, retuned)
+
+    print(f"{len(first) / 1024:.0f} KiB response, {LATENCY * 1000:.0f} ms per PI call")
+    print(f"  first request      {t_first * 1000:8.1f} ms")
+    print(f"  repeat (cached)    {t_repeat * 1000:8.2f} ms  speedup {t_first / t_repeat:6.0f}x")
+    print(f"  new gains (miss)   {t_retuned * 1000:8.1f} ms")
+    print(f"  {client.get('/cacheStats').json['results']}")
@@ -0,0 +1,66 @@
+# bench_scheduler.py
+# First open of a loop in the UI: a cold /fetchPISummaries that waits for PI and the
+# analysis, versus the same request after a HealthScheduler round has refreshed the
+# loop in the background. Also times one round over the whole plant at several
+# concurrency limits, against a fake PI server with a round-trip latency.
+#
+#   python benchmarks/bench_scheduler.py
+import functools
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "api"))
+os.environ.setdefault("PI_FAKE", "1")
+
+import Index1
+from fake_pi import FakePIServer
+from fleet import iter_loops, load_architecture
+
+
+LATENCY = 0.05  # seconds per PI summaries call
+
+
+def first_open(config):
+    body = {
+        "tags": config["tags"],
+        "closedloop": config["parameters"]["closed_loop"],
+        "open_loop": config["parameters"]["open_loop"],
+        "format": "compact",
+    }
+    start = time.perf_counter()
+    response = Index1.app.test_client().post("/fetchPISummaries", json=body)
+    assert response.status_code == 200
+    return time.perf_counter() - start
+
+
+def reset():
+    Index1.PI_CACHE.clear()
+    Index1.RESULT_CACHE.clear()
+    Index1.PI_CLIENT.close()
+
+
+if __name__ == "__main__":
+    Index1.PI_CLIENT.server_factory = functools.partial(FakePIServer, latency=LATENCY)
+    loops = list(iter_loops(load_architecture()))
+    scheduler = Index1.SCHEDULER
+
+    first_open(loops[0][1])  # warm up imports and the PI session
+    reset()
+    t_cold = first_open(loops[-1][1])
+
+    rounds = {}
+    for concurrency in (1, 2, 4):
+        reset()
+        scheduler.max_concurrency = concurrency
+        start = time.perf_counter()
+        scheduler.run_once()
+        rounds[concurrency] = time.perf_counter() - start
+    t_warm = first_open(loops[-1][1])
+
+    print(f"{len(loops)} loops, {LATENCY * 1000:.0f} ms per PI call")
+    print(f"  first open, cold           {t_cold * 1000:7.1f} ms")
+    print(f"  first open, after a round  {t_warm * 1000:7.1f} ms  speedup {t_cold / t_warm:4.1f}x")
+    for concurrency, elapsed in rounds.items():
+        print(f"  round, {concurrency} loop(s) at a time  {elapsed:7.2f} s")
+    print(f"  {scheduler.stats}")
@@ -0,0 +1,73 @@
+# bench_tuning_rules.py
+# Plant-wide retune proposals: every tuning rule for 10k cascades in one vectorized
+# tune_loops call, versus an autotune_pid run per PID. The gains of each rule are then
+# checked on the cascades they were computed for, all rules and loops as lanes of one
+# simulate_cascade run, against a 5 degC setpoint step.
+#
+#   python benchmarks/bench_tuning_rules.py
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "api"))
+
+from autotune import autotune_pid
+from bench_simulation import make_frame
+from cascade import process_model, simulate_cascade
+from tuning_rules import RULES, cascade_rules, tune_loops
+
+
+LOOPS = 10_000
+CHECKED = 200  # cascades simulated per rule
+
+
+def random_models(rng, n):
+    inner = process_model(-rng.uniform(0.5, 1.2, n), rng.uniform(20, 60, n), rng.choice([10.0, 20.0, 30.0], n),
+                          rng.uniform(0, 20, n))
+    outer = process_model(rng.uniform(0.8, 1.2, n), rng.uniform(90, 240, n), rng.choice([30.0, 60.0, 90.0], n), np.zeros(n))
+    return inner, outer
+
+
+if __name__ == "__main__":
+    rng = np.random.default_rng(0)
+    inner, outer = random_models(rng, LOOPS)
+    models = {
+        f"loop-{i}": {key: {k: v[i] for k, v in model.items()} for key, model in (("inner", inner), ("outer", outer))}
+        for i in range(LOOPS)
+    }
+
+    start = time.perf_counter()
+    proposals = tune_loops(models)
+    t_rules = time.perf_counter() - start
+
+    df = make_frame(2_880)
+    start = time.perf_counter()
+    autotune_pid(df["setpointPrimary"].to_numpy(), df["measureValuePrimary"].iloc[0], [2.5, 3.5, 0.3], time_budget=3.0)
+    t_autotune = (time.perf_counter() - start) * 2 * LOOPS  # two PIDs per cascade
+
+    print(f"{LOOPS} cascades, {len(RULES)} rules, both PIDs")
+    print(f"  tune_loops         {t_rules * 1000:10.1f} ms")
+    print(f"  autotune per PID   {t_autotune:10.0f} s (extrapolated from one run)  "
+          f"speedup {t_autotune / t_rules:8.0f}x")
+    print(f"  loop-0 SIMC        {proposals['loop-0']['simc']}")
+
+    # Closed-loop check: 5 degC step on the primary setpoint, every rule and loop in one run
+    checked = {key: {k: np.tile(v[:CHECKED], len(RULES)) for k, v in model.items()}
+               for key, model in (("inner", inner), ("outer", outer))}
+    tuned = cascade_rules({k: v[:CHECKED] for k, v in inner.items()}, {k: v[:CHECKED] for k, v in outer.items()})
+    gains = lambda pid: np.concatenate([np.column_stack([tuned[r][pid][k] for k in ("kp", "ki", "kd")]) for r in RULES])
+    setpoint = np.r_[np.full(30, 540.0), np.full(690, 545.0)]
+    start = time.perf_counter()
+    responses, metrics = simulate_cascade(setpoint, gains("PID1"), gains("PID2"), checked["inner"], checked["outer"],
+                                          initial_valve=40.0, valve_rate=1.0)
+    t_check = time.perf_counter() - start
+    final = np.abs(responses["primary"][:, -60:] - 545.0).max(axis=1)
+
+    print(f"{CHECKED} cascades x {len(RULES)} rules simulated in {t_check:.2f} s")
+    for i, rule in enumerate(RULES):
+        lanes = slice(i * CHECKED, (i + 1) * CHECKED)
+        print(f"  {rule:11s} median IAE {np.median(metrics['iae'][lanes]):7.0f}  "
+              f"median overshoot {np.median(metrics['overshoot'][lanes]):5.2f} degC  "
+              f"settled {np.mean(final[lanes] < 0.1):6.1%}")
@@ -8,53 +8,28 @@ import traceback
 import time
 import datetime
 import json
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "api"))
+from readdata_client import ReadDataClient
+from data_source import role_frame
 
 app= Flask(__name__)
 CORS(app)
 
+READDATA = ReadDataClient('http://10.79.58.13/kawai/api/v1/readdata')
+
 def getdata(tableName,tags, start_time, end_time):
-    url = 'http://10.79.58.13/kawai/api/v1/readdata'
     try:
-        
-        # API request
-        response = requests.post(url,
-            json={
-                "tableName": tableName,
-                "sensorids": tags,
-                "starttime": start_time,
-                "endtime"  : end_time
-            },
-            timeout=10  # Timeout to prevent hanging
-        )
-        print("response")
-        print(response)
-        # Check HTTP status
-        if response.status_code != 200:
-            print(f"Error: Received status code {response.status_code} from the server.")
-            return pd.DataFrame()
+        # Pooled client: one keep-alive session, long ranges fetched as parallel slices
+        pivot_df = READDATA.fetch(tags, start_time, end_time, table=tableName)
 
-        # Parse JSON response
-        response_data = response.json()
-        
         # Check if data exists
-        if not response_data or "data" not in response_data or not response_data["data"]:
+        if pivot_df.empty:
             print("Warning: No data received for the specified inputs.")
             return pd.DataFrame()
 
-        # Convert to DataFrame
-        df = pd.DataFrame(response_data["data"])
-        if df.empty:
-            print("Warning: Data is empty after conversion to DataFrame.")
-            return pd.DataFrame()
-
-        # Ensure 'time' column is datetime and pivot the DataFrame
-        df["time"] = pd.to_datetime(df["time"], errors='coerce')
-        pivot_df = df.pivot(index='time', columns='sensorid', values='measurement').reset_index()
-
-        # Clean column names
-        pivot_df.columns.name = None
-        pivot_df = pivot_df.rename_axis(None, axis=1)
-
         return pivot_df
 
     except requests.exceptions.RequestException as e:
@@ -302,11 +277,7 @@ def get_data():
         
         sensorTags=[v for k,v in data.items()]
         df = getdata("sensordataKawai",sensorTags,starttime,endtime)
-        for col in df.columns:
-            if col != "time":
-                fdf= {v:k for k,v in data.items() if k!= v}
-                df= df.rename(columns=fdf)
-                # df=pd.DataFrame(result)
+        df = role_frame(df, data)
         print(df.columns)
         pid1_setpoint = "setpointPrimary"
         pid1_meas = "measureValuePrimary"
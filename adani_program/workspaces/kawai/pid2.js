@@ -113,6 +113,7 @@ function updateDateTime() {
 //   }
 // }
 const API_BASE_URL = "http://127.0.0.1:5000/fetchPISummaries";
+const AUTOTUNE_API_URL = "http://127.0.0.1:5000/autotune";
 // Load PID hierarchy tree data from JSON file
 async function loadPIDHierarchy() {
   const container = document.getElementById('pid-hierarchy-tree');
@@ -386,6 +387,7 @@ async function loadPIDData(pidPath) {
   if (pidDetailView) pidDetailView.style.display = 'block';
   
   console.log(`Loading PID data for: ${pidPath}`);
+  window.currentPIDPath = pidPath;
   
   try {
     // Fetch data from API
@@ -394,6 +396,7 @@ async function loadPIDData(pidPath) {
       // Store the PID data globally for simulator access
       window.currentPIDData = pidData;
       updatePIDView(pidData, pidPath);
+      subscribeLiveStream(pidPath);
       return;
     }
   } catch (error) {
@@ -535,6 +538,8 @@ function createPIDApiPayload(pidPath) {
     endtime  : endtime, //"2025-01-01 23:45:00",
     sampleInterval: 10,   // Sample interval in minutes
     includeIssuePoints: true,
+    format: 'compact',    // start + step time axis and packed series, see expandCompactResponse
+    maxPoints: Math.round(window.innerWidth * (window.devicePixelRatio || 1)),  // decimate to the screen width
     tags: pidConfig ? pidConfig.tags : null,
     closedloop: pidConfig ? pidConfig.parameters.closed_loop : null,
     open_loop:  pidConfig ? pidConfig.parameters.open_loop : null
@@ -598,9 +603,80 @@ async function fetchPIDDataFromAPI(pidPath) {
   }
 }
 
+// Compact response format (api/plot_format.py): the time axis comes as start + step
+// (plus the grid rows when downsampled), series as base64 little-endian float32 and
+// issue points as int32 row positions.
+function decodeBase64(encoded) {
+  const bytes = Uint8Array.from(atob(encoded || ''), c => c.charCodeAt(0));
+  return new DataView(bytes.buffer);
+}
+
+function unpackFloat32(encoded) {
+  const view = decodeBase64(encoded);
+  const values = new Array(view.byteLength / 4);
+  for (let i = 0; i < values.length; i++) {
+    const v = view.getFloat32(i * 4, true);
+    // NaN marks a bad-quality sample; float32 is rounded back to 7 significant digits
+    values[i] = Number.isNaN(v) ? null : Number(v.toPrecision(7));
+  }
+  return values;
+}
+
+function unpackInt32(encoded) {
+  const view = decodeBase64(encoded);
+  const values = new Array(view.byteLength / 4);
+  for (let i = 0; i < values.length; i++) {
+    values[i] = view.getInt32(i * 4, true);
+  }
+  return values;
+}
+
+function buildTimeLabels(time) {
+  const pad = n => String(n).padStart(2, '0');
+  const labels = new Array(time.count);
+  if (!time.count) return labels;
+  const start = new Date(time.start.replace(' ', 'T')).getTime();
+  // A downsampled series only covers some rows of the start + step grid
+  const rows = time.rows ? unpackInt32(time.rows) : null;
+  for (let i = 0; i < time.count; i++) {
+    const d = new Date(start + (rows ? rows[i] : i) * time.step * 1000);
+    labels[i] = `${d.getFullYear()}-${pad(d.getMonth() + 1)}-${pad(d.getDate())} ` +
+                `${pad(d.getHours())}:${pad(d.getMinutes())}:${pad(d.getSeconds())}`;
+  }
+  return labels;
+}
+
+// Expand a compact response into the standard timestamps + series arrays. The
+// acceptable limits are left out; transformApiResponse derives them from errorMargin.
+function expandCompactResponse(apiData) {
+  const series = {};
+  Object.entries(apiData.series || {}).forEach(([name, encoded]) => {
+    series[name] = unpackFloat32(encoded);
+  });
+  const timestamps = apiData.timestamps || buildTimeLabels(apiData.time);
+
+  const positions = unpackInt32(apiData.issuePositions);
+  if (positions.length) {
+    const measured = series['Measured Output'] || [];
+    const issuePoints = new Array(timestamps.length).fill(null);
+    positions.forEach(i => { issuePoints[i] = measured[i]; });
+    series['Issue Points'] = issuePoints;
+  }
+  return { ...apiData, timestamps, series };
+}
+
+// Acceptable limit `margin` percent above (or, negative, below) a setpoint. A
+// missing setpoint stays missing rather than becoming a limit of 0.
+function acceptableLimit(sp, margin) {
+  return sp === null || sp === undefined ? null : sp * (1 + margin / 100);
+}
+
 // Transform API response to the format expected by updatePIDView
 function transformApiResponse(apiData, pidPath) {
   try {
+    if (apiData && apiData.format === 'compact') {
+      apiData = expandCompactResponse(apiData);
+    }
     // Parse the path to create a readable name
     const displayPath = pidPath.split('-')
       .map(part => {
@@ -660,11 +736,11 @@ function transformApiResponse(apiData, pidPath) {
     
     // If we don't have proper upper/lower bounds, calculate them based on setpoint
     if (!upperBoundValues.length && setpointValues.length) {
-      upperBoundValues = setpointValues.map(sp => sp * (1 + errorMargin/100));
+      upperBoundValues = setpointValues.map(sp => acceptableLimit(sp, errorMargin));
     }
     
     if (!lowerBoundValues.length && setpointValues.length) {
-      lowerBoundValues = setpointValues.map(sp => sp * (1 - errorMargin/100));
+      lowerBoundValues = setpointValues.map(sp => acceptableLimit(sp, -errorMargin));
     }
     
     console.log('Transformed chart data:', {
@@ -963,6 +1039,76 @@ function updateRecommendation(pidData) {
   }
 }
 
+// Live updates for the open loop, pushed by /liveStream as Server-Sent Events. New
+// samples slide the chart window forward instead of re-POSTing the 8-hour analysis.
+const LIVE_STREAM_URL = "http://127.0.0.1:5000/liveStream";
+
+const LIVE_WINDOW_MS = 8 * 60 * 60 * 1000;  // the chart shows the last 8 hours
+
+// Stop the live updates, when the loop's view is left or the page is closed
+function closeLiveStream() {
+  if (window.liveStream) {
+    window.liveStream.close();
+    window.liveStream = null;
+  }
+}
+window.addEventListener('pagehide', closeLiveStream);
+
+function subscribeLiveStream(pidPath) {
+  closeLiveStream();
+  if (typeof EventSource === 'undefined' || !pidPath) return;
+
+  const source = new EventSource(`${LIVE_STREAM_URL}?pidPath=${encodeURIComponent(pidPath)}`);
+  source.addEventListener('snapshot', event => {
+    const snapshot = JSON.parse(event.data);
+    if (window.currentPIDData) window.currentPIDData.percentages = snapshot.percentages;
+  });
+  source.addEventListener('update', event => {
+    const update = JSON.parse(event.data);
+    if (update.pidPath !== window.currentPIDPath) return;
+    if (window.currentPIDData) window.currentPIDData.percentages = update.percentages;
+    appendLiveSamples(update);
+  });
+  // EventSource reconnects by itself and the server sends a fresh snapshot
+  source.onerror = () => console.warn('Live stream interrupted, reconnecting');
+  window.liveStream = source;
+}
+
+function appendLiveSamples(update) {
+  const chart = window.pidChart;
+  if (!chart || !update.time.length) return;
+  const labels = chart.data.labels;
+  const [setpoint, actual, upperBound, lowerBound] = chart.data.datasets;
+  const margin = update.errorMargin;
+
+  update.time.forEach((label, i) => {
+    const sp = update.series['Setpoint'][i];
+    labels.push(label);
+    setpoint.data.push(sp);
+    actual.data.push(update.series['Measured Output'][i]);
+    upperBound.data.push(acceptableLimit(sp, margin));
+    lowerBound.data.push(acceptableLimit(sp, -margin));
+  });
+  // Drop the points older than the window before the newest one. By time, not by
+  // count: the initial points may be downsampled, the live ones are not.
+  const newest = new Date(labels[labels.length - 1].replace(' ', 'T')).getTime();
+  let expired = 0;
+  while (expired < labels.length && newest - new Date(labels[expired].replace(' ', 'T')).getTime() > LIVE_WINDOW_MS) {
+    expired++;
+  }
+  labels.splice(0, expired);
+  [setpoint, actual, upperBound, lowerBound].forEach(dataset => dataset.data.splice(0, expired));
+
+  const issueDataset = chart.data.datasets.find(dataset => dataset.label === 'Issue Points');
+  if (issueDataset) {
+    Object.values(update.issuePoints).flat().forEach(point => {
+      issueDataset.data.push({ x: point.time, y: point.value });
+    });
+    issueDataset.data = issueDataset.data.filter(point => point.x >= labels[0]);
+  }
+  chart.update('none');
+}
+
 // Update the PID chart with new data
 function updatePIDChart(chartData) {
   try {
@@ -1341,6 +1487,14 @@ function setupActionButtons() {
     });
   }
   
+  // Auto-tune button
+  const autotuneButton = document.getElementById('autotune');
+  if (autotuneButton) {
+    autotuneButton.addEventListener('click', () => {
+      autotunePID(window.currentPIDPath);
+    });
+  }
+  
   // Simulator toggle button
   const simulatorToggleButton = document.getElementById('simulator-toggle');
   if (simulatorToggleButton) {
@@ -1467,6 +1621,48 @@ function closeSimulator() {
 }
 
 
+// Run the optimizer-driven auto-tuner for the selected PID and show its gains as suggestions
+async function autotunePID(pidPath) {
+  if (!pidPath) {
+    showToast('error', 'Select a PID controller first');
+    return;
+  }
+
+  const autotuneButton = document.getElementById('autotune');
+  if (autotuneButton) autotuneButton.disabled = true;
+  showToast('info', 'Auto-tuning PID parameters...');
+
+  try {
+    const payload = createPIDApiPayload(pidPath);
+    payload.time_budget = 3;
+    payload.max_evals = 400;
+
+    const result = await fetchRealPIDData(AUTOTUNE_API_URL, payload);
+    const suggested = result.suggestedParameters || {};
+
+    const cells = {
+      open_loop:   ['suggested-kp-open', 'suggested-ki-open', 'suggested-kd-open'],
+      closed_loop: ['suggested-kp-closed', 'suggested-ki-closed', 'suggested-kd-closed']
+    };
+    Object.entries(cells).forEach(([loop, ids]) => {
+      if (!suggested[loop]) return;
+      ['kp', 'ki', 'kd'].forEach((gain, i) => {
+        const element = document.getElementById(ids[i]);
+        if (element) element.textContent = suggested[loop][gain];
+      });
+    });
+
+    const applyButton = document.getElementById('apply-tuning');
+    if (applyButton) applyButton.disabled = false;
+    showToast('success', 'Auto-tuned parameters ready');
+  } catch (error) {
+    console.error('Auto-tune failed:', error);
+    showToast('error', 'Auto-tune failed: ' + error.message);
+  } finally {
+    if (autotuneButton) autotuneButton.disabled = false;
+  }
+}
+
 // Apply tuning parameters
 function applyTuningParameters() {
   // In a real application, this would send the parameters to the control system
@@ -1641,6 +1837,7 @@ function toggleSummaryReportsView() {
     if (feedbackView) feedbackView.style.display = 'none';
     if (initialSelectionMessage) initialSelectionMessage.style.display = 'none';
     if (pidDetailView) pidDetailView.style.display = 'none';
+    closeLiveStream();
     
     // Show summary reports view
     summaryReportsView.style.display = 'block';
@@ -1664,6 +1861,7 @@ function toggleFeedbackView() {
     if (summaryReportsView) summaryReportsView.style.display = 'none';
     if (initialSelectionMessage) initialSelectionMessage.style.display = 'none';
     if (pidDetailView) pidDetailView.style.display = 'none';
+    closeLiveStream();
     
     // Show feedback view
     feedbackView.style.display = 'block';
@@ -1907,6 +2105,7 @@ function toggleFeedbackView() {
     if (summaryReportsView) summaryReportsView.style.display = 'none';
     if (initialSelectionMessage) initialSelectionMessage.style.display = 'none';
     if (pidDetailView) pidDetailView.style.display = 'none';
+    closeLiveStream();
     
     // Toggle feedback view
     feedbackView.style.display = 'block';